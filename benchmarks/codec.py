@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import timeit
+
+import numpy as np
+from teraflashpy.codec import Codec, decode_batch, encode_batch
+from teraflashpy.core import LENGTH_PREFIX_SIZE
+from teraflashpy.decode import decode_pulse
+from teraflashpy.output import PulseBatch
+from teraflashpy.simulator import SimulatorConfig, render_frames
+
+
+def simulated_batch(num_pulses: int, num_samples: int) -> PulseBatch:
+    # A variant per pulse, so repeated pulses do not flatter the compression.
+    frames = render_frames(SimulatorConfig(num_samples=num_samples, num_variants=num_pulses, seed=0))
+    pulses = [decode_pulse(frame[LENGTH_PREFIX_SIZE:]) for frame in frames]
+    header, time, _ = pulses[0]
+    return PulseBatch(
+        timestamps=np.datetime64("2026-01-01T00:00", "us") + np.arange(num_pulses) * np.timedelta64(250, "ms"),
+        header=header,
+        time=time,
+        magnitude=np.stack([magnitude for _, _, magnitude in pulses]),
+    )
+
+
+def main(num_pulses: int = 100, num_samples: int = 2000, number: int = 20) -> None:
+    batch = simulated_batch(num_pulses, num_samples)
+    # What every pulse took before: its own time axis next to its magnitudes.
+    original = batch.timestamps.nbytes + 2 * batch.magnitude.nbytes
+    for codec in Codec:
+        try:
+            chunk = encode_batch(batch, codec)
+        except ImportError:
+            print(f"{codec.name:>8}: not installed")
+            continue
+        encode = timeit.timeit(lambda: encode_batch(batch, codec), number=number) / number  # noqa: B023
+        decode = timeit.timeit(lambda: decode_batch(chunk), number=number) / number  # noqa: B023
+        error = np.abs(decode_batch(chunk).magnitude - batch.magnitude).max()
+        print(
+            f"{codec.name:>8}: {len(chunk) / original:6.1%} of the size, "
+            f"encodes at {batch.magnitude.nbytes / encode / 1e6:6.0f} MB/s, "
+            f"decodes at {batch.magnitude.nbytes / decode / 1e6:6.0f} MB/s, max error {error:.3g}",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import Process
+from pathlib import Path
+from queue import Empty
+
+from teraflashpy.client import TeraflashProClient
+from teraflashpy.daemon import AcquisitionDaemon, daemon_health, stop_daemon
+from teraflashpy.reconnect import Backoff
+
+PORT = 16006
+
+
+def _simulate(rate: float, *, wait: bool = True) -> subprocess.Popen:
+    # In a process of its own, like an instrument, so the backends forked below do not inherit its listening socket.
+    command = [sys.executable, "-m", "teraflashpy", "simulate", "--port", str(PORT), "--rate", str(rate)]
+    simulator = subprocess.Popen(command)  # noqa: S603
+    if wait:
+        time.sleep(1.5)
+    return simulator
+
+
+def _first_pulse(**kwargs: object) -> float:
+    start = time.perf_counter()
+    with TeraflashProClient(port=PORT, **kwargs) as client:
+        client.read(1)
+    return time.perf_counter() - start
+
+
+def _recovery(
+    client: TeraflashProClient,
+    simulator: subprocess.Popen,
+    rate: float,
+    timeout: float,
+) -> tuple[str, subprocess.Popen]:
+    """Restarts the simulator and times how long until the client reads a pulse again."""
+    client.read(1)
+    simulator.terminate()
+    simulator.wait()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    restarted = _simulate(rate, wait=False)
+    try:
+        client.read(1, timeout=timeout)
+    except Empty:
+        result = f"no pulse within {timeout:.0f} s"
+    else:
+        result = f"next pulse {(time.perf_counter() - start) * 1e3:6.0f} ms after the restart began"
+    return result, restarted
+
+
+def _wait_until_connected(address: Path) -> None:
+    while True:
+        try:
+            if daemon_health(address).connected:
+                return
+        except OSError:
+            # The daemon has not opened its socket yet.
+            pass
+        time.sleep(0.01)
+
+
+def main(repeats: int = 10, rate: float = 1000.0) -> None:
+    simulator = _simulate(rate)
+    address = Path(tempfile.gettempdir()) / "teraflashpy-benchmark.sock"
+    daemon = Process(target=AcquisitionDaemon(port=PORT, address=address, backoff=Backoff(initial=0.05)).run)
+    daemon.start()
+    try:
+        _wait_until_connected(address)
+
+        spawned = sorted(_first_pulse() for _ in range(repeats))[repeats // 2]
+        attached = sorted(_first_pulse(attach_to=address) for _ in range(repeats))[repeats // 2]
+        print(f"{'spawn a backend':>28}: first pulse after {spawned * 1e3:6.1f} ms (median of {repeats})")
+        print(f"{'attach to the daemon':>28}: first pulse after {attached * 1e3:6.1f} ms (median of {repeats})")
+
+        with TeraflashProClient(port=PORT, backoff=Backoff(attempts=0)) as client:
+            result, simulator = _recovery(client, simulator, rate, timeout=5)
+            print(f"{'backend, no reconnect':>28}: {result}")
+        with TeraflashProClient(port=PORT, backoff=Backoff(initial=0.05)) as client:
+            result, simulator = _recovery(client, simulator, rate, timeout=5)
+            print(f"{'backend, reconnecting':>28}: {result}")
+        with TeraflashProClient(attach_to=address) as client:
+            result, simulator = _recovery(client, simulator, rate, timeout=5)
+            print(f"{'attached to the daemon':>28}: {result}")
+            print(f"{'':>28}  {daemon_health(address).connects} connections made by the daemon")
+    finally:
+        stop_daemon(address)
+        daemon.join()
+        simulator.terminate()
+        simulator.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import timeit
+from typing import TYPE_CHECKING
+
+import numpy as np
+from teraflashpy.decode import decode_pulse
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def make_payload(num_samples: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    time = np.arange(num_samples) * 0.05
+    magnitude = rng.normal(scale=100.0, size=num_samples)
+    rows = "".join(f"{t:.2f},{m:.6f}\r\n" for t, m in zip(time, magnitude, strict=True))
+    return f"TF-PULSE,{num_samples},0.05\r\n{rows}".encode()
+
+
+def decode_pulse_loop(pulse: bytes) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """The original per-line decoder of `TeraflashProClient._decode_pulse`."""
+    pulsedata = pulse.decode("utf-8").split("\r\n")
+    header = pulsedata.pop(0).split(",")
+    time = np.zeros(len(pulsedata) - 1, dtype=float)
+    magnitude = np.zeros(len(pulsedata) - 1, dtype=float)
+    for x in range(len(pulsedata) - 1):
+        _time, _magnitude = pulsedata[x].split(",")
+        time[x] = float(_time)
+        magnitude[x] = float(_magnitude)
+
+    return header, time.astype(np.float32), magnitude.astype(np.float32)
+
+
+def _best_time(decode: Callable[[bytes], object], payload: bytes, number: int, repeats: int) -> float:
+    return min(timeit.repeat(lambda: decode(payload), number=number, repeat=repeats)) / number
+
+
+def main(sample_counts: tuple[int, ...] = (1000, 4000, 16000), repeats: int = 5) -> None:
+    for num_samples in sample_counts:
+        payload = make_payload(num_samples)
+
+        expected = decode_pulse_loop(payload)
+        actual = decode_pulse(payload)
+        if expected[0] != actual[0]:
+            msg = "Decoded headers differ."
+            raise AssertionError(msg)
+        np.testing.assert_array_equal(expected[1], actual[1])
+        np.testing.assert_array_equal(expected[2], actual[2])
+
+        number = max(1, 200_000 // num_samples)
+        loop = _best_time(decode_pulse_loop, payload, number, repeats)
+        vectorized = _best_time(decode_pulse, payload, number, repeats)
+        print(
+            f"{num_samples:>6} samples ({len(payload) / 1024:7.1f} KiB): "
+            f"loop {loop * 1e6:9.1f} us, vectorized {vectorized * 1e6:9.1f} us, speedup {loop / vectorized:5.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
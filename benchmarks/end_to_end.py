@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import contextlib
+import logging
+import pickle
+import runpy
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+from pydantic import BaseModel
+from teraflashpy import CapturePolicy, Transport
+from teraflashpy.client import PulsesDroppedError, TeraflashProClient
+from teraflashpy.simulator import BackgroundSimulator, SimulatorConfig
+
+# `main.py` sits at the root of the repository rather than in the package.
+run_pipeline = runpy.run_path(str(Path(__file__).parents[1] / "main.py"))["main"]
+
+
+class Result(BaseModel):
+    name: str
+    pulses: int
+    elapsed: float
+    latency_ms: tuple[float, float, float] | None = None
+    "50th, 95th and 99th percentile of the time from receiving a pulse to `read` returning it."
+    drop_rate: float | None = None
+    peak_rss_mib: float | None = None
+    backend_peak_rss_mib: float | None = None
+
+    def __str__(self) -> str:
+        columns = [f"{self.name:>44}", f"{self.pulses / self.elapsed:9.0f} pulses/s"]
+        if self.latency_ms is not None:
+            columns.append("latency p50/p95/p99 {:7.2f} {:7.2f} {:7.2f} ms".format(*self.latency_ms))
+        if self.drop_rate is not None:
+            columns.append(f"dropped {100 * self.drop_rate:5.1f}%")
+        if self.peak_rss_mib is not None:
+            columns.append(f"peak RSS {self.peak_rss_mib:6.1f} MiB")
+        if self.backend_peak_rss_mib is not None:
+            columns.append(f"backend {self.backend_peak_rss_mib:6.1f} MiB")
+        return ", ".join(columns)
+
+
+def _reset_peak_rss() -> None:
+    # Writing 5 to `clear_refs` resets the peak RSS of the process (Linux 4.0 and later).
+    with contextlib.suppress(OSError):
+        Path("/proc/self/clear_refs").write_text("5")
+
+
+def _peak_rss_mib(pid: int | str = "self") -> float | None:
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) / 1024
+    return None
+
+
+def bench_client(  # noqa: PLR0913
+    name: str,
+    config: SimulatorConfig,
+    num_pulses: int,
+    batch_size: int,
+    transport: Transport,
+    capture_policy: CapturePolicy,
+) -> Result:
+    latencies = []
+    with (
+        BackgroundSimulator(config, port=0) as simulator,
+        TeraflashProClient(transport=transport, capture_policy=capture_policy, port=simulator.port) as client,
+    ):
+        # The first read waits for the backend to start and connect, which is not what is being measured.
+        client.read(1)
+        _reset_peak_rss()
+        start = time.perf_counter()
+        for _ in range(num_pulses // batch_size):
+            try:
+                batch = client.read(batch_size)
+            except PulsesDroppedError as e:
+                batch = e.result
+            returned = np.datetime64(datetime.now(tz=timezone.utc).replace(tzinfo=None), "us")
+            latencies.append((returned - batch.timestamps).astype(np.float64) / 1e3)
+        elapsed = time.perf_counter() - start
+        stats = client.stats
+        backend_peak_rss = _peak_rss_mib(client.process.pid)
+    latency_ms = np.concatenate(latencies)
+    return Result(
+        name=name,
+        pulses=latency_ms.size,
+        elapsed=elapsed,
+        latency_ms=tuple(np.percentile(latency_ms, [50, 95, 99]).tolist()),
+        drop_rate=stats.dropped / max(stats.received, 1),
+        peak_rss_mib=_peak_rss_mib(),
+        backend_peak_rss_mib=backend_peak_rss,
+    )
+
+
+def _count_pulses(folder: Path) -> int:
+    num_pulses = 0
+    for path in folder.rglob("*.npy"):
+        num_pulses += np.load(path, mmap_mode="r").shape[0]
+    for path in folder.rglob("*.pkl"):
+        with path.open("rb") as f:
+            while True:
+                try:
+                    num_pulses += len(pickle.load(f)["timestamp"])  # noqa: S301
+                except EOFError:  # noqa: PERF203
+                    break
+    return num_pulses
+
+
+def bench_pipeline(name: str, config: SimulatorConfig, duration: float, batch_size: int, extension: str) -> Result:
+    with BackgroundSimulator(config, port=0) as simulator, tempfile.TemporaryDirectory() as folder:
+        _reset_peak_rss()
+        start = time.perf_counter()
+        run_pipeline(
+            num_pulses=batch_size,
+            experiment_duration=timedelta(seconds=duration),
+            time_between_measurements=timedelta(0),
+            data_folder=Path(folder),
+            extension=extension,
+            port=simulator.port,
+        )
+        elapsed = time.perf_counter() - start
+        num_pulses = _count_pulses(Path(folder))
+        # Counts every pulse the simulator sent that did not end up in a file, including any still in flight at the end.
+        drop_rate = 1 - num_pulses / max(simulator.simulator.sent, 1)
+        return Result(
+            name=name,
+            pulses=num_pulses,
+            elapsed=elapsed,
+            drop_rate=drop_rate,
+            peak_rss_mib=_peak_rss_mib(),
+        )
+
+
+def main(num_samples: int = 2000, num_pulses: int = 2000, batch_size: int = 100, duration: float = 5) -> None:
+    logging.basicConfig(level=logging.WARNING)
+    unlimited = SimulatorConfig(num_samples=num_samples, rate=None, seed=0)
+    rated = SimulatorConfig(num_samples=num_samples, rate=200, jitter=1e-3, seed=0)
+    print(f"Pulses of {num_samples} samples, read in batches of {batch_size}")
+
+    for transport in Transport:
+        print(
+            bench_client(
+                f"read, {transport.name}, Blocking, unlimited rate",
+                unlimited,
+                num_pulses,
+                batch_size,
+                transport,
+                CapturePolicy.Blocking,
+            ),
+        )
+    for transport in Transport:
+        for policy in (CapturePolicy.Lossless, CapturePolicy.LatestOnly):
+            print(
+                bench_client(
+                    f"read(1), {transport.name}, {policy.name}, {rated.rate:.0f}/s",
+                    rated,
+                    num_pulses // 4,
+                    1,
+                    transport,
+                    policy,
+                ),
+            )
+    for extension in (".npy", ".pkl"):
+        print(bench_pipeline(f"main.main, {extension}, unlimited rate", unlimited, duration, batch_size, extension))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import Event, Process, Queue
+from pathlib import Path
+from queue import Empty
+
+from teraflashpy.core import CapturePolicy, Transport
+from teraflashpy.daemon import AcquisitionDaemon, Subscription, daemon_health, stop_daemon
+
+PORT = 16007
+DURATION = 3.0
+
+
+def _subscribe(
+    address: Path,
+    transport: Transport,
+    delay: float,
+    ready: Event,
+    results: Queue,
+) -> None:
+    """Reads for `DURATION` seconds, taking `delay` seconds over every frame, and reports frames read and dropped."""
+    with Subscription(address, CapturePolicy.LatestOnly, 16, transport) as subscription:
+        ready.wait()
+        read = 0
+        start = time.monotonic()
+        while time.monotonic() - start < DURATION:
+            try:
+                subscription.read_frame(timeout=1)
+            except Empty:
+                continue
+            read += 1
+            time.sleep(delay)
+        results.put((delay, read, subscription.dropped))
+
+
+def _measure(address: Path, transport: Transport, num_fast: int, num_slow: int) -> str:
+    ready, results = Event(), Queue()
+    delays = [0.0] * num_fast + [0.05] * num_slow
+    subscribers = [Process(target=_subscribe, args=(address, transport, delay, ready, results)) for delay in delays]
+    for subscriber in subscribers:
+        subscriber.start()
+    while len(daemon_health(address).subscribers) < len(subscribers):
+        time.sleep(0.01)
+
+    frames = daemon_health(address).frames
+    ready.set()
+    time.sleep(DURATION)
+    captured = (daemon_health(address).frames - frames) / DURATION
+    fast, slow = [], []
+    for _ in subscribers:
+        delay, read, dropped = results.get()
+        percent = 100 * dropped / max(read + dropped, 1)
+        (slow if delay else fast).append(f"{read / DURATION:6.0f}/s, {percent:4.1f}% dropped")
+    for subscriber in subscribers:
+        subscriber.join()
+    return f"captured {captured:6.0f} frames/s; fast {'; '.join(fast) or '-'}; slow {'; '.join(slow) or '-'}"
+
+
+def main() -> None:
+    # 2000 samples, about 40 kB a frame, as fast as the simulator sends them.
+    command = [sys.executable, "-m", "teraflashpy", "simulate", "--port", str(PORT), "--rate", "0"]
+    simulator = subprocess.Popen(command)  # noqa: S603
+    time.sleep(1.5)
+    address = Path(tempfile.gettempdir()) / "teraflashpy-fan-out.sock"
+    daemon = Process(target=AcquisitionDaemon(port=PORT, address=address).run)
+    daemon.start()
+    try:
+        time.sleep(1.0)
+        print(f"{'no subscribers':>36}: {_measure(address, Transport.Queue, 0, 0)}")
+        for transport in Transport:
+            for num_fast, num_slow in ((1, 0), (1, 1), (4, 1)):
+                label = f"{transport.name}, {num_fast} fast + {num_slow} slow"
+                print(f"{label:>36}: {_measure(address, transport, num_fast, num_slow)}")
+    finally:
+        stop_daemon(address)
+        daemon.join()
+        simulator.terminate()
+        simulator.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from teraflashpy.core import LENGTH_PREFIX_SIZE
+from teraflashpy.framing import FrameParser
+
+
+def make_stream(num_frames: int, num_samples: int) -> tuple[bytes, list[bytes]]:
+    frames = []
+    for index in range(num_frames):
+        rows = "".join(f"{850 + 0.05 * sample:.3f},{index % 7 - 3.1:.6f}\r\n" for sample in range(num_samples))
+        frames.append(f"Time/ps, Signal/nA\r\n{rows}".encode())
+    stream = b"".join(f"{len(frame):0{LENGTH_PREFIX_SIZE}d}".encode() + frame for frame in frames)
+    return stream, frames
+
+
+async def _read_frames_legacy(stream: bytes, num_frames: int) -> list[bytes]:
+    """The original framing in `_collect_data`: two `readexactly` calls per frame."""
+    reader = asyncio.StreamReader(limit=len(stream) + 1)
+    reader.feed_data(stream)
+    reader.feed_eof()
+    frames = []
+    for _ in range(num_frames):
+        length_data_bytes = await reader.readexactly(LENGTH_PREFIX_SIZE)
+        length_data = int(length_data_bytes.decode("utf-8"))
+        frames.append(await reader.readexactly(length_data))
+    return frames
+
+
+def _read_frames_parser(stream: bytes, chunk_size: int) -> list[bytes]:
+    parser = FrameParser()
+    frames = []
+    for start in range(0, len(stream), chunk_size):
+        frames.extend(parser.feed(stream[start : start + chunk_size]))
+    return frames
+
+
+def main(num_frames: int = 2000, num_samples: int = 200, chunk_size: int = 1 << 16) -> None:
+    stream, expected = make_stream(num_frames, num_samples)
+    print(f"Replaying {num_frames} frames of {len(expected[0])} bytes ({len(stream) / 2**20:.1f} MiB)")
+
+    start = time.perf_counter()
+    legacy = asyncio.run(_read_frames_legacy(stream, num_frames))
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parsed = _read_frames_parser(stream, chunk_size)
+    parser_time = time.perf_counter() - start
+
+    if legacy != expected or parsed != expected:
+        msg = "Framing did not reproduce the original frames."
+        raise AssertionError(msg)
+    for name, elapsed in (("readexactly", legacy_time), (f"FrameParser, {chunk_size} byte chunks", parser_time)):
+        print(f"{name:>32}: {num_frames / elapsed:10.0f} frames/s, {len(stream) / elapsed / 2**20:8.1f} MiB/s")
+
+    # Corrupt the length prefix of every tenth frame; the parser should lose exactly those frames.
+    corrupted = bytearray(stream)
+    offset = 0
+    for index, frame in enumerate(expected):
+        if index % 10 == 5:  # noqa: PLR2004
+            corrupted[offset : offset + 2] = b"xx"
+        offset += LENGTH_PREFIX_SIZE + len(frame)
+    logging.getLogger("teraflashpy.framing").setLevel(logging.ERROR)
+    parser = FrameParser()
+    recovered = parser.feed(bytes(corrupted))
+    survivors = [frame for index, frame in enumerate(expected) if index % 10 != 5]  # noqa: PLR2004
+    print(
+        f"Corrupted stream: recovered {len(recovered)}/{len(survivors)} intact frames, "
+        f"{parser.resyncs} resyncs, {parser.bytes_skipped} bytes skipped, exact: {recovered == survivors}",
+    )
+
+
+if __name__ == "__main__":
+    main()
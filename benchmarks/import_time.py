@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import statistics
+import subprocess
+import sys
+import time
+
+CASES = {
+    "python": ["-c", "pass"],
+    "import teraflashpy": ["-c", "import teraflashpy"],
+    "from teraflashpy import Command": ["-c", "from teraflashpy import Command"],
+    "import teraflashpy.client": ["-c", "import teraflashpy.client"],
+    "cli: command": ["-m", "teraflashpy", "command", "SYSTEM : STOP"],
+    "cli: --help": ["-m", "teraflashpy", "--help"],
+}
+
+
+def wall_time(args: list[str], num_repeats: int) -> float:
+    times = []
+    for _ in range(num_repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, capture_output=True)  # noqa: S603
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(num_repeats: int = 15) -> None:
+    # Wall time of a fresh interpreter, which is what a shell loop pays per call.
+    for name, args in CASES.items():
+        print(f"{name:>32}: {wall_time(args, num_repeats) * 1e3:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
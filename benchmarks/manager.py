@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import contextlib
+import time
+
+from teraflashpy.manager import AcquisitionManager, Instrument
+from teraflashpy.simulator import BackgroundSimulator, SimulatorConfig
+
+
+def bench(num_instruments: int, rate: float, num_batches: int, batch_size: int) -> None:
+    with contextlib.ExitStack() as stack:
+        simulators = [
+            stack.enter_context(BackgroundSimulator(SimulatorConfig(rate=rate, seed=index), port=0))
+            for index in range(num_instruments)
+        ]
+        instruments = [Instrument(name=f"tf{index}", port=simulator.port) for index, simulator in enumerate(simulators)]
+        manager = AcquisitionManager(instruments, batch_size=batch_size)
+        start = time.perf_counter()
+        stats = manager.collect(num_batches=num_batches)
+        elapsed = time.perf_counter() - start
+    total = sum(session.pulses for session in stats.values())
+    print(f"{num_instruments:>2} instruments at {rate:.0f} pulses/s each: {total / elapsed:7.0f} pulses/s in total")
+
+
+def main(rate: float = 200, num_batches: int = 10, batch_size: int = 50) -> None:
+    for num_instruments in (1, 2, 4, 8):
+        bench(num_instruments, rate, num_batches, batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import timeit
+from time import perf_counter
+
+from teraflashpy.metrics import Histogram, Metrics, render_prometheus
+
+
+def main(number: int = 200_000) -> None:
+    histogram = Histogram("latency", "")
+    values = [1e-6 * (index % 5000) for index in range(number)]
+    iterator = iter(values)
+    observe = timeit.timeit(lambda: histogram.observe(next(iterator)), number=number)
+    timed = timeit.timeit(lambda: histogram.observe(perf_counter() - perf_counter()), number=number)
+    print(f"{'observe':>30}: {observe / number * 1e9:6.0f} ns")
+    print(f"{'time and observe':>30}: {timed / number * 1e9:6.0f} ns")
+
+    # One registry per instrument, as a scrape of a station with eight instruments would render them.
+    registries = []
+    for index in range(8):
+        metrics = Metrics(labels={"instrument": f"tf{index}"})
+        for name in ("decode_seconds", "frame_wait_seconds", "read_seconds"):
+            metrics.histogram(name, "").observe(1e-3)
+        registries.append(metrics)
+    render = timeit.timeit(lambda: render_prometheus(registries), number=100)
+    print(f"{'render 8 registries':>30}: {render / 100 * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import re
+import timeit
+import typing
+
+from teraflashpy import Command
+from teraflashpy.commands import (
+    AcquisitionAverageInput,
+    AcquisitionBeginInput,
+    AcquisitionRangeInput,
+    CommandInput,
+    LaserSetInput,
+    NoInput,
+    SystemMonitorInput,
+)
+from teraflashpy.parse import _parse_cached, parse_string
+
+# The original implementation of `parse.parse_string`, kept for comparison.
+REGEX_EXPR = r"""
+((SYSTEM) : ((STOP)|(TELL STATUS)|((MONITOR) (\d+))|(TIA FULL)|(TIA ATN1)|(TIA ATN2)))
+|
+((LASER) : ((OFF)|(ON)|((SET) ([+-]?([0-9]*[.])?[0-9]+))))
+|
+((ACQUISITION) : (((BEGIN) ([+-]?([0-9]*[.])?[0-9]+))|((RANGE) (\d+))|(STOP)|(START)|((AVERAGE) (\d+))|(RESET AVG)))
+|
+((TRANSMISSION) : ((SLIDING)|(BLOCK)))
+""".replace("\n", "")
+
+
+def parse_string_regex(string: str) -> tuple[Command, CommandInput]:  # noqa: PLR0911
+    matches = re.findall(REGEX_EXPR, string)
+
+    for match in matches:
+        system = match[:11]
+        laser = match[11:20]
+        acquisition = match[20:36]
+        transmission = match[36:]
+        if system[0]:
+            match system:
+                case (_, "SYSTEM", "STOP", "STOP", "", "", "", "", "", "", ""):
+                    return Command.SystemStop, NoInput()
+                case (_, "SYSTEM", "TELL STATUS", "", "TELL STATUS", "", "", "", "", "", ""):
+                    return Command.SystemTellStatus, NoInput()
+                case (_, "SYSTEM", _, "", "", _, "MONITOR", code, "", "", ""):
+                    return Command.SystemMonitor, SystemMonitorInput(code=code)
+                case (_, "SYSTEM", "TIA FULL", "", "", "", "", "", "TIA FULL", "", ""):
+                    return Command.SystemTiaFull, NoInput()
+                case (_, "SYSTEM", "TIA ATN1", "", "", "", "", "", "", "TIA ATN1", ""):
+                    return Command.SystemTiaAtn1, NoInput()
+                case (_, "SYSTEM", "TIA ATN2", "", "", "", "", "", "", "", "TIA ATN2"):
+                    return Command.SystemTiaAtn2, NoInput()
+                case _:
+                    typing.assert_never(system)
+        elif laser[0]:
+            match laser:
+                case (_, "LASER", "OFF", "OFF", "", "", "", "", ""):
+                    return Command.LaserOff, NoInput()
+                case (_, "LASER", "ON", "", "ON", "", "", "", ""):
+                    return Command.LaserOn, NoInput()
+                case (_, "LASER", _, "", "", _, "SET", pump_current, _):
+                    return Command.LaserSet, LaserSetInput(pump_current=pump_current)
+                case _:
+                    typing.assert_never(laser)
+        elif acquisition[0]:
+            match acquisition:
+                case (_, "ACQUISITION", _, _, "BEGIN", start_position, _, "", "", "", "", "", "", "", "", ""):
+                    return Command.AcquisitionBegin, AcquisitionBeginInput(start_position=start_position)
+                case (_, "ACQUISITION", _, "", "", "", "", _, "RANGE", measuring_range, "", "", "", "", "", ""):
+                    return Command.AcquisitionRange, AcquisitionRangeInput(measuring_range=measuring_range)
+                case (_, "ACQUISITION", "STOP", "", "", "", "", "", "", "", "STOP", "", "", "", "", ""):
+                    return Command.AcquisitionStop, NoInput()
+                case (_, "ACQUISITION", "START", "", "", "", "", "", "", "", "", "START", "", "", "", ""):
+                    return Command.AcquisitionStart, NoInput()
+                case (_, "ACQUISITION", _, "", "", "", "", "", "", "", "", "", _, "AVERAGE", num_averages, ""):
+                    return Command.AcquisitionAverage, AcquisitionAverageInput(num_averages=num_averages)
+                case (_, "ACQUISITION", "RESET AVG", "", "", "", "", "", "", "", "", "", "", "", "", "RESET AVG"):
+                    return Command.AcquisitionResetAvg, NoInput()
+                case _:
+                    typing.assert_never(laser)
+        elif transmission[0]:
+            match transmission:
+                case (_, "TRANSMISSION", "SLIDING", "SLIDING", ""):
+                    return Command.TransmissionSliding, NoInput()
+                case (_, "TRANSMISSION", "BLOCK", "", "BLOCK"):
+                    return Command.TransmissionBlock, NoInput()
+        else:
+            msg = "Input string cannot be parsed to a command."
+            raise ValueError(msg)
+    msg = "Input string cannot be parsed to a command."
+    raise ValueError(msg)
+
+
+def make_commands(num_commands: int) -> list[str]:
+    # Only commands the original parser accepts; it could not parse "SYSTEM : MONITOR" or "ACQUISITION : BEGIN".
+    templates = [
+        "SYSTEM : STOP",
+        "SYSTEM : TELL STATUS",
+        "SYSTEM : TIA ATN1",
+        "LASER : ON",
+        "LASER : SET {:.2f}",
+        "ACQUISITION : RANGE {}",
+        "ACQUISITION : AVERAGE {}",
+        "ACQUISITION : RESET AVG",
+        "TRANSMISSION : BLOCK",
+    ]
+    commands = []
+    for index in range(num_commands):
+        template = templates[index % len(templates)]
+        commands.append(template.format(20 + index % 80) if "{" in template else template)
+    return commands
+
+
+def main(num_commands: int = 2000, repeat: int = 5) -> None:
+    commands = make_commands(num_commands)
+    if [parse_string_regex(command) for command in commands] != [parse_string(command) for command in commands]:
+        msg = "The parsers disagree."
+        raise AssertionError(msg)
+
+    def parse_uncached() -> None:
+        for command in commands:
+            _parse_cached.__wrapped__(command)
+
+    print(f"Parsing {num_commands} commands, {len(set(commands))} distinct")
+    for name, function in (
+        ("regex", lambda: [parse_string_regex(command) for command in commands]),
+        ("dispatch table, uncached", parse_uncached),
+        ("dispatch table, cached", lambda: [parse_string(command) for command in commands]),
+    ):
+        elapsed = min(timeit.repeat(function, number=1, repeat=repeat))
+        print(f"{name:>28}: {elapsed / num_commands * 1e6:8.2f} us per command")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+from teraflashpy import Command
+from teraflashpy.async_remote import AsyncUdpRemoteControl
+from teraflashpy.oem_commands import AverageInput, RcCommand, RdCommand
+from teraflashpy.remote import Request, TcpRemoteControl, UdpRemoteControl
+from teraflashpy.simulator import BackgroundSimulator, DeviceSimulator, RemoteControlSimulator
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def requests(num_requests: int) -> list[Request]:
+    # Alternate settings and read-backs, as a control script would.
+    return [
+        (RcCommand.Average, AverageInput(averaging_number=index % 100 + 1)) if index % 2 else RdCommand.DesiredAverage
+        for index in range(num_requests)
+    ]
+
+
+def report(name: str, num_requests: int, run: Callable[[], object]) -> None:
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>40}: {num_requests / elapsed:9.0f} commands/s")
+
+
+def bench_udp(num_requests: int, delay: float) -> None:
+    print(f"UDP, {delay * 1e3:.1f} ms until each reply")
+    batch = requests(num_requests)
+    simulator = RemoteControlSimulator(port=0, reply_port=0, delay=delay)
+    with BackgroundSimulator(simulator=simulator):
+
+        def socket_per_command() -> None:
+            for request in batch:
+                with UdpRemoteControl(device_port=simulator.port, read_port=0, write_port=0) as remote:
+                    simulator.reply_port = remote.read_port
+                    remote.send_many([request])
+
+        report("new sockets for every command", num_requests, socket_per_command)
+
+        with UdpRemoteControl(device_port=simulator.port, read_port=0, write_port=0) as remote:
+            simulator.reply_port = remote.read_port
+            report("send, one at a time", num_requests, lambda: [remote.send_many([request]) for request in batch])
+            for window in (4, 16, 64):
+                remote.window = window
+                report(f"send_many, window {window}", num_requests, lambda: remote.send_many(batch))
+
+        async def send_async() -> None:
+            async with AsyncUdpRemoteControl(device_port=simulator.port, read_port=0, write_port=0) as remote:
+                simulator.reply_port = remote.read_port
+                await remote.send_many(batch)
+
+        report("async send_many, window 16", num_requests, lambda: asyncio.run(send_async()))
+
+
+def bench_tcp(num_requests: int) -> None:
+    print("TCP")
+    batch = [Command.AcquisitionResetAvg] * num_requests
+    remote = TcpRemoteControl(host="127.0.0.1", port=0)
+    remote.listen()
+    with BackgroundSimulator(simulator=DeviceSimulator(port=remote.port)), remote:
+        report("send, one at a time", num_requests, lambda: [remote.send(command) for command in batch])
+        report("send_many, window 16", num_requests, lambda: remote.send_many(batch))
+
+
+def main(num_requests: int = 2000) -> None:
+    bench_udp(num_requests, 0)
+    bench_udp(num_requests // 10, 1e-3)
+    bench_tcp(num_requests)
+
+
+if __name__ == "__main__":
+    main()
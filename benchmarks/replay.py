@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import tempfile
+import time
+from pathlib import Path
+
+from teraflashpy import CapturePolicy, Transport
+from teraflashpy.client import TeraflashProClient
+from teraflashpy.decode import decode_pulse
+from teraflashpy.recording import FrameLog
+from teraflashpy.simulator import BackgroundSimulator, SimulatorConfig
+
+
+def record(path: Path, num_pulses: int, num_samples: int) -> None:
+    config = SimulatorConfig(num_samples=num_samples, rate=None, seed=0)
+    with (
+        BackgroundSimulator(config, port=0) as simulator,
+        TeraflashProClient(capture_policy=CapturePolicy.Blocking, port=simulator.port, record_to=path) as client,
+    ):
+        client.read(num_pulses)
+
+
+def main(num_pulses: int = 2000, num_samples: int = 2000, batch_size: int = 100) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        path = Path(folder) / "pulses.tfraw"
+        start = time.perf_counter()
+        record(path, num_pulses, num_samples)
+        print(f"Recorded {num_pulses} pulses of {num_samples} samples in {time.perf_counter() - start:.2f} s")
+
+        with FrameLog(path) as log:
+            start = time.perf_counter()
+            for frame, _ in log:
+                decode_pulse(frame)
+                frame.release()
+            elapsed = time.perf_counter() - start
+        print(f"{'decode_pulse straight from the log':>44}: {len(log) / elapsed:9.0f} pulses/s")
+
+        for transport in Transport:
+            with TeraflashProClient(
+                transport=transport,
+                capture_policy=CapturePolicy.Blocking,
+                replay_from=path,
+                replay_speed=None,
+            ) as client:
+                client.read(1)
+                start = time.perf_counter()
+                for _ in range((num_pulses - 1) // batch_size):
+                    client.read(batch_size)
+                elapsed = time.perf_counter() - start
+            num_read = (num_pulses - 1) // batch_size * batch_size
+            print(f"{f'read, {transport.name}, replayed':>44}: {num_read / elapsed:9.0f} pulses/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import timeit
+
+from teraflashpy.commands import run_many
+from teraflashpy.parse import parse_script
+from teraflashpy.states.laser import AcquisitionState, AcquisitionStatus, LaserState, LaserStatus
+from teraflashpy.states.system import SystemState, SystemStatus
+from teraflashpy.states.trans_impedance_amplifier import TransImpedanceAmplifierStatus
+from teraflashpy.states.transfer import TransferStatus
+
+SCRIPT = """
+LASER : ON
+LASER : SET 30
+ACQUISITION : BEGIN 900.1
+ACQUISITION : AVERAGE 100
+ACQUISITION : START
+SYSTEM : TIA ATN1
+ACQUISITION : STOP
+ACQUISITION : RANGE 120
+TRANSMISSION : SLIDING
+LASER : OFF
+"""
+
+
+def main(num_repeats: int = 100, number: int = 20) -> None:
+    state = SystemState(
+        status=SystemStatus.On,
+        laser_state=LaserState(
+            status=LaserStatus.Off,
+            pump_current=50,
+            transfer_status=TransferStatus.Block,
+            tia_status=TransImpedanceAmplifierStatus.Medium,
+        ),
+        acquisition_state=AcquisitionState(
+            state=AcquisitionStatus.Off,
+            start_position=850,
+            measuring_range=100,
+            num_averages=1,
+        ),
+    )
+    commands = parse_script(SCRIPT) * num_repeats
+
+    # What every command cost before: a deep copy of the whole state.
+    deep_copy = timeit.timeit(lambda: state.model_copy(update={"status": SystemStatus.On}, deep=True), number=5000)
+    print(f"{'deep copy of the state':>30}: {deep_copy / 5000 * 1e6:6.2f} us")
+    elapsed = timeit.timeit(lambda: run_many(state, commands), number=number)
+    print(f"{'run_many, per command':>30}: {elapsed / number / len(commands) * 1e6:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+import numpy as np
+from teraflashpy.schedule import FixedRate, Scheduler
+
+
+def main(num_ticks: int = 200, period: float = 0.02) -> None:
+    # Stands in for reading and submitting a batch, which takes a varying while.
+    work = np.random.default_rng(0).uniform(0.002, 0.008, num_ticks)
+
+    start = time.monotonic()
+    for index in range(num_ticks):
+        last_start = time.monotonic()
+        time.sleep(work[index])
+        time.sleep(period)
+    drift = last_start - start - (num_ticks - 1) * period
+    print(f"{'work, then sleep':>20}: last tick {drift * 1e3:7.1f} ms behind schedule after {num_ticks} ticks")
+
+    scheduler = Scheduler(FixedRate(timedelta(seconds=period)), max_ticks=num_ticks)
+    start = time.monotonic()
+    for tick in scheduler:
+        last_start = time.monotonic()
+        time.sleep(work[tick.index])
+    drift = last_start - start - (num_ticks - 1) * period
+    stats = scheduler.stats
+    print(
+        f"{'Scheduler':>20}: last tick {drift * 1e3:7.1f} ms behind schedule after {num_ticks} ticks, "
+        f"lateness p50 {stats.lateness_p50 * 1e6:.0f} us, p99 {stats.lateness_p99 * 1e6:.0f} us",
+    )
+
+
+if __name__ == "__main__":
+    main()
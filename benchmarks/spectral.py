@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import timeit
+
+import numpy as np
+from teraflashpy.output import PulseBatch
+from teraflashpy.spectral import SpectralProcessor
+
+
+def make_batch(num_pulses: int, num_samples: int) -> PulseBatch:
+    rng = np.random.default_rng(0)
+    time = (850 + 0.05 * np.arange(num_samples)).astype(np.float32)
+    center = time[num_samples // 3]
+    signal = -100 * (time - center) / 0.4 * np.exp(-0.5 * ((time - center) / 0.4) ** 2)
+    return PulseBatch(
+        timestamps=np.zeros(num_pulses, dtype="datetime64[us]"),
+        header=["Time/ps", "Signal/nA"],
+        time=time,
+        magnitude=(signal + rng.normal(0, 0.5, (num_pulses, num_samples))).astype(np.float32),
+    )
+
+
+def spectra_per_pulse(batch: PulseBatch) -> list[np.ndarray]:
+    """What users did before: window, frequency axis and FFT computed again for every pulse."""
+    spectra = []
+    for pulse in batch:
+        dt = float(pulse.time[1] - pulse.time[0])
+        window = np.hanning(len(pulse.magnitude))
+        np.fft.rfftfreq(len(pulse.magnitude), d=dt)
+        spectra.append(np.fft.rfft(pulse.magnitude * window))
+    return spectra
+
+
+def main(num_pulses: int = 1000, num_samples: int = 2000, repeat: int = 5) -> None:
+    batch = make_batch(num_pulses, num_samples)
+    processor = SpectralProcessor()
+    expected = np.array(spectra_per_pulse(batch))
+    if not np.allclose(processor.transform(batch).spectrum, expected, rtol=1e-4, atol=1e-3):
+        msg = "Batched spectra differ from the per-pulse spectra."
+        raise AssertionError(msg)
+
+    print(f"Spectra of {num_pulses} pulses of {num_samples} samples")
+    for name, function in (
+        ("per pulse", lambda: spectra_per_pulse(batch)),
+        ("SpectralProcessor.transform", lambda: processor.transform(batch)),
+    ):
+        elapsed = min(timeit.repeat(function, number=1, repeat=repeat))
+        print(f"{name:>28}: {elapsed * 1e3:8.1f} ms, {num_pulses / elapsed:9.0f} pulses/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import time
+
+from teraflashpy.mirror import StateMirror
+from teraflashpy.oem_commands import AverageInput, RcCommand
+from teraflashpy.remote import UdpRemoteControl
+from teraflashpy.simulator import BackgroundSimulator, RemoteControlSimulator
+
+
+def main(num_steps: int = 200, delay: float = 1e-3) -> None:
+    # A control loop that changes a setting, then checks the whole state before going on.
+    simulator = RemoteControlSimulator(port=0, reply_port=0, delay=delay)
+    with (
+        BackgroundSimulator(simulator=simulator),
+        UdpRemoteControl(device_port=simulator.port, read_port=0, write_port=0) as remote,
+    ):
+        simulator.reply_port = remote.read_port
+        for name, max_age in (("without a mirror", 0.0), ("with a mirror", 10.0)):
+            mirror = StateMirror(remote, max_age=max_age)
+            sent = remote.sent
+            start = time.perf_counter()
+            for step in range(num_steps):
+                mirror.send(RcCommand.Average, AverageInput(averaging_number=step + 1))
+                mirror.system_state()
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:>20}: {num_steps / elapsed:7.0f} steps/s, "
+                f"{(remote.sent - sent) / num_steps:.1f} round-trips per step",
+            )
+
+
+if __name__ == "__main__":
+    main()
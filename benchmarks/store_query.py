@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from teraflashpy.convert import read_pulses
+from teraflashpy.output import PulseBatch
+from teraflashpy.store import PulseArchive
+from teraflashpy.writers import PickleWriter, TfpWriter
+
+START = np.datetime64("2026-01-01T10:00:00", "us")
+
+
+def save(folder: Path, writer: type[PickleWriter | TfpWriter], num_files: int, pulses_per_file: int) -> None:
+    # An hour of measurements, one file per measurement as `main.main` saves them; the query asks for 5 minutes.
+    rng = np.random.default_rng(0)
+    period = np.timedelta64(3600 * 10**6 // (num_files * pulses_per_file), "us")
+    time_axis = np.arange(2000, dtype=np.float32)
+    for index in range(num_files):
+        timestamps = START + (index * pulses_per_file + np.arange(pulses_per_file)) * period
+        magnitude = rng.random((pulses_per_file, len(time_axis)), dtype=np.float32)
+        (folder / f"{index:04d}").mkdir()
+        with writer(folder / f"{index:04d}", fsync=False) as file_writer:
+            file_writer.write(PulseBatch(timestamps=timestamps, header=[], time=time_axis, magnitude=magnitude))
+
+
+def glob_and_load(folder: Path, start: np.datetime64, end: np.datetime64) -> int:
+    num_pulses = 0
+    for path in sorted(folder.rglob("*.pkl")):
+        for batch in read_pulses(path):
+            selected = (batch.timestamps >= start) & (batch.timestamps < end)
+            num_pulses += int(batch.magnitude[selected].sum() > 0) * int(selected.sum())
+    return num_pulses
+
+
+def main(num_files: int = 240, pulses_per_file: int = 25) -> None:
+    start, end = START + np.timedelta64(10, "m"), START + np.timedelta64(15, "m")
+    with tempfile.TemporaryDirectory() as folder:
+        save(Path(folder), PickleWriter, num_files, pulses_per_file)
+        began = time.perf_counter()
+        num_pulses = glob_and_load(Path(folder), start, end)
+        print(f"{'glob and load .pkl':>20}: {num_pulses} pulses in {(time.perf_counter() - began) * 1e3:6.2f} ms")
+
+    with tempfile.TemporaryDirectory() as folder:
+        save(Path(folder), TfpWriter, num_files, pulses_per_file)
+        began = time.perf_counter()
+        with PulseArchive(Path(folder)) as archive:
+            print(f"{'open .tfp archive':>20}: {num_files} stores in {(time.perf_counter() - began) * 1e3:6.2f} ms")
+            began = time.perf_counter()
+            num_pulses = sum(int(batch.magnitude.sum() > 0) * len(batch) for batch in archive.query(start, end))
+            print(f"{'query .tfp archive':>20}: {num_pulses} pulses in {(time.perf_counter() - began) * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
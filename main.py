@@ -1,75 +1,77 @@
 from __future__ import annotations
 
-import time
+import logging
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import TYPE_CHECKING, Literal
+from typing import Literal
 
+from teraflashpy import LOCALHOST
 from teraflashpy.client import TeraflashProClient
+from teraflashpy.core import WorkerKind
+from teraflashpy.metrics import LogSink, Metrics, MetricsReporter, MetricsSink, PrometheusSink
+from teraflashpy.pipeline import BackgroundWriter, Backpressure
+from teraflashpy.schedule import FixedRate, Overrun, Schedule, Scheduler
+from teraflashpy.writers import open_writer
 
-if TYPE_CHECKING:
-    from teraflashpy.output import PulseData
+logger = logging.getLogger(__name__)
 
 
-def main(
+def main(  # noqa: PLR0913
     num_pulses: int,
     experiment_duration: timedelta,
     time_between_measurements: timedelta,
     data_folder: Path,
-    extension: Literal[".pkl", ".parquet", ".csv", ".json"] = ".pkl",
+    extension: Literal[".pkl", ".parquet", ".csv", ".json", ".npy", ".h5", ".tfp", ".tfz"] = ".pkl",
+    max_file_size: int | None = None,
+    max_file_age: timedelta | None = None,
+    max_pending_writes: int = 4,
+    backpressure: Backpressure = Backpressure.Block,
+    writer_worker: WorkerKind = WorkerKind.Thread,
+    host: str = LOCALHOST,
+    port: int | None = None,
+    metrics_port: int | None = None,
+    schedule: Schedule | None = None,
+    overrun: Overrun = Overrun.Skip,
 ) -> None:
-    """Collects pulses from a Toptica TeraFlash Pro and saves them to a folder."""
+    """Collects pulses from a Toptica TeraFlash Pro and saves them to a folder.
+
+    Measurements of `num_pulses` pulses start every `time_between_measurements`, counted from the start rather than
+    from the end of the previous one, or on `schedule` if given, such as a `Burst` or a `Cron`. A measurement still
+    running at the next deadline is handled according to `overrun`.
+
+    Metrics are logged at debug level every minute and, with `metrics_port`, served for Prometheus on that port.
+    """
     start_time = datetime.now(tz=timezone.utc)
-    end_time = start_time + experiment_duration
 
     foldername = start_time.strftime("%Y%m%d")
     data_folder = data_folder / foldername
     data_folder.mkdir(exist_ok=True, parents=True)
 
-    with TeraflashProClient() as client:
-        while datetime.now(tz=timezone.utc) < end_time:
-            pulses = client.read(num_pulses)
-
-            scan_filename = datetime.now(tz=timezone.utc).strftime("%H-%M-%S-%f")
-            save_path = (data_folder / scan_filename).with_suffix(extension)
-
-            _write_to_file(pulses, save_path)
-            time.sleep(time_between_measurements.total_seconds())
-
-
-def _write_to_file(pulses: list[PulseData], save_path: Path) -> None:
-    extension = save_path.suffix
-    if extension == ".pkl":
-        import pickle
-
-        with save_path.open("wb") as handle:
-            pickle.dump([pulse.model_dump() for pulse in pulses], handle)
-    elif extension == ".parquet":
-        try:
-            import pyarrow as pa
-            import pyarrow.parquet as pq
-        except ImportError as e:
-            msg = "Could not import module `pyarrow`. To save data to parquet, install it with `pip install pyarrow`."
-            raise ImportError(
-                msg,
-                name=e.name,
-                path=e.path,
-            ) from e
-
-        table = pa.Table.from_pylist([pulse.model_dump() for pulse in pulses])
-        pq.write_table(table, save_path)
-    elif extension == ".csv":
-        import csv
-
-        with save_path.open("w", newline="") as handle:
-            writer = csv.DictWriter(handle, fieldnames=list(pulses[0].model_fields.keys()))
-            writer.writeheader()
-            writer.writerows([pulse.model_dump() for pulse in pulses])
-    elif extension == ".json":
-        import json
-
-        with save_path.open("w") as handle:
-            json.dump([pulse.model_dump(mode="json") for pulse in pulses], handle)
+    file_writer = open_writer(extension, data_folder, max_bytes=max_file_size, max_age=max_file_age)
+    metrics = Metrics()
+    scheduler = Scheduler(
+        FixedRate(time_between_measurements) if schedule is None else schedule,
+        overrun,
+        duration=experiment_duration,
+        metrics=metrics,
+    )
+    sinks: list[MetricsSink] = [LogSink(logging.DEBUG)]
+    if metrics_port is not None:
+        sinks.append(PrometheusSink(port=metrics_port))
+    with (
+        TeraflashProClient(host=host, port=port, metrics=metrics) as client,
+        BackgroundWriter(file_writer, max_pending_writes, backpressure, writer_worker, metrics=metrics) as writer,
+        MetricsReporter([metrics], sinks, interval=60),
+    ):
+        for _ in scheduler:
+            # A batch ends early when the header changes, and the writers start a new file for the pulses after it.
+            remaining = num_pulses
+            while remaining:
+                pulses = client.read(remaining)
+                writer.submit(pulses)
+                remaining -= len(pulses)
+            logger.debug("%.0f batches waiting to be written, %d dropped.", writer.pending, writer.dropped)
+    logger.info("Measured on schedule: %s", scheduler.stats)
 
 
 if __name__ == "__main__":
@@ -1,23 +1,67 @@
+from __future__ import annotations
+
+import importlib
 import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # For type checkers, which do not follow `__getattr__`.
+    from teraflashpy.commands import Command  # noqa: TCH004
+    from teraflashpy.core import (  # noqa: TCH004
+        ACQUISITION_PORT_MAP,
+        LOCALHOST,
+        AcquisitionMode,
+        CapturePolicy,
+        Config,
+        Transport,
+        WorkerKind,
+    )
+    from teraflashpy.oem_commands import RcCommand, RdCommand  # noqa: TCH004
+    from teraflashpy.output import PulseData  # noqa: TCH004
 
-from teraflashpy.commands import Command
-from teraflashpy.core import (
-    ACQUISITION_PORT_MAP,
-    LOCALHOST,
-    AcquisitionMode,
-    Config,
-)
-from teraflashpy.output import PulseData
+# The names are imported on first use (PEP 562), so `import teraflashpy` does not pull in pydantic, numpy and
+# pydantic_numpy before something needs them.
+_LAZY = {
+    "ACQUISITION_PORT_MAP": "teraflashpy.core",
+    "LOCALHOST": "teraflashpy.core",
+    "AcquisitionMode": "teraflashpy.core",
+    "CapturePolicy": "teraflashpy.core",
+    "Command": "teraflashpy.commands",
+    "Config": "teraflashpy.core",
+    "PulseData": "teraflashpy.output",
+    "Transport": "teraflashpy.core",
+    "RcCommand": "teraflashpy.oem_commands",
+    "RdCommand": "teraflashpy.oem_commands",
+    "WorkerKind": "teraflashpy.core",
+}
 
 __all__ = [
     "ACQUISITION_PORT_MAP",
     "LOCALHOST",
     "AcquisitionMode",
+    "CapturePolicy",
     "Command",
     "Config",
     "PulseData",
-    # "RcCommand",
-    # "RdCommand",
+    "Transport",
+    "RcCommand",
+    "RdCommand",
+    "WorkerKind",
 ]
 
+
+def __getattr__(name: str) -> object:
+    if name not in _LAZY:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(importlib.import_module(_LAZY[name]), name)
+    # Cache the name in the module, so later lookups do not come back here.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__])
+
+
 logging.getLogger(__name__).addHandler(logging.NullHandler())
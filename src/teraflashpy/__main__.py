@@ -1,29 +1,31 @@
-import typer
+from __future__ import annotations
 
-from teraflashpy.commands import Command
+import sys
 
-app = typer.Typer()
 
+def main(argv: list[str] | None = None) -> None:
+    """Runs the command line interface.
 
-@app.command()
-def command(command: Command = typer.Argument()) -> None:
-    print(command)
+    Typer and rich take far longer to import than `command` takes to run, which adds up in shell loops that call the
+    CLI once per command. A plain `command COMMAND` is therefore answered here, importing only `teraflashpy.commands`.
+    Everything else, including help and invalid commands, goes to the Typer app in `teraflashpy.cli`.
+    """
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) == 2 and args[0] == "command" and not args[1].startswith("-"):  # noqa: PLR2004
+        from teraflashpy.commands import Command
 
+        try:
+            command = Command(args[1])
+        except ValueError:
+            pass
+        else:
+            print(command)  # noqa: T201
+            return
 
-# @app.command()
-# def main(command: Command = typer.Argument(default="SYSTEM : STOP", help="Model to choose")) -> None:
-#     state = SystemState(
-#         status=SystemStatus.On,
-#         laser_state=LaserState(
-#             status=LaserStatus.Off,
-#             pump_current=50,
-#             transfer_status=TransferStatus.Block,
-#             tia_status=TransImpedanceAmplifierStatus.Medium,
-#         ),
-#     )
-#     result, state, value = run(state, Command.SystemTellStatus, NoInput)
-#     print(state)
+    from teraflashpy.cli import app
+
+    app(args)
 
 
 if __name__ == "__main__":
-    app()
+    main()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Self
+
+from teraflashpy.core import ACQUISITION_PORT_MAP, LOCALHOST, AcquisitionMode
+from teraflashpy.decode import decode_pulse
+from teraflashpy.framing import FrameParser
+from teraflashpy.output import PulseBatch, PulseBatchBuilder, PulseData, PulseFormatChangedError
+from teraflashpy.statistics import Accumulator, RunningStatistics
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from types import TracebackType
+
+    import numpy as np
+
+
+class AsyncTeraflashProClient:
+    """Reads pulses on the caller's event loop, without a backend process in between.
+
+    Pulses are read from the socket only while the caller consumes them, so a slow consumer pushes back on the
+    instrument through TCP flow control rather than losing pulses. A pulse is timestamped when the read that completed
+    its frame returns, so frames that arrive in the same read of up to `read_size` bytes share a timestamp, as they do
+    with `TeraflashProClient`.
+    """
+
+    def __init__(
+        self,
+        host: str = LOCALHOST,
+        acquisition_mode: AcquisitionMode = AcquisitionMode.Asynchronous,
+        port: int | None = None,
+    ) -> None:
+        self.host = host
+        self.port = ACQUISITION_PORT_MAP[acquisition_mode] if port is None else port
+        self.received = 0
+        self.read_size = 1 << 16
+        self.parser = FrameParser()
+        self._frames: deque[tuple[bytes, datetime]] = deque()
+        self._carried: deque[tuple[datetime, tuple[list[str], np.ndarray, np.ndarray]]] = deque()
+
+    async def __aenter__(self) -> Self:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def read_frame(self) -> tuple[bytes, datetime]:
+        while not self._frames:
+            # Reading whatever has arrived in one go yields every frame in it for a single await.
+            chunk = await self.reader.read(self.read_size)
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", None)
+            timestamp = datetime.now(tz=timezone.utc)
+            self._frames.extend((frame, timestamp) for frame in self.parser.feed(chunk))
+        self.received += 1
+        return self._frames.popleft()
+
+    async def stream(self) -> AsyncIterator[PulseData]:
+        """Yields pulses as they arrive, starting with any that `read` or `accumulate` carried over."""
+        while True:
+            timestamp, (header, time, magnitude) = await self._next_pulse(None)
+            # `decode_pulse` already returns float32 arrays, so there is nothing left to validate.
+            yield PulseData.model_construct(timestamp=timestamp, header=header, time=time, magnitude=magnitude)
+
+    async def _next_pulse(self, timeout: float | None) -> tuple[datetime, tuple[list[str], np.ndarray, np.ndarray]]:
+        if self._carried:
+            return self._carried.popleft()
+        # Not `wait_for`, which before Python 3.12 swallows a cancellation that comes as the frame arrives.
+        async with asyncio.timeout(timeout):
+            pulse_bytes, timestamp = await self.read_frame()
+        return timestamp, decode_pulse(pulse_bytes)
+
+    async def read(self, num_pulses: int, timeout: float | None = 20) -> PulseBatch:
+        """Returns the next `num_pulses` pulses as a batch.
+
+        Pulses in a batch share a header and number of samples. When those change, the batch ends early with the
+        pulses before the change, as soon as the first pulse after it arrives, so it can be shorter than `num_pulses`.
+        That pulse is returned by the next call to `read` or `accumulate`.
+        """
+        builder = PulseBatchBuilder(num_pulses)
+        num_built = 0
+        while num_built < num_pulses:
+            pulse = await self._next_pulse(timeout)
+            timestamp, (header, time, magnitude) = pulse
+            if not builder.set(num_built, timestamp, header, time, magnitude):
+                self._carried.appendleft(pulse)
+                break
+            num_built += 1
+        return builder.build(num_built)
+
+    async def accumulate(
+        self,
+        num_pulses: int,
+        accumulator: Accumulator | None = None,
+        timeout: float | None = 20,
+    ) -> Accumulator:
+        """Folds the next `num_pulses` pulses into `accumulator`, a new `RunningStatistics` by default.
+
+        Raises `PulseFormatChangedError` at the first pulse with another header than the pulses before it in this call,
+        or another number of samples than the accumulator holds.
+        """
+        accumulator = RunningStatistics() if accumulator is None else accumulator
+        first_header = None
+        for _ in range(num_pulses):
+            pulse = await self._next_pulse(timeout)
+            _, (header, time, magnitude) = pulse
+            first_header = header if first_header is None else first_header
+            if header != first_header or magnitude.size != (accumulator.num_samples or magnitude.size):
+                self._carried.appendleft(pulse)
+                raise PulseFormatChangedError(header, magnitude.size, first_header, accumulator)
+            accumulator.update(magnitude, time)
+        return accumulator
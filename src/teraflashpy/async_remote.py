@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import socket
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import TYPE_CHECKING, Self
+
+from teraflashpy.commands import Command, CommandResult
+from teraflashpy.core import COMMAND_PORT, HOST_ADDRESS, LOCALHOST, RC_DEVICE_PORT, RC_READ_PORT, RC_WRITE_PORT
+from teraflashpy.oem_commands import RcCommand, RdCommand
+from teraflashpy.remote import (
+    MESSAGE_ANSWER,
+    MESSAGE_COMMAND,
+    MESSAGE_HEADER,
+    MESSAGE_MAGIC,
+    NOT_IDEMPOTENT,
+    AnyCommand,
+    AnyCommandInput,
+    RemoteControlError,
+    Reply,
+    Request,
+    format_command,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from types import TracebackType
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRemoteControl(ABC):
+    """Sends commands to the instrument from the caller's event loop, like `RemoteControl`.
+
+    Any number of `send`s may run at once, up to `window` of them with a request in flight. Replies are matched to
+    requests in the order they were sent. Over TCP, a request that timed out keeps its place, so a late reply to it is
+    discarded rather than handed to the request after it; over UDP, where replies get lost, it gives up its place.
+    Commands in `NOT_IDEMPOTENT` are never sent again after a timeout, as they may have been carried out.
+    """
+
+    commands: tuple[type[AnyCommand], ...]
+
+    def __init__(self, timeout: float = 1.0, retries: int = 2, window: int = 16) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self.window = window
+        self.sent = 0
+        self.retried = 0
+        self._pending: deque[asyncio.Future[str]] = deque()
+        self._in_flight = asyncio.Semaphore(window)
+
+    async def __aenter__(self) -> Self:
+        await self.open()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    @abstractmethod
+    async def open(self) -> None: ...
+
+    @abstractmethod
+    async def close(self) -> None: ...
+
+    async def send(
+        self,
+        command: AnyCommand,
+        command_input: AnyCommandInput | None = None,
+        *,
+        timeout: float | None = None,
+        check: bool = True,
+    ) -> Reply:
+        if not isinstance(command, self.commands):
+            msg = f"{type(self).__name__} cannot send {command}."
+            raise TypeError(msg)
+        timeout = self.timeout if timeout is None else timeout
+        text = format_command(command, command_input)
+        async with self._in_flight:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    logger.warning("No reply to %r within %s s, sending it again.", text, timeout)
+                    self.retried += 1
+                future = self._write(text)
+                try:
+                    raw = await asyncio.wait_for(future, timeout)
+                    break
+                except TimeoutError:
+                    self._abandon(future)
+                    if command in NOT_IDEMPOTENT:
+                        msg = f"No reply to {text!r} within {timeout} s. It may have been done, so not resending."
+                        raise TimeoutError(msg) from None
+            else:
+                msg = f"No reply to {text!r} after {self.retries + 1} attempts of {timeout} s."
+                raise TimeoutError(msg)
+        reply = Reply.parse(command, raw)
+        if check and reply.result is CommandResult.Error:
+            msg = f"{text!r} failed: {reply.raw}"
+            raise RemoteControlError(msg)
+        return reply
+
+    async def send_many(
+        self,
+        requests: Iterable[Request],
+        *,
+        timeout: float | None = None,
+        check: bool = True,
+    ) -> list[Reply]:
+        """Sends `requests` in order, keeping up to `window` in flight, and returns the replies in the same order."""
+        sends = []
+        for request in requests:
+            command, command_input = request if isinstance(request, tuple) else (request, None)
+            sends.append(asyncio.ensure_future(self.send(command, command_input, timeout=timeout, check=check)))
+        try:
+            return list(await asyncio.gather(*sends))
+        except BaseException:
+            # Like `RemoteControl.send_many`, give up on the rest once one request has failed.
+            for send in sends:
+                send.cancel()
+            await asyncio.gather(*sends, return_exceptions=True)
+            raise
+
+    def _write(self, text: str) -> asyncio.Future[str]:
+        future = asyncio.get_running_loop().create_future()
+        self._send(text.encode("ascii"))
+        self._pending.append(future)
+        self.sent += 1
+        return future
+
+    def _abandon(self, future: asyncio.Future[str]) -> None:  # noqa: B027
+        """Called when `future` has timed out. `wait_for` cancelled it, which leaves it in place for the late reply."""
+
+    def _reply(self, raw: str) -> None:
+        if not self._pending:
+            logger.warning("Discarding the unexpected reply %r.", raw)
+            return
+        future = self._pending.popleft()
+        if not future.done():
+            future.set_result(raw)
+
+    def _fail(self, exc: BaseException) -> None:
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(exc)
+
+    @abstractmethod
+    def _send(self, payload: bytes) -> None: ...
+
+
+class _ReplyProtocol(asyncio.DatagramProtocol):
+    def __init__(self, remote: AsyncUdpRemoteControl) -> None:
+        self.remote = remote
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:  # noqa: ARG002
+        self.remote._reply(data.decode("ascii", errors="replace"))  # noqa: SLF001
+
+    def error_received(self, exc: Exception) -> None:
+        logger.warning("Error on the reply socket: %s", exc)
+
+
+class AsyncUdpRemoteControl(AsyncRemoteControl):
+    """Sends OEM RC/RD commands over UDP, like `UdpRemoteControl`, which explains how `window` and lost replies mix."""
+
+    commands = (RcCommand, RdCommand)
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str = LOCALHOST,
+        device_port: int = RC_DEVICE_PORT,
+        read_port: int = RC_READ_PORT,
+        write_port: int = RC_WRITE_PORT,
+        timeout: float = 1.0,
+        retries: int = 2,
+        window: int = 16,
+    ) -> None:
+        super().__init__(timeout, retries, window)
+        self.host = host
+        self.device_port = device_port
+        self.read_port = read_port
+        self.write_port = write_port
+
+    async def open(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.reader, _ = await loop.create_datagram_endpoint(
+            lambda: _ReplyProtocol(self),
+            local_addr=(self.host, self.read_port),
+        )
+        self.writer, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol,
+            local_addr=(self.host, self.write_port),
+            remote_addr=(self.host, self.device_port),
+        )
+        self.read_port = self.reader.get_extra_info("sockname")[1]
+        self.write_port = self.writer.get_extra_info("sockname")[1]
+
+    async def close(self) -> None:
+        self.reader.close()
+        self.writer.close()
+        self._fail(ConnectionError("The remote control was closed."))
+
+    def _send(self, payload: bytes) -> None:
+        self.writer.sendto(payload)
+
+    def _abandon(self, future: asyncio.Future[str]) -> None:
+        # A reply that has not arrived in time was most likely lost, and would otherwise take the next request's reply.
+        # Unless the reply came in just as the request timed out, and has taken the future out of `_pending` already.
+        with contextlib.suppress(ValueError):
+            self._pending.remove(future)
+
+
+class AsyncTcpRemoteControl(AsyncRemoteControl):
+    """Sends `Command`s to the device over TCP, like `TcpRemoteControl`.
+
+    Once the device has closed the connection, `send` raises `ConnectionError` until the device, which keeps
+    connecting to the host, is accepted again. `open` waits for that.
+    """
+
+    commands = (Command,)
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str = HOST_ADDRESS,
+        port: int = COMMAND_PORT,
+        connect_timeout: float | None = 30,
+        timeout: float = 1.0,
+        retries: int = 2,
+        window: int = 16,
+    ) -> None:
+        super().__init__(timeout, retries, window)
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.server: asyncio.Server | None = None
+        self._connected: asyncio.Future[asyncio.StreamWriter] | None = None
+        self._reading: asyncio.Task | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def listen(self) -> None:
+        """Starts listening for the device; `port` is the bound port afterwards. Called by `open` if needed."""
+        self._connected = asyncio.get_running_loop().create_future()
+        self.server = await asyncio.start_server(self._accept, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def open(self) -> None:
+        if self.server is None:
+            await self.listen()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._connected), self.connect_timeout)
+        except TimeoutError:
+            await self.close()
+            msg = f"The device did not connect to {self.host}:{self.port} within {self.connect_timeout} s."
+            raise TimeoutError(msg) from None
+
+    async def close(self) -> None:
+        if self._reading is not None:
+            self._reading.cancel()
+            await asyncio.gather(self._reading, return_exceptions=True)
+            self._reading = None
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        self._fail(ConnectionError("The remote control was closed."))
+
+    def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self._connected is None or self._connected.done():
+            logger.warning("Refusing a second connection from %s:%d.", *writer.get_extra_info("peername")[:2])
+            writer.close()
+            return
+        writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        logger.info("Device connected from %s:%d.", *writer.get_extra_info("peername")[:2])
+        # A task of our own rather than the server's, so that `close` can cancel it and collect the cancellation.
+        self._reading = asyncio.create_task(self._read_replies(reader, writer))
+        self.writer = writer
+        self._connected.set_result(writer)
+
+    async def _read_replies(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                header = await reader.readexactly(MESSAGE_HEADER.size)
+                *magic, code, _, length = MESSAGE_HEADER.unpack(header)
+                if tuple(magic) != MESSAGE_MAGIC or code != MESSAGE_ANSWER:
+                    msg = f"Unexpected message header {header.hex()} from the device."
+                    raise RemoteControlError(msg)  # noqa: TRY301
+                self._reply((await reader.readexactly(length)).decode("ascii", errors="replace"))
+        except asyncio.IncompleteReadError:
+            self._fail(ConnectionError("The device closed the connection."))
+        except RemoteControlError as e:
+            self._fail(e)
+        finally:
+            writer.close()
+            if self.writer is writer:
+                # Waits for the device to connect again.
+                self.writer = None
+                self._connected = asyncio.get_running_loop().create_future()
+
+    def _send(self, payload: bytes) -> None:
+        if self.writer is None or self.writer.is_closing():
+            msg = "The device is not connected."
+            raise ConnectionError(msg)
+        self.writer.write(MESSAGE_HEADER.pack(*MESSAGE_MAGIC, MESSAGE_COMMAND, 0, len(payload)) + payload)
@@ -0,0 +1,126 @@
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+from teraflashpy.commands import Command
+from teraflashpy.core import ACQUISITION_PORT_MAP, LOCALHOST, AcquisitionMode
+
+app = typer.Typer()
+"The full command line interface. `teraflashpy.__main__.main` answers the common commands without it."
+
+
+@app.command()
+def command(command: Command = typer.Argument()) -> None:
+    print(command)  # noqa: T201
+
+
+@app.command()
+def simulate(  # noqa: PLR0913
+    host: str = LOCALHOST,
+    port: int = ACQUISITION_PORT_MAP[AcquisitionMode.Asynchronous],
+    num_samples: int = 2000,
+    rate: float = 4.0,
+    jitter: float = 0.0,
+    corrupt_probability: float = 0.0,
+    truncate_probability: float = 0.0,
+) -> None:
+    """Serves simulated pulses on an acquisition port, for running without an instrument."""
+    # The simulator needs numpy, which the other commands do not.
+    from teraflashpy.simulator import SimulatorConfig, run
+
+    config = SimulatorConfig(
+        num_samples=num_samples,
+        rate=rate if rate > 0 else None,
+        jitter=jitter,
+        corrupt_probability=corrupt_probability,
+        truncate_probability=truncate_probability,
+    )
+    run(config, host, port)
+
+
+@app.command()
+def convert(
+    # Typer does not support `list[Path]` and `Path | None` on every Python version it runs on.
+    paths: List[Path],  # noqa: FA100
+    folder: Optional[Path] = None,  # noqa: FA100
+    remove: bool = False,  # noqa: FBT001, FBT002
+) -> None:
+    """Converts saved pulses, or every file saved in a folder, to .tfp pulse stores."""
+    from teraflashpy.convert import convert
+
+    for path in paths:
+        for store in convert(path, folder, remove=remove):
+            print(store)  # noqa: T201
+
+
+@app.command()
+def daemon(
+    host: str = LOCALHOST,
+    port: int = ACQUISITION_PORT_MAP[AcquisitionMode.Asynchronous],
+    socket: Optional[Path] = None,  # noqa: FA100
+    ring_slots: int = 64,
+    metrics_port: Optional[int] = None,  # noqa: FA100
+) -> None:
+    """Keeps a connection to an acquisition port open and publishes its pulses to subscribers, until stopped."""
+    import logging
+
+    from teraflashpy.daemon import AcquisitionDaemon
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    acquisition_daemon = AcquisitionDaemon(host, port=port, address=socket, ring_slots=ring_slots)
+    if metrics_port is None:
+        acquisition_daemon.run()
+        return
+
+    from teraflashpy.metrics import MetricsReporter, PrometheusSink
+
+    with MetricsReporter([acquisition_daemon.metrics], [PrometheusSink(port=metrics_port)]):
+        acquisition_daemon.run()
+
+
+@app.command()
+def daemon_health(
+    port: int = ACQUISITION_PORT_MAP[AcquisitionMode.Asynchronous],
+    socket: Optional[Path] = None,  # noqa: FA100
+) -> None:
+    """Prints the health of the daemon for an acquisition port."""
+    from teraflashpy.daemon import daemon_health, default_address
+
+    print(daemon_health(default_address(port) if socket is None else socket).model_dump_json(indent=2))  # noqa: T201
+
+
+@app.command()
+def record(
+    path: Path,
+    port: int = ACQUISITION_PORT_MAP[AcquisitionMode.Asynchronous],
+    socket: Optional[Path] = None,  # noqa: FA100
+) -> None:
+    """Records the frames published by the daemon for an acquisition port to a frame log, until interrupted."""
+    import contextlib
+
+    from teraflashpy.core import CapturePolicy
+    from teraflashpy.daemon import Subscription, default_address
+    from teraflashpy.recording import FrameRecorder
+
+    address = default_address(port) if socket is None else socket
+    subscription = Subscription(address, CapturePolicy.Lossless, name=f"record {path}")
+    with subscription, FrameRecorder(path) as recorder, contextlib.suppress(KeyboardInterrupt, ConnectionError):
+        while True:
+            recorder.write(*subscription.read_frame())
+    print(f"Recorded {subscription.received - subscription.dropped} frames, dropped {subscription.dropped}.")  # noqa: T201
+
+
+@app.command()
+def daemon_stop(
+    port: int = ACQUISITION_PORT_MAP[AcquisitionMode.Asynchronous],
+    socket: Optional[Path] = None,  # noqa: FA100
+) -> None:
+    """Shuts down the daemon for an acquisition port, once its clients have the pulses buffered for them."""
+    from teraflashpy.daemon import default_address, stop_daemon
+
+    stop_daemon(default_address(port) if socket is None else socket)
+
+
+if __name__ == "__main__":
+    app()
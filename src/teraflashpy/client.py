@@ -3,51 +3,257 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import logging
-from datetime import datetime, timezone
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from multiprocessing import Process, Queue
-from queue import Empty
+from multiprocessing.sharedctypes import RawArray
+from queue import Empty, Full
+from time import perf_counter
 from typing import TYPE_CHECKING
 
-import numpy as np
+from teraflashpy.core import (
+    ACQUISITION_PORT_MAP,
+    DEFAULT_BUFFER_SIZES,
+    LOCALHOST,
+    MAX_FRAME_LENGTH,
+    SHARED_MEMORY_BUDGET,
+    AcquisitionMode,
+    CapturePolicy,
+    Transport,
+    WorkerKind,
+)
+from teraflashpy.decode import decode_pulse
+from teraflashpy.output import CaptureStats, PulseBatch, PulseBatchBuilder, PulseFormatChangedError
+from teraflashpy.reconnect import Backoff, FrameReceiver
 
-from teraflashpy import ACQUISITION_PORT_MAP, LOCALHOST, AcquisitionMode
-from teraflashpy.output import PulseData
+# The daemon, metrics, recording, ring buffer and statistics are imported where they are used, so that the decode
+# workers, which import this module, load only what decoding needs.
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from ctypes import Array, c_longlong
+    from datetime import datetime
+    from pathlib import Path
     from types import TracebackType
 
+    import numpy as np
+
+    from teraflashpy.daemon import Address, Subscription
+    from teraflashpy.metrics import Metrics
+    from teraflashpy.ring_buffer import SharedMemoryRingBuffer
+    from teraflashpy.statistics import Accumulator
+
 logger = logging.getLogger(__name__)
 
+# Indices into the per-session counters shared with the backend process.
+_RECEIVED, _DROPPED, _BYTES = range(3)
+
+
+class PulsesDroppedError(RuntimeError):
+    """Raised by `read` and `accumulate` with `CapturePolicy.Lossless` once pulses have been dropped.
+
+    The pulses the call did get are not lost with it: `result` holds the `PulseBatch` that `read` would have returned,
+    or the accumulator passed to `accumulate`. `dropped` counts the pulses dropped since the previous error.
+    """
+
+    def __init__(self, message: str, dropped: int, result: PulseBatch | Accumulator) -> None:
+        super().__init__(message)
+        self.dropped = dropped
+        self.result = result
+
+
+def _publish(
+    buffer: Queue | SharedMemoryRingBuffer,
+    policy: CapturePolicy,
+    counters: Array[c_longlong],
+    pulse: bytes,
+    timestamp: datetime,
+) -> None:
+    from teraflashpy.ring_buffer import SharedMemoryRingBuffer
 
-async def _collect_data(queue: Queue) -> None:
-    reader, writer = await asyncio.open_connection(LOCALHOST, ACQUISITION_PORT_MAP[AcquisitionMode.Asynchronous])
+    counters[_RECEIVED] += 1
+    counters[_BYTES] += len(pulse)
+    if isinstance(buffer, SharedMemoryRingBuffer):
+        # The ring buffer itself counts the frames it overwrites in `LatestOnly` mode.
+        try:
+            buffer.write(pulse, timestamp, timeout=0 if policy is CapturePolicy.Lossless else None)
+        except Full:
+            counters[_DROPPED] += 1
+        return
+
+    match policy:
+        case CapturePolicy.LatestOnly:
+            _put_latest(buffer, counters, (pulse, timestamp))
+        case CapturePolicy.Lossless:
+            try:
+                buffer.put_nowait((pulse, timestamp))
+            except Full:
+                counters[_DROPPED] += 1
+        case CapturePolicy.Blocking:
+            buffer.put((pulse, timestamp))
+
+
+def _put_latest(buffer: Queue, counters: Array[c_longlong], item: tuple[bytes, datetime]) -> None:
+    """Puts `item` into a full `buffer` in place of its oldest, or drops it if there is no room after all."""
+    with contextlib.suppress(Full):
+        buffer.put_nowait(item)
+        return
+    # A full queue can still look empty to `get_nowait` until its items have been flushed to the pipe, or be refilled
+    # before the retry. Rather than spin until there is room, drop the new pulse then.
     try:
-        while True:
-            length_data_bytes = await reader.readexactly(6)
-            length_data = int(length_data_bytes.decode("utf-8"))
-            pulse_data_bytes = await reader.readexactly(length_data)
-            timestamp = datetime.now(tz=timezone.utc)
-            with contextlib.suppress(Empty):
-                queue.get_nowait()
-            queue.put_nowait((pulse_data_bytes, timestamp))
-    except Exception:
-        logger.exception(
-            {
-                "length_data_bytes": length_data_bytes if "length_data_bytes" in locals() else None,
-                "length_data": length_data if "length_data" in locals() else None,
-                "pulse_data_bytes": pulse_data_bytes if "pulse_data_bytes" in locals() else None,
-            },
-        )
+        buffer.get_nowait()
+    except Empty:
+        pass
+    else:
+        counters[_DROPPED] += 1
+    try:
+        buffer.put_nowait(item)
+    except Full:
+        counters[_DROPPED] += 1
+
+
+async def _collect_data(  # noqa: PLR0913
+    host: str,
+    port: int,
+    buffer: Queue | SharedMemoryRingBuffer,
+    policy: CapturePolicy,
+    counters: Array[c_longlong],
+    record_to: Path | None = None,
+    backoff: Backoff | None = None,
+) -> None:
+    from teraflashpy.recording import FrameRecorder
+
+    recorder = None if record_to is None else FrameRecorder(record_to)
+
+    def on_frame(pulse: bytes, timestamp: datetime) -> None:
+        if recorder is not None:
+            recorder.write(pulse, timestamp)
+        _publish(buffer, policy, counters, pulse, timestamp)
+
+    try:
+        await FrameReceiver(host, port, on_frame, backoff).run()
+    except OSError:
+        logger.exception("Gave up on the connection to %s:%d.", host, port)
     finally:
-        writer.close()
-        await writer.wait_closed()
+        if recorder is not None:
+            recorder.close()
+
+
+def _replay_data(
+    path: Path,
+    speed: float | None,
+    buffer: Queue | SharedMemoryRingBuffer,
+    policy: CapturePolicy,
+    counters: Array[c_longlong],
+) -> None:
+    from teraflashpy.recording import FrameLog, replay
+
+    with FrameLog(path) as log:
+        for frame, timestamp in replay(log, speed):
+            _publish(buffer, policy, counters, bytes(frame), timestamp)
+            frame.release()
+
+
+def _timed_decode(pulse: bytes) -> tuple[float, tuple[list[str], np.ndarray, np.ndarray]]:
+    start = perf_counter()
+    decoded = decode_pulse(pulse)
+    return perf_counter() - start, decoded
 
 
 class TeraflashProClient:
+    """Reads pulses from a TeraFlash Pro, received by a backend process into a capture buffer.
+
+    With `record_to`, the backend also appends every raw frame to a new frame log at that path. With `replay_from`,
+    frames come from such a log instead of the instrument, paced as recorded and sped up by `replay_speed`, or as fast
+    as they are read with `replay_speed=None`. Replayed pulses keep the timestamps they were recorded with.
+
+    With `Transport.SharedMemory`, every slot of the ring is `slot_size` bytes, large enough for any frame by default.
+    Unless `buffer_size` is given, the ring gets as many slots as fit in `SHARED_MEMORY_BUDGET`, so pass the length of
+    your frames as `slot_size` for a deeper buffer.
+
+    A connection to the instrument that fails or closes is reopened with `backoff`, so a glitch in the network costs
+    the pulses sent in the meantime rather than the session. With `attach_to`, pulses come from the
+    `teraflashpy.daemon.AcquisitionDaemon` at that address instead, which starts no backend process and shares the
+    instrument with any other subscribers. The daemon buffers pulses for the client as `capture_policy` and
+    `buffer_size` say, and sends them through its socket or, with `Transport.SharedMemory`, through the ring it
+    shares between subscribers. It cannot push back on the instrument, so `CapturePolicy.Blocking` is not available.
+
+    Counters, the depth of the capture buffer and timings of decoding and reading are registered in `metrics`; see
+    `teraflashpy.metrics` for reporting them.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        acquisition_mode: AcquisitionMode = AcquisitionMode.Asynchronous,
+        transport: Transport = Transport.Queue,
+        capture_policy: CapturePolicy = CapturePolicy.LatestOnly,
+        buffer_size: int | None = None,
+        slot_size: int = MAX_FRAME_LENGTH,
+        decode_workers: int = 0,
+        decode_worker_kind: WorkerKind = WorkerKind.Process,
+        host: str = LOCALHOST,
+        port: int | None = None,
+        record_to: Path | None = None,
+        replay_from: Path | None = None,
+        replay_speed: float | None = 1.0,
+        backoff: Backoff | None = None,
+        attach_to: Address | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
+        if record_to is not None and replay_from is not None:
+            msg = "Cannot record while replaying a recording."
+            raise ValueError(msg)
+        if attach_to is not None and (record_to is not None or replay_from is not None):
+            msg = "Cannot record or replay while attached to a daemon."
+            raise ValueError(msg)
+        if attach_to is not None and capture_policy is CapturePolicy.Blocking:
+            msg = "Cannot push back on an instrument shared through a daemon, so choose another capture policy."
+            raise ValueError(msg)
+        self.acquisition_mode = acquisition_mode
+        self.host = host
+        self.port = ACQUISITION_PORT_MAP[acquisition_mode] if port is None else port
+        self.transport = transport
+        self.capture_policy = capture_policy
+        if buffer_size is None:
+            buffer_size = DEFAULT_BUFFER_SIZES[capture_policy]
+            if transport is Transport.SharedMemory and attach_to is None:
+                buffer_size = max(1, min(buffer_size, SHARED_MEMORY_BUDGET // slot_size))
+        self.buffer_size = buffer_size
+        self.slot_size = slot_size
+        self.decode_workers = decode_workers
+        self.decode_worker_kind = decode_worker_kind
+        self.record_to = record_to
+        self.replay_from = replay_from
+        self.replay_speed = replay_speed
+        self.backoff = backoff
+        self.attach_to = attach_to
+        if metrics is None:
+            from teraflashpy.metrics import Metrics
+
+            metrics = Metrics()
+        self.metrics = metrics
+
     def __enter__(self):
-        self.queue: Queue[tuple[bytes, datetime]] = Queue(maxsize=2)
-        self.process = Process(target=self.run_backend, args=(self.queue,))
-        self.process.start()
+        self.counters = RawArray("q", 3)
+        self.num_read = 0
+        self._reported_drops = 0
+        self._carried: deque[tuple[datetime, tuple[list[str], np.ndarray, np.ndarray]]] = deque()
+        self.ring: SharedMemoryRingBuffer | None = None
+        self.process: Process | None = None
+        self.subscription: Subscription | None = None
+        if self.attach_to is not None:
+            from teraflashpy.daemon import Subscription
+
+            # The daemon is connected already, so there is no backend to start.
+            self.subscription = Subscription(self.attach_to, self.capture_policy, self.buffer_size, self.transport)
+        else:
+            self._start_backend()
+
+        self.decode_pool: Executor | None = None
+        if self.decode_workers > 0:
+            pool = ProcessPoolExecutor if self.decode_worker_kind is WorkerKind.Process else ThreadPoolExecutor
+            self.decode_pool = pool(max_workers=self.decode_workers)
+        self._register_metrics()
         return self
 
     def __exit__(
@@ -56,31 +262,234 @@ class TeraflashProClient:
         exc: BaseException | None,
         traceback: TracebackType | None,
     ) -> bool | None:
-        self.process.terminate()
+        if self.decode_pool is not None:
+            self.decode_pool.shutdown(cancel_futures=True)
+        if self.subscription is not None:
+            self.subscription.close()
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+        if self.ring is not None:
+            # Keep the count of dropped pulses, and the metrics that read it, after the ring is gone.
+            self.counters[_DROPPED] += self.ring.dropped
+            self.ring.close()
+            self.ring = None
+
+    def _start_backend(self) -> None:
+        if self.transport is Transport.SharedMemory:
+            from teraflashpy.ring_buffer import SharedMemoryRingBuffer
+
+            overwrite = self.capture_policy is CapturePolicy.LatestOnly
+            self.ring = SharedMemoryRingBuffer.create(self.buffer_size, self.slot_size, overwrite=overwrite)
+            buffer = self.ring
+        else:
+            self.queue: Queue[tuple[bytes, datetime]] = Queue(maxsize=self.buffer_size)
+            buffer = self.queue
+        if self.replay_from is None:
+            self.process = Process(
+                target=self.run_backend,
+                args=(self.host, self.port, buffer, self.capture_policy, self.counters, self.record_to, self.backoff),
+            )
+        else:
+            self.process = Process(
+                target=_replay_data,
+                args=(self.replay_from, self.replay_speed, buffer, self.capture_policy, self.counters),
+            )
+        self.process.start()
 
     @staticmethod
-    def run_backend(queue: Queue[tuple[bytes, datetime]]) -> None:
-        asyncio.run(_collect_data(queue))
+    def run_backend(  # noqa: PLR0913
+        host: str,
+        port: int,
+        buffer: Queue[tuple[bytes, datetime]] | SharedMemoryRingBuffer,
+        policy: CapturePolicy,
+        counters: Array[c_longlong],
+        record_to: Path | None = None,
+        backoff: Backoff | None = None,
+    ) -> None:
+        asyncio.run(_collect_data(host, port, buffer, policy, counters, record_to, backoff))
+
+    def _register_metrics(self) -> None:
+        metrics, counters = self.metrics, self.counters
+        metrics.counter("frames_received", "Frames received from the instrument.", lambda: counters[_RECEIVED])
+        metrics.counter("bytes_received", "Bytes of frames received from the instrument.", lambda: counters[_BYTES])
+        metrics.counter("pulses_dropped", "Pulses lost to a full capture buffer.", lambda: self.stats.dropped)
+        metrics.counter("pulses_read", "Pulses returned by `read` and `accumulate`.", lambda: self.num_read)
+        metrics.gauge("capture_buffer_depth", "Frames waiting in the capture buffer.", self._buffer_depth)
+        self._decode_time = metrics.histogram("decode_seconds", "Time to decode a pulse.")
+        self._wait_time = metrics.histogram("frame_wait_seconds", "Time spent waiting for each frame to arrive.")
+        self._read_time = metrics.histogram("read_seconds", "Duration of every call to `read` or `accumulate`.")
+
+    def _buffer_depth(self) -> float:
+        if self.ring is not None:
+            return self.ring.lag
+        if self.subscription is not None:
+            # The pulses are buffered by the daemon.
+            return float("nan")
+        if self.transport is Transport.SharedMemory:
+            return 0.0
+        try:
+            return self.queue.qsize()
+        except NotImplementedError:
+            # `qsize` is not available on macOS.
+            return float("nan")
+
+    @property
+    def stats(self) -> CaptureStats:
+        dropped = self.counters[_DROPPED] + (self.ring.dropped if self.ring is not None else 0)
+        return CaptureStats(received=self.counters[_RECEIVED], dropped=dropped, read=self.num_read)
 
     @staticmethod
     def _decode_pulse(pulse: bytes) -> tuple[list[str], np.ndarray, np.ndarray]:
-        pulsedata = pulse.decode("utf-8").split("\r\n")
-        header = pulsedata.pop(0).split(",")
-        time = np.zeros(len(pulsedata) - 1, dtype=float)
-        magnitude = np.zeros(len(pulsedata) - 1, dtype=float)
-        for x in range(len(pulsedata) - 1):
-            _time, _magnitude = pulsedata[x].split(",")
-            time[x] = float(_time)
-            magnitude[x] = float(_magnitude)
-
-        return header, time, magnitude
-
-    def read(self, num_pulses: int, timeout: int = 20) -> list[PulseData]:
-        pulses = []
-        for _ in range(num_pulses):
-            pulse_bytes, timestamp = self.queue.get(timeout=timeout)
-            header, time, magnitude = self._decode_pulse(pulse_bytes)
-            pulse = PulseData(timestamp=timestamp, header=header, time=time, magnitude=magnitude)
-            pulses.append(pulse)
-
-        return pulses
+        return decode_pulse(pulse)
+
+    def _get_frame(self, timeout: float) -> tuple[bytes, datetime]:
+        start = perf_counter()
+        try:
+            return self._wait_for_frame(timeout)
+        finally:
+            self._wait_time.observe(perf_counter() - start)
+
+    def _wait_for_frame(self, timeout: float) -> tuple[bytes, datetime]:
+        if self.subscription is not None:
+            pulse_bytes, timestamp = self.subscription.read_frame(timeout)
+            # The daemon counts the pulses it offered this client, and those it dropped.
+            self.counters[_RECEIVED] = self.subscription.received
+            self.counters[_DROPPED] = self.subscription.dropped
+            self.counters[_BYTES] += len(pulse_bytes)
+            return pulse_bytes, timestamp
+        if self.ring is None:
+            return self.queue.get(timeout=timeout)
+        while True:
+            frame = self.ring.read(timeout=timeout)
+            pulse_bytes = bytes(frame.payload)
+            if self.ring.is_valid(frame):
+                return pulse_bytes, frame.timestamp
+            self.ring.mark_dropped()
+
+    def _decoded_pulses(
+        self,
+        num_pulses: int,
+        timeout: float,
+    ) -> Iterator[tuple[datetime, tuple[list[str], np.ndarray, np.ndarray]]]:
+        """Yields the next `num_pulses` pulses in the order they were received, decoded by the pool if there is one."""
+        if self.decode_pool is None:
+            for _ in range(num_pulses):
+                pulse_bytes, timestamp = self._get_frame(timeout)
+                start = perf_counter()
+                decoded = self._decode_pulse(pulse_bytes)
+                self._decode_time.observe(perf_counter() - start)
+                yield timestamp, decoded
+            return
+
+        # Keep every worker busy while bounding how many raw frames are held in memory.
+        max_in_flight = 2 * self.decode_workers
+        in_flight: deque[tuple[datetime, Future[tuple[float, tuple[list[str], np.ndarray, np.ndarray]]]]] = deque()
+        try:
+            for _ in range(num_pulses):
+                # While frames are in flight, hand back their pulses rather than wait for a frame that may not be
+                # needed, as when `read` ends a batch early.
+                while in_flight:
+                    try:
+                        pulse_bytes, timestamp = self._wait_for_frame(0)
+                        break
+                    except Empty:
+                        yield self._decoded(*in_flight.popleft())
+                else:
+                    pulse_bytes, timestamp = self._get_frame(timeout)
+                in_flight.append((timestamp, self.decode_pool.submit(_timed_decode, pulse_bytes)))
+                if len(in_flight) >= max_in_flight:
+                    yield self._decoded(*in_flight.popleft())
+            while in_flight:
+                yield self._decoded(*in_flight.popleft())
+        finally:
+            # Pulses read ahead for a caller that stopped early are returned by the next call instead.
+            self._carried.extend(self._decoded(*pending) for pending in in_flight)
+
+    def _decoded(
+        self,
+        timestamp: datetime,
+        future: Future[tuple[float, tuple[list[str], np.ndarray, np.ndarray]]],
+    ) -> tuple[datetime, tuple[list[str], np.ndarray, np.ndarray]]:
+        elapsed, decoded = future.result()
+        self._decode_time.observe(elapsed)
+        return timestamp, decoded
+
+    def _next_pulses(
+        self,
+        num_pulses: int,
+        timeout: float,
+    ) -> Iterator[tuple[datetime, tuple[list[str], np.ndarray, np.ndarray]]]:
+        """Yields the pulses an earlier `read` carried over first, then new ones, `num_pulses` in all."""
+        carried, self._carried = self._carried, deque()
+        num_carried = min(num_pulses, len(carried))
+        try:
+            for _ in range(num_carried):
+                yield carried.popleft()
+        finally:
+            # Pulses carried over again by the caller are older than those still left from before.
+            self._carried.extend(carried)
+        yield from self._decoded_pulses(num_pulses - num_carried, timeout)
+
+    def read(self, num_pulses: int, timeout: int = 20) -> PulseBatch:
+        """Returns the next `num_pulses` pulses as a batch.
+
+        Pulses in a batch share a header and number of samples. When those change, the batch ends early with the
+        pulses before the change, as soon as the first pulse after it arrives, so it can be shorter than `num_pulses`.
+        That pulse is returned by the next call to `read` or `accumulate`.
+        """
+        start = perf_counter()
+        builder = PulseBatchBuilder(num_pulses)
+        num_built = 0
+        with contextlib.closing(self._next_pulses(num_pulses, timeout)) as pulses:
+            for pulse in pulses:
+                timestamp, (header, time, magnitude) = pulse
+                if not builder.set(num_built, timestamp, header, time, magnitude):
+                    self._carried.append(pulse)
+                    break
+                num_built += 1
+        self.num_read += num_built
+
+        batch = builder.build(num_built)
+        self._read_time.observe(perf_counter() - start)
+        if self.capture_policy is CapturePolicy.Lossless:
+            self._check_dropped(batch)
+        return batch
+
+    def accumulate(self, num_pulses: int, accumulator: Accumulator | None = None, timeout: int = 20) -> Accumulator:
+        """Folds the next `num_pulses` pulses into `accumulator` as they are decoded, without keeping them around.
+
+        Defaults to a new `RunningStatistics`. Pass the same accumulator again to keep averaging across calls. Raises
+        `PulseFormatChangedError` at the first pulse with another header than the pulses before it in this call, or
+        another number of samples than the accumulator holds.
+        """
+        start = perf_counter()
+        if accumulator is None:
+            from teraflashpy.statistics import RunningStatistics
+
+            accumulator = RunningStatistics()
+        first_header = None
+        with contextlib.closing(self._next_pulses(num_pulses, timeout)) as pulses:
+            for pulse in pulses:
+                _, (header, time, magnitude) = pulse
+                first_header = header if first_header is None else first_header
+                if header != first_header or magnitude.size != (accumulator.num_samples or magnitude.size):
+                    self._carried.append(pulse)
+                    raise PulseFormatChangedError(header, magnitude.size, first_header, accumulator)
+                accumulator.update(magnitude, time)
+                self.num_read += 1
+
+        self._read_time.observe(perf_counter() - start)
+        if self.capture_policy is CapturePolicy.Lossless:
+            self._check_dropped(accumulator)
+        return accumulator
+
+    def _check_dropped(self, result: PulseBatch | Accumulator) -> None:
+        dropped = self.stats.dropped
+        if dropped > self._reported_drops:
+            newly_dropped, self._reported_drops = dropped - self._reported_drops, dropped
+            msg = (
+                f"{dropped} pulses have been dropped this session because the capture buffer of {self.buffer_size} "
+                "pulses overflowed. Read faster, or increase `buffer_size`. The pulses read are in `result`."
+            )
+            raise PulsesDroppedError(msg, newly_dropped, result)
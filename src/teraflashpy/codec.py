@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import json
+import logging
+import struct
+from enum import Enum
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from teraflashpy.output import PulseBatch
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FLOAT16_RELATIVE_ERROR = float(np.finfo(np.float16).eps)
+"How far `Codec.Float16` may round magnitudes, relative to the largest in the batch, when no absolute bound is given."
+
+
+class TimeAxis(Enum):
+    """How the time axis of a batch or store is kept."""
+
+    PerPulse = 0
+    "Every pulse has its own axis."
+    Shared = 1
+    "One axis for every pulse, kept sample by sample."
+    Affine = 2
+    "One axis for every pulse, kept as `begin + step * index`, as it is within one acquisition setting."
+
+
+class Codec(Enum):
+    """How magnitudes are encoded."""
+
+    Raw = 0
+    "float32 as is."
+    Lz4 = 1
+    "Lossless: the delta between neighbouring samples, compressed with LZ4."
+    Zstd = 2
+    "Lossless: the delta between neighbouring samples, compressed with Zstandard. Needs `zstandard`."
+    Float16 = 3
+    "Lossy: rounded to float16, within a relative error of about 0.05%, or the absolute error the encoder is given."
+
+
+def encode_time_axis(time: np.ndarray) -> tuple[TimeAxis, float, float]:
+    """Finds the most compact `TimeAxis` that keeps `time` exactly, and its `begin` and `step` if it is affine.
+
+    A two-dimensional `time` whose rows are all equal counts as shared.
+    """
+    if time.ndim == 2:  # noqa: PLR2004
+        if len(time) == 0 or not (time == time[0]).all():
+            return TimeAxis.PerPulse, 0.0, 0.0
+        time = time[0]
+    if len(time) < 2:  # noqa: PLR2004
+        return TimeAxis.Shared, 0.0, 0.0
+    begin = float(time[0])
+    step = (float(time[-1]) - begin) / (len(time) - 1)
+    # The instrument steps by a round number of ps from a round start, which the float32 ends only approximate, so try
+    # those rounded to ever more decimals before the estimate itself.
+    for decimals in (*range(1, 10), None):
+        candidate = (begin, step) if decimals is None else (round(begin, decimals), round(step, decimals))
+        if np.array_equal(affine_time_axis(*candidate, len(time)), time):
+            return TimeAxis.Affine, *candidate
+    return TimeAxis.Shared, 0.0, 0.0
+
+
+def affine_time_axis(begin: float, step: float, count: int) -> np.ndarray:
+    return (begin + step * np.arange(count, dtype=np.float64)).astype(np.float32)
+
+
+def encode_magnitude(magnitude: np.ndarray, codec: Codec) -> bytes:
+    """Encodes float32 magnitudes of shape `(num_pulses, num_samples)`."""
+    magnitude = np.ascontiguousarray(magnitude, dtype=np.float32)
+    if codec is Codec.Raw:
+        return magnitude.tobytes()
+    if codec is Codec.Float16:
+        return magnitude.astype(np.float16).tobytes()
+    # Neighbouring samples of a pulse are close, and so are the bit patterns of close floats. Their difference as
+    # integers is small, and wraps around rather than losing precision, so it can be summed back exactly. Grouping the
+    # bytes by significance then gives the compressor long runs of similar bytes.
+    bits = magnitude.view(np.int32)
+    delta = np.diff(bits, axis=-1, prepend=np.zeros((*bits.shape[:-1], 1), dtype=np.int32))
+    shuffled = delta.view(np.uint8).reshape(-1, 4).T.tobytes()
+    return _compress(shuffled, codec)
+
+
+def decode_magnitude(data: bytes, codec: Codec, shape: tuple[int, int]) -> np.ndarray:
+    if codec is Codec.Raw:
+        return np.frombuffer(data, dtype=np.float32).reshape(shape)
+    if codec is Codec.Float16:
+        return np.frombuffer(data, dtype=np.float16).astype(np.float32).reshape(shape)
+    shuffled = np.frombuffer(_decompress(data, codec), dtype=np.uint8)
+    delta = shuffled.reshape(4, -1).T.copy().view(np.int32).reshape(shape)
+    return np.cumsum(delta, axis=-1, dtype=np.int32).view(np.float32)
+
+
+# Time axis, codec, number of pulses, number of samples, begin and step of an affine axis, and length of the header.
+_CHUNK_HEADER = struct.Struct("<BBIIddI")
+_LENGTH = struct.Struct("<Q")
+
+CHUNKS_MAGIC = b"TFPCHNK1"
+"Starts a file of chunks, each preceded by its length as a little-endian uint64."
+
+
+def encode_batch(batch: PulseBatch, codec: Codec = Codec.Lz4, max_error: float | None = None) -> bytes:
+    """Encodes a batch into a self-contained chunk, keeping its time axis once, or as `begin` and `step` if it can.
+
+    With `Codec.Float16`, magnitudes that would be off by more than `max_error`, or without it by more than
+    `FLOAT16_RELATIVE_ERROR` of the largest of them, are encoded with `Codec.Lz4` instead, which is lossless. So are
+    magnitudes that overflow float16.
+    """
+    if codec is Codec.Float16 and not _fits_float16(batch.magnitude, max_error):
+        bound = f"relative error {FLOAT16_RELATIVE_ERROR}" if max_error is None else max_error
+        logger.debug("Magnitudes do not fit float16 within %s, so they are compressed losslessly.", bound)
+        codec = Codec.Lz4
+    time_axis, begin, step = encode_time_axis(batch.time)
+    header = json.dumps(batch.header).encode()
+    if time_axis is TimeAxis.Affine:
+        time = b""
+    elif time_axis is TimeAxis.Shared:
+        time = np.asarray(batch.time if batch.shared_time else batch.time[0], dtype=np.float32).tobytes()
+    else:
+        time = encode_magnitude(batch.time, Codec.Raw if codec is Codec.Float16 else codec)
+    magnitude = encode_magnitude(batch.magnitude, codec)
+    return b"".join(
+        [
+            _CHUNK_HEADER.pack(
+                time_axis.value,
+                codec.value,
+                batch.num_pulses,
+                batch.num_samples,
+                begin,
+                step,
+                len(header),
+            ),
+            header,
+            batch.timestamps.astype("datetime64[us]").astype("<i8").tobytes(),
+            _LENGTH.pack(len(time)),
+            time,
+            _LENGTH.pack(len(magnitude)),
+            magnitude,
+        ],
+    )
+
+
+def decode_batch(chunk: bytes | memoryview) -> PulseBatch:
+    """Decodes a chunk made by `encode_batch`. A shared or affine time axis is returned as a single axis."""
+    time_value, codec_value, num_pulses, num_samples, begin, step, header_length = _CHUNK_HEADER.unpack_from(chunk)
+    time_axis, codec = TimeAxis(time_value), Codec(codec_value)
+    offset = _CHUNK_HEADER.size
+    header = json.loads(bytes(chunk[offset : offset + header_length]))
+    offset += header_length
+    timestamps = np.frombuffer(chunk, dtype="<i8", count=num_pulses, offset=offset).astype("datetime64[us]")
+    offset += 8 * num_pulses
+    time_data, offset = _read_field(chunk, offset)
+    magnitude_data, offset = _read_field(chunk, offset)
+    shape = (num_pulses, num_samples)
+    if time_axis is TimeAxis.Affine:
+        time = affine_time_axis(begin, step, num_samples)
+    elif time_axis is TimeAxis.Shared:
+        time = np.frombuffer(time_data, dtype=np.float32)
+    else:
+        time = decode_magnitude(time_data, Codec.Raw if codec is Codec.Float16 else codec, shape)
+    return PulseBatch.model_construct(
+        timestamps=timestamps,
+        header=header,
+        time=time,
+        magnitude=decode_magnitude(magnitude_data, codec, shape),
+    )
+
+
+def read_chunks(path: Path) -> Iterator[PulseBatch]:
+    """Reads back the batches in a file written by `teraflashpy.writers.TfzWriter`. A chunk cut short is ignored."""
+    data = path.read_bytes()
+    if not data.startswith(CHUNKS_MAGIC):
+        msg = f"{path} is not a file of encoded pulse chunks."
+        raise ValueError(msg)
+    offset = len(CHUNKS_MAGIC)
+    view = memoryview(data)
+    while offset + _LENGTH.size <= len(data):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        if offset + length > len(data):
+            logger.warning("Ignoring a chunk cut short at the end of %s.", path)
+            return
+        yield decode_batch(view[offset : offset + length])
+        offset += length
+
+
+def _read_field(chunk: bytes | memoryview, offset: int) -> tuple[bytes | memoryview, int]:
+    (length,) = _LENGTH.unpack_from(chunk, offset)
+    offset += _LENGTH.size
+    return chunk[offset : offset + length], offset + length
+
+
+def _fits_float16(magnitude: np.ndarray, max_error: float | None) -> bool:
+    with np.errstate(over="ignore"):
+        rounded = magnitude.astype(np.float16).astype(np.float32)
+    if (np.isinf(rounded) & ~np.isinf(magnitude)).any():
+        return False
+    if max_error is None:
+        # Holds unless the magnitudes are mostly too small for the normal range of float16, where it keeps few bits.
+        finite = np.abs(magnitude[np.isfinite(magnitude)])
+        max_error = FLOAT16_RELATIVE_ERROR * (finite.max() if finite.size else 0)
+    return np.allclose(rounded, magnitude, rtol=0, atol=max_error, equal_nan=True)
+
+
+def _compress(data: bytes, codec: Codec) -> bytes:
+    if codec is Codec.Lz4:
+        return _import_lz4().compress(data, store_size=True)
+    return _import_zstandard().ZstdCompressor().compress(data)
+
+
+def _decompress(data: bytes | memoryview, codec: Codec) -> bytes:
+    if codec is Codec.Lz4:
+        return _import_lz4().decompress(data)
+    return _import_zstandard().ZstdDecompressor().decompress(data)
+
+
+def _import_lz4():  # noqa: ANN202
+    try:
+        import lz4.block
+    except ImportError as e:
+        msg = "Could not import module `lz4`. To compress with LZ4, install it with `pip install lz4`."
+        raise ImportError(
+            msg,
+            name=e.name,
+            path=e.path,
+        ) from e
+    return lz4.block
+
+
+def _import_zstandard():  # noqa: ANN202
+    try:
+        import zstandard
+    except ImportError as e:
+        msg = (
+            "Could not import module `zstandard`. To compress with Zstandard, install it with `pip install zstandard`."
+        )
+        raise ImportError(
+            msg,
+            name=e.name,
+            path=e.path,
+        ) from e
+    return zstandard
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import math
 from enum import Enum
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated, Any, TypeVar
 
-from pydantic import BaseModel, Field, ValidationError, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
+from teraflashpy.states.laser import AcquisitionStatus, LaserStatus
 from teraflashpy.states.system import SystemState, SystemStatus
+from teraflashpy.states.trans_impedance_amplifier import TransImpedanceAmplifierStatus
+from teraflashpy.states.transfer import TransferStatus
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
 
 
 class Command(Enum):
@@ -79,36 +86,42 @@ class SystemMonitorCode(Enum):
 # --------------------------------------- INPUTS ---------------------------------------
 
 
-class SystemMonitorInput(BaseModel):
+class _FrozenInput(BaseModel):
+    # Frozen, so that parsed inputs can be cached and shared.
+    model_config = ConfigDict(frozen=True)
+
+
+class SystemMonitorInput(_FrozenInput):
     code: SystemMonitorCode
 
 
-class LaserSetInput(BaseModel):
+class LaserSetInput(_FrozenInput):
     pump_current: Annotated[float, Field(ge=0, le=100)]
 
 
-class AcquisitionBeginInput(BaseModel):
+class AcquisitionBeginInput(_FrozenInput):
     start_position: Annotated[float, Field(ge=0, le=3000)]
 
     @field_validator("start_position")
     @classmethod
     def check_is_divisible(cls: type[AcquisitionBeginInput], v: float) -> float:
-        is_divisible = v % 0.1 == 0
+        # `v % 0.1` is rarely exactly 0 in floating point, so compare against the nearest multiple instead.
+        is_divisible = math.isclose(v * 10, round(v * 10), abs_tol=1e-9)
         if not is_divisible:
             msg = "start_position must be divisible by 0.1"
-            raise ValidationError(msg)
+            raise ValueError(msg)
         return v
 
 
-class AcquisitionRangeInput(BaseModel):
+class AcquisitionRangeInput(_FrozenInput):
     measuring_range: Annotated[int, Field(ge=20, le=200)]
 
 
-class AcquisitionAverageInput(BaseModel):
+class AcquisitionAverageInput(_FrozenInput):
     num_averages: Annotated[int, Field(ge=1, le=30000)]
 
 
-class NoInput(BaseModel):
+class NoInput(_FrozenInput):
     ...
 
 
@@ -154,65 +167,139 @@ class CommandResult(Enum):
 #     command_input: Annotated[CommandInput]
 
 
-def run(state: SystemState, command: Command, inputs: CommandInput):
+class CommandError(RuntimeError):
+    pass
+
+
+INPUT_TYPES: dict[Command, type[CommandInput]] = {
+    Command.SystemMonitor: SystemMonitorInput,
+    Command.LaserSet: LaserSetInput,
+    Command.AcquisitionBegin: AcquisitionBeginInput,
+    Command.AcquisitionRange: AcquisitionRangeInput,
+    Command.AcquisitionAverage: AcquisitionAverageInput,
+}
+"Input of every command that takes an argument. The other commands take `NoInput`."
+
+_NO_INPUT = NoInput()
+
+
+def check_input(command: Command, inputs: CommandInput | None) -> CommandInput:
+    """Checks that `inputs` belong to `command`. Their values were validated when the input model was created."""
+    expected = INPUT_TYPES.get(command, NoInput)
+    if inputs is None and expected is NoInput:
+        return _NO_INPUT
+    if not isinstance(inputs, expected):
+        msg = f"{command.name} takes {expected.__name__}, not {type(inputs).__name__}."
+        raise TypeError(msg)
+    return inputs
+
+
+def run(
+    state: SystemState,
+    command: Command,
+    inputs: CommandInput | None = None,
+) -> tuple[CommandResult, SystemState, Any]:
+    """Returns the state of the instrument after `command`, and the value it reports, if any.
+
+    States are frozen, and only the sub-states a command changes are copied; the rest are shared with `state`, which
+    is returned as it is by commands that change nothing. Raises `CommandError` for a command the instrument would
+    refuse in `state`.
+    """
+    new_state, value = _transition(state, command, check_input(command, inputs))
+    return CommandResult.Ok, new_state, value
+
+
+def run_many(
+    state: SystemState,
+    commands: Iterable[tuple[Command, CommandInput | None]],
+) -> tuple[SystemState, list[Any]]:
+    """Runs `commands` in turn, e.g. from `parse.parse_script`, and returns the final state and the reported values.
+
+    Every input is checked before the first command runs, so a script with a bad input fails without running at all.
+    """
+    checked = [(command, check_input(command, inputs)) for command, inputs in commands]
+    values = []
+    for command, inputs in checked:
+        state, value = _transition(state, command, inputs)
+        values.append(value)
+    return state, values
+
+
+def _transition(state: SystemState, command: Command, inputs: CommandInput) -> tuple[SystemState, Any]:  # noqa: PLR0911
     match command:
         case Command.SystemStop:
-            # output = run(command, inputs)
-            result: CommandResult = CommandResult.Ok
-            new_state = state.model_copy(update={"status": SystemStatus.Off}, deep=True)
-            value = None
+            # Shuts off the laser and stops the shaker.
+            update = {
+                "status": SystemStatus.Off,
+                "laser_state": _copy(state.laser_state, status=LaserStatus.Off),
+                "acquisition_state": _copy(state.acquisition_state, state=AcquisitionStatus.Off),
+            }
+            return _copy(state, **update), None
         case Command.SystemTellStatus:
-            result: CommandResult = CommandResult.Ok
-            new_state = state.model_copy(deep=True)
-            value = SystemStatus.On
-    match result:
-        case CommandResult.Ok:
-            return result, new_state, value
-        case CommandResult.Error:
-            msg = "asdfsafasfda"
-            raise Exception(msg)
-        case _:
-            msg = "CommandResult other than Ok or Error."
-            raise ValueError(msg)
-        # case Command.SystemMonitor:
-        #     return "TEST"
-        # case Command.SystemTiaFull:
-        #     return state.model_copy(
-        #         update={"state": {"laser_state": {"tia_status": TransImpedanceAmplifierStatus.Full}}},
-        #         deep=True,
-        #     )
-        # case Command.SystemTiaAtn1:
-        #     return state.model_copy(
-        #         update={"state": {"laser_state": {"tia_status": TransImpedanceAmplifierStatus.Medium}}},
-        #         deep=True,
-        #     )
-        # case Command.SystemTiaAtn2:
-        #     return state.model_copy(
-        #         update={"state": {"laser_state": {"tia_status": TransImpedanceAmplifierStatus.Small}}},
-        #         deep=True,
-        #     )
-        # case Command.LaserOff:
-        #     return state.model_copy(update={"state": {"laser_state": {"status": LaserStatus.Off}}}, deep=True)
-        # case Command.LaserOn:
-        #     return state.model_copy(update={"state": {"laser_state": {"status": LaserStatus.On}}}, deep=True)
-        # case Command.LaserSet:
-        #     pass
-        # case Command.AcquisitionBegin:
-        #     pass
-        # case Command.AcquisitionRange:
-        #     pass
-        # case Command.AcquisitionStop:
-        #     pass
-        # case Command.AcquisitionStart:
-        #     pass
-        # case Command.AcquisitionAverage:
-        #     pass
-        # case Command.AcquisitionResetAvg:
-        #     pass
-        # case Command.TransmissionSliding:
-        #     pass
-        # case Command.TransmissionBlock:
-        #     pass
+            return state, state.status
+        case Command.SystemMonitor:
+            match inputs.code:
+                case SystemMonitorCode.SwitchTransferSliding:
+                    return _update_laser(state, transfer_status=TransferStatus.Sliding), None
+                case SystemMonitorCode.SwitchTransferBlock:
+                    return _update_laser(state, transfer_status=TransferStatus.Block), None
+            # The readings themselves are not simulated.
+            return state, None
+        case Command.SystemTiaFull:
+            return _update_laser(state, tia_status=TransImpedanceAmplifierStatus.Full), None
+        case Command.SystemTiaAtn1:
+            return _update_laser(state, tia_status=TransImpedanceAmplifierStatus.Medium), None
+        case Command.SystemTiaAtn2:
+            return _update_laser(state, tia_status=TransImpedanceAmplifierStatus.Small), None
+        case Command.LaserOff:
+            return _update_laser(state, status=LaserStatus.Off), None
+        case Command.LaserOn:
+            return _update_laser(state, status=LaserStatus.On), None
+        case Command.LaserSet:
+            return _update_laser(state, pump_current=inputs.pump_current), None
+        case Command.AcquisitionBegin:
+            return _update_acquisition(state, start_position=inputs.start_position), None
+        case Command.AcquisitionRange:
+            if state.acquisition_state.state is AcquisitionStatus.On:
+                msg = "The measuring range may only be set while the acquisition is stopped."
+                raise CommandError(msg)
+            return _update_acquisition(state, measuring_range=inputs.measuring_range), None
+        case Command.AcquisitionStop:
+            return _update_acquisition(state, state=AcquisitionStatus.Off), None
+        case Command.AcquisitionStart:
+            return _update_acquisition(state, state=AcquisitionStatus.On), None
+        case Command.AcquisitionAverage:
+            return _update_acquisition(state, num_averages=inputs.num_averages), None
+        case Command.AcquisitionResetAvg:
+            return state, None
+        case Command.TransmissionSliding:
+            return _update_laser(state, transfer_status=TransferStatus.Sliding), None
+        case Command.TransmissionBlock:
+            return _update_laser(state, transfer_status=TransferStatus.Block), None
+    msg = f"Unknown command {command}."
+    raise ValueError(msg)
+
+
+_StateT = TypeVar("_StateT", bound=BaseModel)
+
+
+def _copy(state: _StateT, /, **update: Any) -> _StateT:  # noqa: ANN401
+    # A shallow copy without validation: the updates come from validated inputs or are enum members.
+    if all(getattr(state, key) == value for key, value in update.items()):
+        return state
+    return state.model_copy(update=update)
+
+
+def _update_laser(state: SystemState, /, **update: Any) -> SystemState:  # noqa: ANN401
+    laser_state = _copy(state.laser_state, **update)
+    return state if laser_state is state.laser_state else state.model_copy(update={"laser_state": laser_state})
+
+
+def _update_acquisition(state: SystemState, /, **update: Any) -> SystemState:  # noqa: ANN401
+    acquisition_state = _copy(state.acquisition_state, **update)
+    if acquisition_state is state.acquisition_state:
+        return state
+    return state.model_copy(update={"acquisition_state": acquisition_state})
 
 
 # message = "\n".join(["CDEF1234", "789AFEDC", "00000002", "????????", u32])
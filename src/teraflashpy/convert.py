@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import ast
+import csv
+import json
+import logging
+import pickle
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from teraflashpy.codec import read_chunks
+from teraflashpy.output import PulseBatch
+from teraflashpy.store import EXTENSION, index_path
+from teraflashpy.writers import CSV_HEADER_PREFIX, TfpWriter, _import_h5py, _import_pyarrow
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_LEGACY_CSV_COLUMNS = "timestamp,header,time,magnitude"
+
+
+def read_pulses(path: Path) -> Iterator[PulseBatch]:
+    """Reads back a file saved by one of the `teraflashpy.writers`, as batches of pulses.
+
+    Formats that keep no header (`.npy`) yield an empty one. The `.pkl`, `.parquet`, `.csv` and `.json` files saved by
+    the `main.py` of earlier versions, with a `PulseData.model_dump()` per pulse, are read too.
+    """
+    try:
+        reader = READERS[path.suffix]
+    except KeyError:
+        msg = f"No reader for extension {path.suffix!r}. Choose one of {list(READERS)}."
+        raise ValueError(msg) from None
+    return reader(path)
+
+
+def convert(path: Path, folder: Path | None = None, *, remove: bool = False) -> list[Path]:
+    """Converts a saved file, or every saved file in a folder and its subfolders, to pulse stores.
+
+    Each store is written to `folder`, by default next to the file it was converted from, under the same name, with a
+    suffix added should a batch start a new store. With `remove`, the files converted are deleted. Returns the paths
+    of the stores.
+    """
+    if path.is_dir():
+        files = sorted(file for file in path.rglob("*") if file.suffix in READERS)
+        return [store for file in files for store in convert(file, folder, remove=remove)]
+
+    destination = path.parent if folder is None else folder
+    with TfpWriter(destination, fsync=False) as writer:
+        for batch in read_pulses(path):
+            writer.write(batch)
+    stores = []
+    # The writer names stores after the time they were opened, so rename them after the file they came from.
+    for index, written in enumerate(writer.paths):
+        store = destination / (path.stem if index == 0 else f"{path.stem}-{index}")
+        store = store.with_suffix(EXTENSION)
+        if store.exists():
+            msg = f"Converting {path} would overwrite {store}."
+            raise FileExistsError(msg)
+        written.rename(store)
+        index_path(written).rename(index_path(store))
+        stores.append(store)
+    logger.info("Converted %s to %s.", path, [str(store) for store in stores])
+    if remove:
+        path.unlink()
+    return stores
+
+
+def _read_pickle(path: Path) -> Iterator[PulseBatch]:
+    with path.open("rb") as f:
+        while True:
+            try:
+                record = pickle.load(f)  # noqa: S301
+            except EOFError:
+                return
+            if isinstance(record, list):
+                yield from _legacy_batches(record)
+            else:
+                yield _batch(record["timestamp"], record["header"], record["time"], record["magnitude"])
+
+
+def _read_csv(path: Path) -> Iterator[PulseBatch]:
+    timestamps, time, magnitude = [], [], []
+    header = []
+    with path.open() as f:
+        line = next(f)
+        if line.rstrip("\n") == _LEGACY_CSV_COLUMNS:
+            yield from _read_legacy_csv(path, csv.reader(f))
+            return
+        if line.startswith(CSV_HEADER_PREFIX):
+            header = json.loads(line.removeprefix(CSV_HEADER_PREFIX))
+            next(f)
+        for line in f:
+            timestamp, time_row, magnitude_row = line.rstrip("\n").split(",")
+            timestamps.append(timestamp.removesuffix("Z"))
+            time.append(np.array(time_row.split(), dtype=np.float32))
+            magnitude.append(np.array(magnitude_row.split(), dtype=np.float32))
+    yield from _batches(timestamps, [header] * len(timestamps), time, magnitude)
+
+
+def _read_legacy_csv(path: Path, rows: Iterable[list[str]]) -> Iterator[PulseBatch]:
+    pulses = [
+        {
+            "timestamp": timestamp,
+            "header": ast.literal_eval(header),
+            "time": _parse_samples(path, time),
+            "magnitude": _parse_samples(path, magnitude),
+        }
+        for timestamp, header, time, magnitude in rows
+    ]
+    yield from _legacy_batches(pulses)
+
+
+def _parse_samples(path: Path, text: str) -> np.ndarray:
+    # The rows hold `str()` of an array, which numpy summarises beyond 1000 samples.
+    if "..." in text:
+        msg = f"{path} holds pulses of more than 1000 samples, which were saved with all but a few left out."
+        raise ValueError(msg)
+    return np.array(text.strip("[]").split(), dtype=np.float32)
+
+
+def _read_json(path: Path) -> Iterator[PulseBatch]:
+    timestamps, headers, time, magnitude = [], [], [], []
+    with path.open() as f:
+        if f.read(1) == "[":
+            f.seek(0)
+            yield from _legacy_batches(json.load(f))
+            return
+        f.seek(0)
+        for line in f:
+            pulse = json.loads(line)
+            timestamps.append(pulse["timestamp"].removesuffix("Z"))
+            headers.append(pulse["header"])
+            time.append(np.array(pulse["time"], dtype=np.float32))
+            magnitude.append(np.array(pulse["magnitude"], dtype=np.float32))
+    yield from _batches(timestamps, headers, time, magnitude)
+
+
+def _read_npy(path: Path) -> Iterator[PulseBatch]:
+    records = np.load(path, mmap_mode="r")
+    yield _batch(records["timestamp"], [], records["time"], records["magnitude"])
+
+
+def _read_parquet(path: Path) -> Iterator[PulseBatch]:
+    _, pq = _import_pyarrow()
+    parquet = pq.ParquetFile(path)
+    metadata = parquet.schema_arrow.metadata or {}
+    header = json.loads(metadata.get(b"header", b"[]"))
+    for group in range(parquet.num_row_groups):
+        table = parquet.read_row_group(group)
+        num_pulses = table.num_rows
+        timestamps = table.column("timestamp").cast("int64").to_numpy().astype("datetime64[us]")
+        if "header" in table.column_names:
+            # Saved by `pa.Table.from_pylist` with a header per pulse, rather than one in the metadata.
+            yield from _batches(
+                list(np.datetime_as_string(timestamps)),
+                table.column("header").to_pylist(),
+                [np.array(row, dtype=np.float32) for row in table.column("time").to_pylist()],
+                [np.array(row, dtype=np.float32) for row in table.column("magnitude").to_pylist()],
+            )
+            continue
+        time = table.column("time").combine_chunks().flatten().to_numpy().reshape(num_pulses, -1)
+        magnitude = table.column("magnitude").combine_chunks().flatten().to_numpy().reshape(num_pulses, -1)
+        yield _batch(timestamps, header, time, magnitude)
+
+
+def _read_hdf5(path: Path) -> Iterator[PulseBatch]:
+    h5py = _import_h5py()
+    with h5py.File(path, "r") as file:
+        header = json.loads(file.attrs.get("header", "[]"))
+        yield _batch(file["timestamp"][:].astype("datetime64[us]"), header, file["time"][:], file["magnitude"][:])
+
+
+def _legacy_batches(pulses: list[dict[str, Any]]) -> Iterator[PulseBatch]:
+    yield from _batches(
+        [_utc(pulse["timestamp"]) for pulse in pulses],
+        [pulse["header"] for pulse in pulses],
+        [np.asarray(_data(pulse["time"]), dtype=np.float32) for pulse in pulses],
+        [np.asarray(_data(pulse["magnitude"]), dtype=np.float32) for pulse in pulses],
+    )
+
+
+def _data(samples: Any) -> Any:  # noqa: ANN401
+    # Arrays dumped in JSON mode are objects like `{"data_type": "float32", "data": [...]}`.
+    return samples["data"] if isinstance(samples, dict) else samples
+
+
+def _utc(timestamp: datetime | str) -> str:
+    """Returns `timestamp` in ISO 8601 without an offset, converted to UTC if it has one."""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp.isoformat()
+
+
+def _batches(
+    timestamps: list[str],
+    headers: list[list[str]],
+    time: list[np.ndarray],
+    magnitude: list[np.ndarray],
+) -> Iterator[PulseBatch]:
+    # Formats with a row per pulse can mix numbers of samples and headers, so split them into batches where they change.
+    start = 0
+    for stop in range(1, len(timestamps) + 1):
+        if stop == len(timestamps) or (
+            headers[stop] != headers[start] or magnitude[stop].size != magnitude[start].size
+        ):
+            yield _batch(
+                np.array(timestamps[start:stop], dtype="datetime64[us]"),
+                headers[start],
+                np.stack(time[start:stop]),
+                np.stack(magnitude[start:stop]),
+            )
+            start = stop
+
+
+def _batch(timestamps: np.ndarray, header: list[str], time: np.ndarray, magnitude: np.ndarray) -> PulseBatch:
+    return PulseBatch.model_construct(
+        timestamps=np.asarray(timestamps, dtype="datetime64[us]"),
+        header=list(header),
+        time=np.asarray(time, dtype=np.float32),
+        magnitude=np.asarray(magnitude, dtype=np.float32),
+    )
+
+
+READERS: dict[str, Callable[[Path], Iterable[PulseBatch]]] = {
+    ".pkl": _read_pickle,
+    ".parquet": _read_parquet,
+    ".csv": _read_csv,
+    ".json": _read_json,
+    ".npy": _read_npy,
+    ".h5": _read_hdf5,
+    ".tfz": read_chunks,
+}
@@ -6,6 +6,10 @@ from pydantic import BaseModel
 
 LOCALHOST = "127.0.0.1"
 
+LENGTH_PREFIX_SIZE = 6
+"Every frame on the acquisition ports is preceded by its length as this many ASCII digits."
+MAX_FRAME_LENGTH = 10**LENGTH_PREFIX_SIZE - 1
+
 
 class AcquisitionMode(Enum):
     Synchronous = 0
@@ -17,6 +21,50 @@ ACQUISITION_PORT_MAP = {
     AcquisitionMode.Asynchronous: 6006,
 }
 
+HOST_ADDRESS = "169.254.84.101"
+"The device connects to a host computer at this address."
+COMMAND_PORT = 6341
+"The host listens on this TCP port for the device, to send it `Command`s."
+
+RC_DEVICE_PORT = 61234
+"UDP port the OEM software receives RC/RD commands on."
+RC_READ_PORT = 61235
+"Local UDP port that responses to RC/RD commands are sent to."
+RC_WRITE_PORT = 61237
+"Local UDP port RC/RD commands are sent from."
+
+
+class Transport(Enum):
+    Queue = 0
+    "Frames are pickled through a `multiprocessing.Queue`."
+    SharedMemory = 1
+    "Frames are written in place to a `SharedMemoryRingBuffer`."
+
+
+class CapturePolicy(Enum):
+    LatestOnly = 0
+    "Keeps only the most recent pulses, dropping the oldest buffered pulse when the reader falls behind."
+    Lossless = 1
+    "Buffers deeply and never drops silently; reads fail once the buffer has overflowed."
+    Blocking = 2
+    "Stops reading from the socket while the buffer is full, pushing back on the instrument."
+
+
+DEFAULT_BUFFER_SIZES = {
+    CapturePolicy.LatestOnly: 2,
+    CapturePolicy.Lossless: 1024,
+    CapturePolicy.Blocking: 16,
+}
+SHARED_MEMORY_BUDGET = 64 * 2**20
+"Bytes a shared memory ring takes at most when its depth is left to the default."
+
+
+class WorkerKind(Enum):
+    Thread = 0
+    "Runs in a thread of the calling process."
+    Process = 1
+    "Runs in a separate process."
+
 
 class Config(BaseModel):
     acquisition_mode: AcquisitionMode = AcquisitionMode.Synchronous
@@ -0,0 +1,568 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import sys
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from queue import Empty
+from typing import TYPE_CHECKING, Self
+
+from pydantic import BaseModel
+
+from teraflashpy.core import (
+    ACQUISITION_PORT_MAP,
+    DEFAULT_BUFFER_SIZES,
+    LOCALHOST,
+    MAX_FRAME_LENGTH,
+    AcquisitionMode,
+    CapturePolicy,
+    Transport,
+)
+from teraflashpy.metrics import Metrics
+from teraflashpy.reconnect import Backoff, FrameReceiver
+from teraflashpy.ring_buffer import SharedMemoryRingBuffer
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+    from types import TracebackType
+
+logger = logging.getLogger(__name__)
+
+Address = Path | tuple[str, int]
+"Where a daemon listens: the path of a Unix socket, or a host and port where Unix sockets are not available."
+
+# Every frame sent to a subscriber is preceded by the number of frames offered to it so far, including this one, how
+# many of those were dropped, the timestamp of the frame in us since the epoch, and its length.
+_FRAME_HEADER = struct.Struct("<QQqI")
+# Subscribers through shared memory are sent the sequence number of the frame in the ring instead.
+_NOTIFICATION = struct.Struct("<QQQ")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+# Size of the socket send buffer for each subscriber, in bytes.
+_SEND_BUFFER = 1 << 16
+_UNIX_SOCKETS = hasattr(socket, "AF_UNIX") and sys.platform != "win32"
+
+
+def default_address(port: int) -> Address:
+    """Where the daemon for acquisition port `port` listens unless told otherwise."""
+    if _UNIX_SOCKETS:
+        return Path(tempfile.gettempdir()) / f"teraflashpy-{port}.sock"
+    # Windows has no Unix sockets for asyncio to serve, so fall back to a port on the loopback interface.
+    return LOCALHOST, port + 10000
+
+
+class SubscriberHealth(BaseModel):
+    name: str
+    policy: CapturePolicy
+    transport: Transport
+    buffer_size: int
+    buffered: int
+    "Frames waiting to be sent."
+    offered: int
+    "Frames received since the subscriber attached."
+    dropped: int
+
+
+class DaemonHealth(BaseModel):
+    host: str
+    port: int
+    connected: bool
+    "Whether the daemon is connected to the instrument right now."
+    uptime: float
+    "Seconds since the daemon started."
+    connects: int
+    "Connections made to the instrument, the first one included."
+    disconnects: int
+    retries: int
+    "Attempts to reconnect since the last successful connection."
+    last_error: str | None
+    "Why the latest connection ended or failed."
+    frames: int
+    bytes_received: int
+    since_last_frame: float | None
+    "Seconds since the latest frame arrived, None before the first."
+    subscribers: list[SubscriberHealth]
+    dropped: int
+    "Frames dropped for subscribers that fell behind, including those that have since detached."
+
+
+class _Subscriber:
+    """The frames waiting to be sent to one subscriber, as the frames themselves or their sequence numbers in the ring.
+
+    Once `buffer_size` frames are waiting, new frames are dropped as `policy` says, so that a slow subscriber never
+    holds up the instrument or the other subscribers: `LatestOnly` drops the oldest frame, `Lossless` the new one, so
+    that the frames it does get have no gaps until it catches up.
+    """
+
+    def __init__(self, name: str, policy: CapturePolicy, transport: Transport, buffer_size: int) -> None:
+        self.name = name
+        self.policy = policy
+        self.transport = transport
+        self.buffer_size = buffer_size
+        self.frames: deque[tuple[int, tuple[bytes, datetime] | int]] = deque()
+        self.offered = 0
+        self.dropped = 0
+        self.closing = False
+        self.ready = asyncio.Event()
+
+    def offer(self, frame: tuple[bytes, datetime] | int | None) -> None:
+        """Queues `frame`, or counts it as dropped if it is None."""
+        self.offered += 1
+        if frame is None:
+            self.dropped += 1
+            return
+        if len(self.frames) >= self.buffer_size:
+            self.dropped += 1
+            if self.policy is CapturePolicy.Lossless:
+                return
+            self.frames.popleft()
+        self.frames.append((self.offered, frame))
+        self.ready.set()
+
+    def close(self) -> None:
+        self.closing = True
+        self.ready.set()
+
+    @property
+    def health(self) -> SubscriberHealth:
+        return SubscriberHealth(
+            name=self.name,
+            policy=self.policy,
+            transport=self.transport,
+            buffer_size=self.buffer_size,
+            buffered=len(self.frames),
+            offered=self.offered,
+            dropped=self.dropped,
+        )
+
+
+class AcquisitionDaemon:
+    """Keeps one connection to an acquisition port open, and publishes the frames to any number of subscribers on
+    this computer.
+
+    Subscribers attach at `address`, by default `default_address(port)`, with `Subscription` or with
+    `TeraflashProClient(attach_to=address)`, which then only has to connect rather than start a backend process. Each
+    gets every frame received from then on, in a buffer of its own with the size and `CapturePolicy` it asks for, so a
+    live plot can take the latest pulses while a recorder takes every one. Frames are sent through the socket, or with
+    `Transport.SharedMemory` copied once into a ring of `ring_slots` slots of `slot_size` bytes shared by all
+    subscribers, which are only sent the position of each frame in it.
+
+    A connection to the instrument that fails or closes is reopened with `backoff`, so subscribers see a gap in the
+    frames rather than losing their session. `health` reports the state of the connection and of every subscriber, and
+    is served to `daemon_health`. The daemon shuts down on `stop_daemon`, SIGINT or SIGTERM: it stops receiving, sends
+    subscribers the frames they still have buffered, and removes its socket.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str = LOCALHOST,
+        acquisition_mode: AcquisitionMode = AcquisitionMode.Asynchronous,
+        port: int | None = None,
+        address: Address | None = None,
+        backoff: Backoff | None = None,
+        ring_slots: int = 64,
+        slot_size: int = MAX_FRAME_LENGTH,
+        shutdown_timeout: float = 5.0,
+        metrics: Metrics | None = None,
+    ) -> None:
+        self.port = ACQUISITION_PORT_MAP[acquisition_mode] if port is None else port
+        self.address = default_address(self.port) if address is None else address
+        self.receiver = FrameReceiver(host, self.port, self._on_frame, backoff)
+        self.ring_slots = ring_slots
+        self.slot_size = slot_size
+        self.ring: SharedMemoryRingBuffer | None = None
+        "Created for the first subscriber through shared memory."
+        self.shutdown_timeout = shutdown_timeout
+        self.subscribers: set[_Subscriber] = set()
+        self._connections: set[asyncio.Task] = set()
+        self.dropped = 0
+        "Frames dropped for subscribers that have since detached."
+        self.started = time.monotonic()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stopping: asyncio.Event | None = None
+
+        self.metrics = Metrics() if metrics is None else metrics
+        receiver = self.receiver
+        self.metrics.counter("daemon_frames_received", "Frames received from the instrument.", lambda: receiver.frames)
+        self.metrics.counter("daemon_connects", "Connections made to the instrument.", lambda: receiver.connects)
+        self.metrics.counter("daemon_disconnects", "Connections to the instrument lost.", lambda: receiver.disconnects)
+        self.metrics.counter("daemon_frames_dropped", "Frames dropped for slow subscribers.", self._dropped)
+        self.metrics.gauge("daemon_connected", "1 while connected to the instrument.", lambda: receiver.connected)
+        self.metrics.gauge("daemon_subscribers", "Subscribers attached.", lambda: len(self.subscribers))
+
+    def run(self) -> None:
+        asyncio.run(self.serve())
+
+    async def serve(self) -> None:
+        """Serves clients until stopped. Raises if the connection to the instrument is lost for good."""
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self.started = time.monotonic()
+        server = await _start_server(self._serve_client, self.address)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            # Only available in the main thread, and not on Windows, where Ctrl+C still raises KeyboardInterrupt.
+            with contextlib.suppress(NotImplementedError, RuntimeError):
+                self._loop.add_signal_handler(signum, self._stopping.set)
+        logger.info("Publishing %s:%d at %s.", self.receiver.host, self.port, self.address)
+
+        acquisition = asyncio.create_task(self.receiver.run())
+        stopping = asyncio.create_task(self._stopping.wait())
+        try:
+            await asyncio.wait({acquisition, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            logger.info("Shutting down.")
+            server.close()
+            acquisition.cancel()
+            stopping.cancel()
+            await asyncio.gather(acquisition, return_exceptions=True)
+            await self._close_subscribers()
+            await server.wait_closed()
+            if self.ring is not None:
+                self.ring.close()
+                self.ring = None
+            if isinstance(self.address, Path):
+                self.address.unlink(missing_ok=True)
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                with contextlib.suppress(NotImplementedError, RuntimeError):
+                    self._loop.remove_signal_handler(signum)
+        if not acquisition.cancelled():
+            # Raises the error the receiver gave up on.
+            acquisition.result()
+
+    def stop(self) -> None:
+        """Shuts the daemon down gracefully. Can be called from any thread."""
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    @property
+    def health(self) -> DaemonHealth:
+        receiver = self.receiver
+        return DaemonHealth(
+            host=receiver.host,
+            port=self.port,
+            connected=receiver.connected,
+            uptime=time.monotonic() - self.started,
+            connects=receiver.connects,
+            disconnects=receiver.disconnects,
+            retries=receiver.retries,
+            last_error=receiver.last_error,
+            frames=receiver.frames,
+            bytes_received=receiver.bytes_received,
+            since_last_frame=None if receiver.last_frame is None else time.monotonic() - receiver.last_frame,
+            subscribers=[subscriber.health for subscriber in self.subscribers],
+            dropped=self._dropped(),
+        )
+
+    def _dropped(self) -> int:
+        return self.dropped + sum(subscriber.dropped for subscriber in self.subscribers)
+
+    def _on_frame(self, frame: bytes, timestamp: datetime) -> None:
+        seq = None
+        # However many subscribers there are, the frame is copied into the ring once.
+        if self.ring is not None and len(frame) <= self.ring.slot_size:
+            self.ring.write(frame, timestamp)
+            seq = self.ring.written - 1
+        for subscriber in self.subscribers:
+            subscriber.offer(seq if subscriber.transport is Transport.SharedMemory else (frame, timestamp))
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(asyncio.current_task())
+        try:
+            request = json.loads(await reader.readline())
+            match request.get("request"):
+                case "subscribe":
+                    await self._subscribe(writer, request)
+                case "health":
+                    writer.write(self.health.model_dump_json().encode() + b"\n")
+                case "stop":
+                    writer.write(self.health.model_dump_json().encode() + b"\n")
+                    self._stopping.set()
+                case _:
+                    logger.warning("Ignoring unknown request %r.", request)
+            await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            logger.debug("Client went away: %s", e)
+        finally:
+            writer.close()
+            self._connections.discard(asyncio.current_task())
+
+    async def _subscribe(self, writer: asyncio.StreamWriter, request: dict) -> None:
+        try:
+            policy = CapturePolicy[request.get("policy", CapturePolicy.LatestOnly.name)]
+            transport = Transport[request.get("transport", Transport.Queue.name)]
+        except KeyError as e:
+            await _reply(writer, error=f"Unknown {e}.")
+            return
+        if policy is CapturePolicy.Blocking:
+            await _reply(writer, error="A subscriber cannot push back on the instrument, which others share.")
+            return
+        buffer_size = request.get("buffer_size") or DEFAULT_BUFFER_SIZES[policy]
+        if transport is Transport.SharedMemory and self.ring is None:
+            self.ring = SharedMemoryRingBuffer.create(self.ring_slots, self.slot_size)
+        await _reply(writer, ring=None if transport is Transport.Queue else self.ring.name, pid=os.getpid())
+
+        subscriber = _Subscriber(request.get("name", ""), policy, transport, buffer_size)
+        # Frames queued in the transport or the socket would add to those the subscriber asked to have buffered, and
+        # be sent however stale they got, so keep both small and let its buffer decide what to drop.
+        writer.transport.set_write_buffer_limits(high=0)
+        with contextlib.suppress(OSError):
+            writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _SEND_BUFFER)
+        self.subscribers.add(subscriber)
+        logger.info("Subscriber %r attached, %d in total.", subscriber.name, len(self.subscribers))
+        try:
+            while not (subscriber.closing and not subscriber.frames):
+                await subscriber.ready.wait()
+                subscriber.ready.clear()
+                while subscriber.frames:
+                    offered, frame = subscriber.frames.popleft()
+                    if isinstance(frame, int):
+                        writer.write(_NOTIFICATION.pack(offered, subscriber.dropped, frame))
+                    else:
+                        pulse, timestamp = frame
+                        microseconds = (timestamp - _EPOCH) // _MICROSECOND
+                        header = _FRAME_HEADER.pack(offered, subscriber.dropped, microseconds, len(pulse))
+                        writer.writelines([header, pulse])
+                    # Waits only while the subscriber is slow to take its frames, which are dropped in the meantime.
+                    await writer.drain()
+        finally:
+            self.subscribers.discard(subscriber)
+            self.dropped += subscriber.dropped
+            logger.info("Subscriber %r detached, %d left.", subscriber.name, len(self.subscribers))
+
+    async def _close_subscribers(self) -> None:
+        # Subscribers get the frames they still have buffered, unless that takes longer than `shutdown_timeout`.
+        for subscriber in self.subscribers:
+            subscriber.close()
+        if self._connections:
+            _, pending = await asyncio.wait(set(self._connections), timeout=self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _reply(writer: asyncio.StreamWriter, **kwargs: object) -> None:
+    writer.write(json.dumps(kwargs).encode() + b"\n")
+    await writer.drain()
+
+
+async def _start_server(
+    serve: Callable[[asyncio.StreamReader, asyncio.StreamWriter], Awaitable[None]],
+    address: Address,
+) -> asyncio.Server:
+    if isinstance(address, tuple):
+        return await asyncio.start_server(serve, *address)
+    if address.exists():
+        # A socket left behind by a daemon that did not shut down cleanly refuses connections.
+        try:
+            _connect(address, timeout=1.0).close()
+        except OSError:
+            address.unlink()
+        else:
+            msg = f"Another daemon is already serving at {address}."
+            raise RuntimeError(msg)
+    return await asyncio.start_unix_server(serve, address)
+
+
+def _connect(address: Address, timeout: float | None) -> socket.socket:
+    if isinstance(address, tuple):
+        return socket.create_connection(address, timeout=timeout)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    try:
+        connection.connect(str(address))
+    except OSError:
+        connection.close()
+        raise
+    return connection
+
+
+def _request(address: Address, request: str, timeout: float | None, **kwargs: object) -> socket.socket:
+    connection = _connect(address, timeout)
+    connection.sendall(json.dumps({"request": request, **kwargs}).encode() + b"\n")
+    return connection
+
+
+def daemon_health(address: Address, timeout: float = 5.0) -> DaemonHealth:
+    """Asks the daemon at `address` for its `health`."""
+    with _request(address, "health", timeout) as connection, connection.makefile("rb") as f:
+        return DaemonHealth.model_validate_json(f.readline())
+
+
+def stop_daemon(address: Address, timeout: float = 5.0) -> DaemonHealth:
+    """Shuts down the daemon at `address`, returning its health as of the request."""
+    with _request(address, "stop", timeout) as connection, connection.makefile("rb") as f:
+        return DaemonHealth.model_validate_json(f.readline())
+
+
+class Subscription:
+    """The frames published by the daemon at `address`, from the moment of subscribing.
+
+    Up to `buffer_size` frames are kept for the subscription, by default as many as `TeraflashProClient` would for
+    `policy`, and frames are dropped as `policy` says when it falls further behind: by the daemon, and by the
+    subscription itself for those already on their way, so that `CapturePolicy.LatestOnly` reads what is latest rather
+    than what the socket held. `received` counts the frames offered to the subscription and `dropped` those it lost.
+
+    With `Transport.SharedMemory`, frames are read from the ring the daemon shares between its subscribers, which holds
+    its last `ring_slots` frames; those overwritten before they were read are dropped too. `name` identifies the
+    subscription in the health of the daemon.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        address: Address,
+        policy: CapturePolicy = CapturePolicy.LatestOnly,
+        buffer_size: int | None = None,
+        transport: Transport = Transport.Queue,
+        name: str = "",
+        timeout: float = 5.0,
+    ) -> None:
+        self.address = address
+        self.policy = policy
+        self.buffer_size = DEFAULT_BUFFER_SIZES[policy] if buffer_size is None else buffer_size
+        self.transport = transport
+        self.received = 0
+        self.dropped = 0
+        self.read_size = 1 << 16
+        self.ring: SharedMemoryRingBuffer | None = None
+        self._buffer = bytearray()
+        self._pending: deque[tuple[int, int, tuple[bytes, datetime] | int]] = deque()
+        self._skipped = 0
+        self.connection = _request(
+            address,
+            "subscribe",
+            timeout,
+            policy=policy.name,
+            transport=transport.name,
+            buffer_size=self.buffer_size,
+            name=name,
+        )
+        try:
+            reply = json.loads(self._read_line(time.monotonic() + timeout))
+        except BaseException:
+            self.connection.close()
+            raise
+        if "error" in reply:
+            self.connection.close()
+            raise ValueError(reply["error"])
+        if reply["ring"] is not None:
+            # Only the daemon should unlink the ring, unless it runs in this process and unlinks it itself anyway.
+            self.ring = SharedMemoryRingBuffer.attach(reply["ring"], track=reply["pid"] == os.getpid())
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def read_frame(self, timeout: float | None = None) -> tuple[bytes, datetime]:
+        """Returns the next frame and its receive time, waiting up to `timeout` seconds for it.
+
+        Raises `queue.Empty` on timeout, like `multiprocessing.Queue.get`, and `ConnectionError` once the daemon has
+        shut down and sent every frame it had buffered.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._receive(deadline)
+            if self.policy is CapturePolicy.LatestOnly:
+                while len(self._pending) > self.buffer_size:
+                    self._pending.popleft()
+                    self._skipped += 1
+            self.received, dropped, frame = self._pending.popleft()
+            if isinstance(frame, int):
+                frame = self._read_ring(frame)
+            if frame is None:
+                self._skipped += 1
+            self.dropped = dropped + self._skipped
+            if frame is not None:
+                return frame
+
+    def close(self) -> None:
+        self.connection.close()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def _read_ring(self, seq: int) -> tuple[bytes, datetime] | None:
+        """Copies frame `seq` out of the ring, or returns None if the daemon has overwritten it."""
+        frame = self.ring.get(seq)
+        if frame is None:
+            return None
+        pulse, timestamp = bytes(frame.payload), frame.timestamp
+        valid = self.ring.is_valid(frame)
+        # Release the view of the ring, so that it can be closed.
+        del frame
+        return (pulse, timestamp) if valid else None
+
+    def _receive(self, deadline: float | None) -> None:
+        """Waits for at least one frame, then takes every other one that has arrived already, without waiting."""
+        while not self._pending:
+            self._parse()
+            if not self._pending:
+                self._recv(deadline)
+        self.connection.setblocking(False)  # noqa: FBT003
+        try:
+            while chunk := self.connection.recv(self.read_size):
+                self._buffer += chunk
+        except BlockingIOError:
+            pass
+        self._parse()
+
+    def _parse(self) -> None:
+        offset = 0
+        buffer = self._buffer
+        while True:
+            if self.ring is not None:
+                if len(buffer) - offset < _NOTIFICATION.size:
+                    break
+                received, dropped, seq = _NOTIFICATION.unpack_from(buffer, offset)
+                offset += _NOTIFICATION.size
+                self._pending.append((received, dropped, seq))
+                continue
+            if len(buffer) - offset < _FRAME_HEADER.size:
+                break
+            received, dropped, timestamp, length = _FRAME_HEADER.unpack_from(buffer, offset)
+            end = offset + _FRAME_HEADER.size + length
+            if end > len(buffer):
+                break
+            frame = bytes(buffer[offset + _FRAME_HEADER.size : end])
+            self._pending.append((received, dropped, (frame, _EPOCH + timestamp * _MICROSECOND)))
+            offset = end
+        del buffer[:offset]
+
+    def _read_line(self, deadline: float) -> bytes:
+        while b"\n" not in self._buffer:
+            self._recv(deadline)
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return bytes(line)
+
+    def _recv(self, deadline: float | None) -> None:
+        if deadline is None:
+            self.connection.settimeout(None)
+        else:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise Empty
+            self.connection.settimeout(remaining)
+        try:
+            chunk = self.connection.recv(self.read_size)
+        except TimeoutError:
+            raise Empty from None
+        if not chunk:
+            msg = f"The acquisition daemon at {self.address} has shut down."
+            raise ConnectionError(msg)
+        self._buffer += chunk
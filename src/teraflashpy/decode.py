@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import numpy as np
+
+LINE_SEPARATOR = b"\r\n"
+# Maps the line separator onto a value separator followed by whitespace, which `np.fromstring` skips.
+_FLATTEN_ROWS = bytes.maketrans(LINE_SEPARATOR, b", ")
+
+
+def decode_pulse(pulse: bytes | bytearray | memoryview) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """Decodes a raw pulse payload into its header and float32 time and magnitude arrays.
+
+    The payload is a header line followed by `time,magnitude` rows, all separated by `\\r\\n`. Anything after the last
+    line separator is ignored, as it is not a complete row.
+    """
+    pulse = bytes(pulse)
+    header_end = pulse.find(LINE_SEPARATOR)
+    if header_end == -1:
+        msg = "Pulse payload does not contain a header line."
+        raise ValueError(msg)
+    header = pulse[:header_end].decode("utf-8").split(",")
+
+    body_start = header_end + len(LINE_SEPARATOR)
+    body_end = pulse.rfind(LINE_SEPARATOR)
+    if body_end <= header_end:
+        empty = np.empty(0, dtype=np.float32)
+        return header, empty, empty.copy()
+
+    body = pulse[body_start:body_end]
+    num_rows = body.count(LINE_SEPARATOR) + 1
+    if not _one_comma_per_row(body, num_rows):
+        msg = f"Expected {num_rows} `time,magnitude` rows in pulse payload, but not every row has two columns."
+        raise ValueError(msg)
+    values = np.fromstring(body.translate(_FLATTEN_ROWS), dtype=np.float64, sep=",")
+    if values.size != 2 * num_rows:
+        msg = f"Expected {num_rows} `time,magnitude` rows in pulse payload, but could not parse them all."
+        raise ValueError(msg)
+
+    # Each column is converted straight into an array of its own, so both come out contiguous for the writers.
+    time = np.ascontiguousarray(values[0::2], dtype=np.float32)
+    magnitude = np.ascontiguousarray(values[1::2], dtype=np.float32)
+    return header, time, magnitude
+
+
+def _one_comma_per_row(body: bytes, num_rows: int) -> bool:
+    # Flattening the rows loses where they end, so a row with a column too many and one with a column too few would
+    # still add up to two values a row. Comma `i` has to fall between line separators `i - 1` and `i`.
+    buffer = np.frombuffer(body, dtype=np.uint8)
+    commas = np.flatnonzero(buffer == ord(","))
+    line_ends = np.flatnonzero(buffer == LINE_SEPARATOR[0])
+    if len(commas) != num_rows or len(line_ends) != num_rows - 1:
+        return False
+    return bool((commas[:-1] < line_ends).all() and (commas[1:] > line_ends).all())
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+from teraflashpy.core import LENGTH_PREFIX_SIZE, MAX_FRAME_LENGTH
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+_ASCII_LETTERS = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+
+
+class FrameParser:
+    """Splits the byte stream of an acquisition port into frames.
+
+    Received bytes go into one preallocated buffer, either by copying them in with `feed` or by letting the socket
+    write into `get_buffer` directly, as `asyncio.BufferedProtocol` does. Every complete frame in the buffer is split
+    out at once.
+
+    A length prefix that is not 6 ASCII digits, or that announces an impossible length, means the parser has lost
+    track of the frame boundaries. It then skips ahead to the next position that looks like the start of a frame: a
+    valid prefix followed by a header line, which starts with a letter rather than a digit. Skipped bytes are counted
+    in `bytes_skipped`.
+    """
+
+    def __init__(self, max_frame_length: int = MAX_FRAME_LENGTH, min_read_size: int = 1 << 16) -> None:
+        self.max_frame_length = max_frame_length
+        self.min_read_size = min_read_size
+        # Large enough that, once compacted, the buffer always has room for a whole frame of the maximum length. The
+        # buffer is never resized, as the event loop may still hold a view of it.
+        self._buffer = bytearray(2 * (LENGTH_PREFIX_SIZE + max_frame_length) + min_read_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self._resyncing = False
+        self.frames = 0
+        self.bytes_received = 0
+        self.bytes_skipped = 0
+        self.resyncs = 0
+
+    @property
+    def buffered(self) -> int:
+        return self._end - self._start
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:  # noqa: ARG002
+        if len(self._buffer) - self._end < self.min_read_size:
+            self._compact()
+        return self._view[self._end :]
+
+    def buffer_updated(self, nbytes: int) -> list[bytes]:
+        self._end += nbytes
+        self.bytes_received += nbytes
+        return self._split_frames()
+
+    def feed(self, data: bytes | bytearray | memoryview) -> list[bytes]:
+        frames = []
+        data = memoryview(data)
+        while data:
+            buffer = self.get_buffer()
+            nbytes = min(len(buffer), len(data))
+            buffer[:nbytes] = data[:nbytes]
+            data = data[nbytes:]
+            frames.extend(self.buffer_updated(nbytes))
+        return frames
+
+    def _compact(self) -> None:
+        # Same-size slice assignment does not resize the buffer, so it is allowed while views of it exist.
+        remaining = self._end - self._start
+        self._buffer[:remaining] = self._view[self._start : self._end]
+        self._start, self._end = 0, remaining
+
+    def _split_frames(self) -> list[bytes]:
+        frames = []
+        buffer, start, end = self._buffer, self._start, self._end
+        while end - start >= LENGTH_PREFIX_SIZE:
+            length = self._frame_length(start, end)
+            if length is None:
+                # Skip to the next byte that could start a length prefix.
+                start += 1
+                self.bytes_skipped += 1
+                if not self._resyncing:
+                    self._resyncing = True
+                    self.resyncs += 1
+                    prefix = bytes(buffer[start - 1 : start - 1 + LENGTH_PREFIX_SIZE])
+                    logger.warning("Corrupt frame length prefix %r, resynchronizing.", prefix)
+                continue
+            frame_end = start + LENGTH_PREFIX_SIZE + length
+            if frame_end > end:
+                break
+            frames.append(bytes(self._view[start + LENGTH_PREFIX_SIZE : frame_end]))
+            start = frame_end
+            self._resyncing = False
+        self._start = start
+        self.frames += len(frames)
+        if start == end:
+            self._start = self._end = 0
+        return frames
+
+    def _frame_length(self, start: int, end: int) -> int | None:
+        """Returns the length announced by the prefix at `start`, or None if there is no valid prefix there."""
+        prefix = self._buffer[start : start + LENGTH_PREFIX_SIZE]
+        if not prefix.isdigit():
+            return None
+        length = int(prefix)
+        if not 0 < length <= self.max_frame_length:
+            return None
+        if self._resyncing:
+            payload_start = start + LENGTH_PREFIX_SIZE
+            if payload_start >= end:
+                # Cannot tell yet whether this is the start of a frame; wait for more data by claiming it is.
+                return length
+            if self._buffer[payload_start] not in _ASCII_LETTERS:
+                return None
+        return length
+
+
+class FrameProtocol(asyncio.BufferedProtocol):
+    """Receives frames straight into a `FrameParser` buffer and hands each one to `on_frame` with its receive time."""
+
+    def __init__(self, on_frame: Callable[[bytes, datetime], None], parser: FrameParser | None = None) -> None:
+        self.on_frame = on_frame
+        self.parser = FrameParser() if parser is None else parser
+        self.closed: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.parser.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        timestamp = datetime.now(tz=timezone.utc)
+        for frame in self.parser.buffer_updated(nbytes):
+            self.on_frame(frame, timestamp)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        if self.closed.done():
+            return
+        if exc is None:
+            self.closed.set_result(None)
+        else:
+            self.closed.set_exception(exc)
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Self
+
+import numpy as np
+from pydantic import BaseModel
+
+from teraflashpy.async_client import AsyncTeraflashProClient
+from teraflashpy.core import LOCALHOST, AcquisitionMode
+from teraflashpy.output import PulseBatch
+from teraflashpy.pipeline import BackgroundWriter, Backpressure
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine, Iterable
+    from datetime import timedelta
+    from types import TracebackType
+
+    from teraflashpy.writers import PulseWriter
+
+logger = logging.getLogger(__name__)
+
+
+class Instrument(BaseModel):
+    name: str
+    "Identifies the instrument in `AcquisitionManager.stats` and to the writers and callbacks."
+    host: str = LOCALHOST
+    acquisition_mode: AcquisitionMode = AcquisitionMode.Asynchronous
+    port: int | None = None
+    "Overrides the port of `acquisition_mode`."
+
+
+class InstrumentStats(BaseModel):
+    pulses: int = 0
+    batches: int = 0
+    errors: int = 0
+    started: float | None = None
+    "`time.monotonic()` when the session connected."
+    elapsed: float = 0.0
+    "Seconds since the session connected, as of its latest batch."
+
+    @property
+    def rate(self) -> float:
+        "Pulses per second."
+        return self.pulses / self.elapsed if self.elapsed else 0.0
+
+
+class RoutingWriter:
+    """Writes each `(name, batch)` with the `PulseWriter` of instrument `name`, so one `BackgroundWriter` serves all."""
+
+    def __init__(self, writers: dict[str, PulseWriter]) -> None:
+        self.writers = writers
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        for writer in self.writers.values():
+            writer.close()
+
+    def write(self, item: tuple[str, PulseBatch]) -> None:
+        name, batch = item
+        self.writers[name].write(batch)
+
+
+class AcquisitionManager:
+    """Reads batches from several instruments at once, on one event loop with one connection per instrument.
+
+    Every batch is handed to `on_batch`, if given, and to the writer of its instrument in `writers`. The writers share
+    one `BackgroundWriter`, so file I/O for every instrument happens in a single worker. A session that fails is
+    logged and counted in its `stats`, and the other sessions carry on.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        instruments: Iterable[Instrument],
+        batch_size: int = 100,
+        writers: dict[str, PulseWriter] | None = None,
+        max_pending_writes: int = 16,
+        backpressure: Backpressure = Backpressure.Block,
+        timeout: float | None = 20,
+    ) -> None:
+        self.instruments = list(instruments)
+        names = [instrument.name for instrument in self.instruments]
+        if len(set(names)) != len(names):
+            msg = f"Instrument names must be unique, got {names}."
+            raise ValueError(msg)
+        self.batch_size = batch_size
+        self.writers = writers
+        self.max_pending_writes = max_pending_writes
+        self.backpressure = backpressure
+        self.timeout = timeout
+        self.stats = {name: InstrumentStats() for name in names}
+        self.latest: dict[str, PulseBatch] = {}
+        "The latest batch of every instrument."
+
+    def collect(
+        self,
+        num_batches: int | None = None,
+        duration: timedelta | None = None,
+        on_batch: Callable[[str, PulseBatch], None] | None = None,
+    ) -> dict[str, InstrumentStats]:
+        """Runs `run` on a new event loop, for synchronous code."""
+        return asyncio.run(self.run(num_batches, duration, on_batch))
+
+    async def run(
+        self,
+        num_batches: int | None = None,
+        duration: timedelta | None = None,
+        on_batch: Callable[[str, PulseBatch], None] | None = None,
+    ) -> dict[str, InstrumentStats]:
+        """Reads `num_batches` batches from every instrument, or reads for `duration`, or until cancelled."""
+        pending: asyncio.Queue[tuple[str, PulseBatch] | None] = asyncio.Queue(self.max_pending_writes)
+        deadline = None if duration is None else time.monotonic() + duration.total_seconds()
+        sessions = [
+            self._session(instrument, num_batches, deadline, on_batch, pending) for instrument in self.instruments
+        ]
+        if self.writers is None:
+            await asyncio.gather(*sessions)
+            return self.stats
+        with BackgroundWriter(RoutingWriter(self.writers), self.max_pending_writes, self.backpressure) as writer:
+            tasks = [asyncio.create_task(_forward(pending, writer)), asyncio.create_task(_read(sessions, pending))]
+            try:
+                # Once the writer has failed, nothing makes room in `pending` again, so the sessions are cancelled
+                # rather than left waiting for it; and once a session has failed, nothing ends the forwarding.
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            for task in done:
+                task.result()
+        return self.stats
+
+    async def _session(  # noqa: PLR0913
+        self,
+        instrument: Instrument,
+        num_batches: int | None,
+        deadline: float | None,
+        on_batch: Callable[[str, PulseBatch], None] | None,
+        pending: asyncio.Queue[tuple[str, PulseBatch] | None],
+    ) -> None:
+        name = instrument.name
+        stats = self.stats[name]
+        try:
+            async with AsyncTeraflashProClient(instrument.host, instrument.acquisition_mode, instrument.port) as client:
+                stats.started = time.monotonic()
+                while num_batches is None or stats.batches < num_batches:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+                    batch = await client.read(self.batch_size, self.timeout)
+                    stats.batches += 1
+                    stats.pulses += len(batch)
+                    stats.elapsed = time.monotonic() - stats.started
+                    self.latest[name] = batch
+                    if on_batch is not None:
+                        on_batch(name, batch)
+                    if self.writers is not None:
+                        await pending.put((name, batch))
+        except (OSError, ValueError, asyncio.IncompleteReadError, TimeoutError):
+            stats.errors += 1
+            logger.exception("Acquisition from %s stopped.", name)
+
+
+async def _read(
+    sessions: list[Coroutine[Any, Any, None]],
+    pending: asyncio.Queue[tuple[str, PulseBatch] | None],
+) -> None:
+    await asyncio.gather(*sessions)
+    await pending.put(None)
+
+
+async def _forward(pending: asyncio.Queue[tuple[str, PulseBatch] | None], writer: BackgroundWriter) -> None:
+    # `submit` may block on backpressure, so it runs in a thread, one batch at a time to keep each file in order.
+    while (item := await pending.get()) is not None:
+        await asyncio.to_thread(writer.submit, item)
+
+
+def align(batches: dict[str, PulseBatch], tolerance: timedelta, reference: str | None = None) -> dict[str, PulseBatch]:
+    """Matches the pulses of every batch to those of `reference`, by default the first, with the nearest timestamp.
+
+    Pulses of the reference without a match within `tolerance` in every other batch are left out, so row `i` of
+    every returned batch belongs to the same moment. Timestamps must be in ascending order, as they are when read.
+    """
+    reference = next(iter(batches)) if reference is None else reference
+    times = batches[reference].timestamps
+    keep = np.ones(len(times), dtype=bool)
+    indices: dict[str, np.ndarray] = {reference: np.arange(len(times))}
+    limit = np.timedelta64(tolerance)
+    for name, batch in batches.items():
+        if name == reference:
+            continue
+        other = batch.timestamps
+        if len(other) == 0:
+            keep[:] = False
+            indices[name] = np.zeros(len(times), dtype=np.intp)
+            continue
+        # The nearest pulse is either the first one at or after each reference pulse, or the one before it.
+        after = np.clip(np.searchsorted(other, times), 0, len(other) - 1)
+        before = np.clip(after - 1, 0, len(other) - 1)
+        nearest = np.where(np.abs(other[after] - times) <= np.abs(times - other[before]), after, before)
+        keep &= np.abs(other[nearest] - times) <= limit
+        indices[name] = nearest
+    return {name: _take(batches[name], index[keep]) for name, index in indices.items()}
+
+
+def _take(batch: PulseBatch, index: np.ndarray) -> PulseBatch:
+    return PulseBatch.model_construct(
+        timestamps=batch.timestamps[index],
+        header=batch.header,
+        time=batch.time if batch.shared_time else batch.time[index],
+        magnitude=batch.magnitude[index],
+    )
@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import numbers
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, ClassVar, Self, TypeVar
+
+from teraflashpy.core import LOCALHOST
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+    from types import TracebackType
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = tuple(1e-6 * 2**exponent for exponent in range(25))
+"Upper bounds of the default histogram buckets, in seconds: doubling from 1 us to about 17 s."
+
+
+class Metric(ABC):
+    kind: ClassVar[str]
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+
+    @abstractmethod
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        """Returns `(suffix, labels, value)` for every sample of the metric in the Prometheus text format."""
+
+
+class Counter(Metric):
+    """A count that only goes up. With `function`, the count is read from it instead, e.g. from a shared counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, function: Callable[[], float] | None = None) -> None:
+        super().__init__(name, description)
+        self.function = function
+        self._value = 0
+
+    @property
+    def value(self) -> float:
+        return self._value if self.function is None else self.function()
+
+    def inc(self, amount: float = 1) -> None:
+        self._value += amount
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        return [("_total", {}, self.value)]
+
+
+class Gauge(Metric):
+    """A value that goes up and down. With `function`, the value is read from it, e.g. the depth of a queue."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, function: Callable[[], float] | None = None) -> None:
+        super().__init__(name, description)
+        self.function = function
+        self._value = 0.0
+
+    @property
+    def value(self) -> float:
+        return self._value if self.function is None else self.function()
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        return [("", {}, self.value)]
+
+
+class Histogram(Metric):
+    """Counts observations into buckets with fixed upper bounds, from which `percentile` estimates percentiles.
+
+    An observation costs one binary search over the bounds, so histograms can stay on for every pulse.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, description)
+        self.bounds = sorted(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Estimates the `q`th percentile, interpolating linearly within its bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(lower + (upper - lower) * (rank - cumulative) / count, self.max)
+            cumulative += count
+        return self.max
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts, strict=False):
+            cumulative += count
+            samples.append(("_bucket", {"le": _format_value(bound)}, cumulative))
+        samples.append(("_bucket", {"le": "+Inf"}, self.count))
+        samples.append(("_sum", {}, self.sum))
+        samples.append(("_count", {}, self.count))
+        return samples
+
+
+_MetricT = TypeVar("_MetricT", bound=Metric)
+
+
+class Metrics:
+    """A registry of metrics, all carrying the same `labels`, e.g. `{"instrument": "tf0"}`.
+
+    Components take a `Metrics` to register their metrics in, and create their own if not given one. Pass the same
+    registry to several components to report them together, or give each its own labels and hand all the registries to
+    one sink.
+    """
+
+    def __init__(self, labels: dict[str, str] | None = None, prefix: str = "teraflash_") -> None:
+        self.labels = {} if labels is None else labels
+        self.prefix = prefix
+        self.metrics: dict[str, Metric] = {}
+
+    def counter(self, name: str, description: str, function: Callable[[], float] | None = None) -> Counter:
+        return self._register(Counter(self.prefix + name, description, function))
+
+    def gauge(self, name: str, description: str, function: Callable[[], float] | None = None) -> Gauge:
+        return self._register(Gauge(self.prefix + name, description, function))
+
+    def histogram(self, name: str, description: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, description, buckets))
+
+    def snapshot(self) -> dict[str, float]:
+        """Current values: counters and gauges by name, and the count, mean, p50, p99 and max of every histogram."""
+        values: dict[str, float] = {}
+        for name, metric in self.metrics.items():
+            if isinstance(metric, Histogram):
+                values[f"{name}_count"] = metric.count
+                values[f"{name}_mean"] = metric.mean
+                values[f"{name}_p50"] = metric.percentile(50)
+                values[f"{name}_p99"] = metric.percentile(99)
+                values[f"{name}_max"] = metric.max
+            else:
+                values[name] = metric.value
+        return values
+
+    def _register(self, metric: _MetricT) -> _MetricT:
+        # Registering a name again, e.g. on reopening a client, starts that metric over.
+        self.metrics[metric.name] = metric
+        return metric
+
+
+def render_prometheus(registries: Iterable[Metrics]) -> str:
+    """Renders the metrics of every registry in the Prometheus text exposition format."""
+    families: dict[str, list[tuple[Metric, dict[str, str]]]] = {}
+    for registry in registries:
+        for name, metric in registry.metrics.items():
+            families.setdefault(name, []).append((metric, registry.labels))
+    lines = []
+    for name, family in families.items():
+        lines.append(f"# HELP {name} {family[0][0].description}")
+        lines.append(f"# TYPE {name} {family[0][0].kind}")
+        for metric, labels in family:
+            for suffix, sample_labels, value in metric.samples():
+                lines.append(f"{name}{suffix}{_format_labels({**labels, **sample_labels})} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    # Every digit is kept, or a counter past a million would stand still between steps of `:g`'s last digit.
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(value)
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsSink(ABC):
+    """Receives the metrics of `registries` every time a `MetricsReporter` reports."""
+
+    @abstractmethod
+    def emit(self, registries: list[Metrics]) -> None: ...
+
+    def close(self) -> None:  # noqa: B027
+        pass
+
+
+class LogSink(MetricsSink):
+    """Logs one line per registry, with the change of every counter since the last line as a rate per second."""
+
+    def __init__(self, level: int = logging.INFO, log: logging.Logger = logger) -> None:
+        self.level = level
+        self.log = log
+        self._last: dict[int, tuple[float, dict[str, float]]] = {}
+
+    def emit(self, registries: list[Metrics]) -> None:
+        now = time.monotonic()
+        for registry in registries:
+            snapshot = registry.snapshot()
+            parts = [f"{key}={value:.6g}" for key, value in snapshot.items()]
+            last_time, last = self._last.get(id(registry), (None, {}))
+            if last_time is not None:
+                for name, metric in registry.metrics.items():
+                    if isinstance(metric, Counter) and name in last:
+                        # A counter that went down was registered again, and started over from zero.
+                        change = snapshot[name] - last[name] if snapshot[name] >= last[name] else snapshot[name]
+                        parts.append(f"{name}_rate={change / (now - last_time):.6g}/s")
+            self._last[id(registry)] = (now, snapshot)
+            self.log.log(self.level, "%s %s", registry.labels, " ".join(parts))
+
+
+class CallbackSink(MetricsSink):
+    """Calls `callback` with the snapshot and labels of every registry, e.g. to check for regressions."""
+
+    def __init__(self, callback: Callable[[dict[str, float], dict[str, str]], None]) -> None:
+        self.callback = callback
+
+    def emit(self, registries: list[Metrics]) -> None:
+        for registry in registries:
+            self.callback(registry.snapshot(), registry.labels)
+
+
+class PrometheusSink(MetricsSink):
+    """Serves the latest metrics at `http://host:port/metrics` for Prometheus to scrape.
+
+    Prometheus pulls, so the page is rendered on every request; `emit` has nothing to do. With `port=0`, the operating
+    system picks a free port, which is available as `port` afterwards.
+    """
+
+    def __init__(self, registries: list[Metrics] | None = None, host: str = LOCALHOST, port: int = 9464) -> None:
+        self.registries = [] if registries is None else registries
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_prometheus(sink.registries).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+                logger.debug(format, *args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def emit(self, registries: list[Metrics]) -> None:
+        self.registries = registries
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsReporter:
+    """Hands `registries` to every sink every `interval` seconds from a background thread, and once more on close."""
+
+    def __init__(self, registries: Iterable[Metrics], sinks: Iterable[MetricsSink], interval: float = 10.0) -> None:
+        self.registries = list(registries)
+        self.sinks = list(sinks)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> Self:
+        self.report()
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def report(self) -> None:
+        for sink in self.sinks:
+            try:
+                sink.emit(self.registries)
+            except Exception:  # noqa: PERF203
+                logger.exception("Reporting metrics to %s failed.", type(sink).__name__)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.report()
+        for sink in self.sinks:
+            sink.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.report()
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, NamedTuple, Self
+
+from teraflashpy.oem_commands import OemCommandInput, RcCommand, RdCommand
+from teraflashpy.remote import format_command
+from teraflashpy.states.laser import AcquisitionState, AcquisitionStatus, LaserState, LaserStatus
+from teraflashpy.states.system import SystemState, SystemStatus
+from teraflashpy.states.trans_impedance_amplifier import TransImpedanceAmplifierStatus
+from teraflashpy.states.transfer import TransferStatus
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from types import TracebackType
+
+    from teraflashpy.remote import RemoteControl, Reply
+
+logger = logging.getLogger(__name__)
+
+# The settings each RC command changes, and the value the matching RD command reads back afterwards; None means the
+# command's argument.
+_EFFECTS: dict[RcCommand, dict[RdCommand, str | None]] = {
+    RcCommand.LaserOff: {RdCommand.LaserState: "OFF", RdCommand.EmitterSupplyState: "OFF"},
+    RcCommand.LaserOn: {RdCommand.LaserState: "ON", RdCommand.EmitterSupplyState: "ON"},
+    RcCommand.VoltageOff: {RdCommand.EmitterSupplyState: "OFF"},
+    RcCommand.VoltageOn: {RdCommand.EmitterSupplyState: "ON"},
+    RcCommand.RunOff: {RdCommand.AcquisitionState: "OFF"},
+    RcCommand.RunOn: {RdCommand.AcquisitionState: "ON"},
+    RcCommand.Begin: {RdCommand.MeasuringStartPoint: None},
+    RcCommand.Range: {RdCommand.MeasuringRange: None},
+    RcCommand.Average: {RdCommand.DesiredAverage: None},
+    RcCommand.TransferSliding: {RdCommand.TransferMode: "SLIDING"},
+    RcCommand.TransferBlock: {RdCommand.TransferMode: "BLOCK"},
+    RcCommand.AnalysisReduced: {RdCommand.AnalysisMode: "REDUCED"},
+    RcCommand.AnalysisFullRate: {RdCommand.AnalysisMode: "FULL RATE"},
+    RcCommand.TiaIntern: {RdCommand.TiaMode: "INTERN"},
+    RcCommand.TiaExtern: {RdCommand.TiaMode: "EXTERN"},
+    RcCommand.TiaSensitivity: {RdCommand.TiaSensitivity: None},
+    RcCommand.WaitOn: {RdCommand.WaitButtonState: "ON"},
+    RcCommand.WaitOff: {RdCommand.WaitButtonState: "OFF"},
+    RcCommand.AutoOn: {RdCommand.AutoButtonState: "ON"},
+    RcCommand.AutoOff: {RdCommand.AutoButtonState: "OFF"},
+    RcCommand.ReverseOn: {RdCommand.ReverseButtonState: "ON"},
+    RcCommand.ReverseOff: {RdCommand.ReverseButtonState: "OFF"},
+}
+
+MEASUREMENTS = (RdCommand.Amplitude, RdCommand.TotalAcquisitionTime, RdCommand.RelativeAcquisitionTime)
+"Readings of the measurement itself, which any change of settings makes out of date."
+
+# The TIA is most sensitive in its smallest measuring range.
+_TIA_STATUS = {
+    "100": TransImpedanceAmplifierStatus.Full,
+    "300": TransImpedanceAmplifierStatus.Medium,
+    "1000": TransImpedanceAmplifierStatus.Small,
+}
+
+_LASER_SETTINGS = (RdCommand.LaserState, RdCommand.TransferMode, RdCommand.TiaSensitivity)
+_ACQUISITION_SETTINGS = (
+    RdCommand.AcquisitionState,
+    RdCommand.MeasuringStartPoint,
+    RdCommand.MeasuringRange,
+    RdCommand.DesiredAverage,
+)
+
+
+class _Entry(NamedTuple):
+    value: str
+    updated: float
+    "`time.monotonic()` when the value was read or set."
+
+
+class StateMirror:
+    """Keeps a copy of what the RD commands would read, so that most reads need no round-trip to the instrument.
+
+    `read` answers from the copy if it is at most `max_age` seconds old, and asks the instrument otherwise. RC commands
+    sent through `send` update the copy with the settings they change once the instrument accepts them, and make the
+    `MEASUREMENTS` out of date. With `poll`, those RD commands are read again every `interval` seconds in a background
+    thread, so reads of them stay fresh without waiting.
+
+    The mirror only sees commands sent through it; settings changed elsewhere, e.g. in the TeraFlash software, show up
+    once they are older than `max_age` and read again.
+    """
+
+    def __init__(
+        self,
+        remote: RemoteControl,
+        max_age: float = 1.0,
+        poll: Iterable[RdCommand] = (),
+        interval: float = 1.0,
+    ) -> None:
+        self.remote = remote
+        self.max_age = max_age
+        self.poll = tuple(poll)
+        self.interval = interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[RdCommand, _Entry] = {}
+        # `RemoteControl` is not thread-safe, and a poll must not overtake a command sent in the meantime.
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller: threading.Thread | None = None
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Starts polling, if there is anything to poll."""
+        if self.poll and self._poller is None:
+            self._stop.clear()
+            self._poller = threading.Thread(target=self._run_poller, daemon=True)
+            self._poller.start()
+
+    def stop(self) -> None:
+        if self._poller is not None:
+            self._stop.set()
+            self._poller.join()
+            self._poller = None
+
+    def read(self, command: RdCommand, max_age: float | None = None) -> str:
+        return self.read_many([command], max_age)[0]
+
+    def read_many(self, commands: Iterable[RdCommand], max_age: float | None = None) -> list[str]:
+        """Reads every RD command in `commands`, asking the instrument for those out of date in one pipelined batch."""
+        commands = list(commands)
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            now = time.monotonic()
+            stale = [
+                command
+                for command in dict.fromkeys(commands)
+                if command not in self._entries or now - self._entries[command].updated > max_age
+            ]
+            self.hits += len(commands) - len(stale)
+            self.misses += len(stale)
+            if stale:
+                self._store(self.remote.send_many(stale))
+            return [self._entries[command].value for command in commands]
+
+    def send(self, command: RcCommand, command_input: OemCommandInput | None = None) -> Reply:
+        effects = _EFFECTS.get(command, {})
+        with self._lock:
+            try:
+                reply = self.remote.send(command, command_input)
+            except BaseException:
+                # The instrument may or may not have changed the setting.
+                self._invalidate(effects)
+                raise
+            now = time.monotonic()
+            argument = format_command(command, command_input).rpartition(" ")[2]
+            for setting, value in effects.items():
+                self._entries[setting] = _Entry(argument if value is None else value, now)
+            self._invalidate(MEASUREMENTS)
+        return reply
+
+    def invalidate(self, commands: Iterable[RdCommand] | None = None) -> None:
+        """Makes the next read of `commands`, or of everything, ask the instrument."""
+        with self._lock:
+            self._invalidate(self._entries.keys() if commands is None else commands)
+
+    def acquisition_state(self, max_age: float | None = None) -> AcquisitionState:
+        run, begin, measuring_range, average = self.read_many(_ACQUISITION_SETTINGS, max_age)
+        return AcquisitionState(
+            state=AcquisitionStatus.On if run == "ON" else AcquisitionStatus.Off,
+            start_position=float(begin),
+            measuring_range=int(measuring_range),
+            num_averages=int(average),
+        )
+
+    def laser_state(self, max_age: float | None = None) -> LaserState:
+        laser, transfer, sensitivity = self.read_many(_LASER_SETTINGS, max_age)
+        return LaserState(
+            status=LaserStatus.On if laser == "ON" else LaserStatus.Off,
+            transfer_status=TransferStatus.Block if transfer == "BLOCK" else TransferStatus.Sliding,
+            tia_status=_TIA_STATUS[sensitivity],
+        )
+
+    def system_state(self, max_age: float | None = None) -> SystemState:
+        # The settings of both sub-states are fetched in one batch.
+        self.read_many([*_LASER_SETTINGS, *_ACQUISITION_SETTINGS], max_age)
+        return SystemState(
+            status=SystemStatus.On,
+            laser_state=self.laser_state(max_age=float("inf")),
+            acquisition_state=self.acquisition_state(max_age=float("inf")),
+        )
+
+    def _store(self, replies: Iterable[Reply]) -> None:
+        now = time.monotonic()
+        for reply in replies:
+            self._entries[reply.command] = _Entry(reply.value or "", now)
+
+    def _invalidate(self, commands: Iterable[RdCommand]) -> None:
+        for command in list(commands):
+            self._entries.pop(command, None)
+
+    def _run_poller(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with self._lock:
+                    self._store(self.remote.send_many(self.poll))
+            except (OSError, RuntimeError):  # noqa: PERF203
+                logger.exception("Polling %s failed.", ", ".join(command.value for command in self.poll))
@@ -1,13 +1,148 @@
 from __future__ import annotations
 
-from datetime import datetime  # noqa: TCH003
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
 
+import numpy as np
 import pydantic_numpy as pnp  # noqa: TCH002
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from teraflashpy.statistics import Accumulator
+
+TIMESTAMP_DTYPE = np.dtype("datetime64[us]")
+
 
 class PulseData(BaseModel):
     timestamp: datetime
     header: list[str]
     time: pnp.NpNDArrayFp32
     magnitude: pnp.NpNDArrayFp32
+
+
+class PulseBatch(BaseModel):
+    """Pulses stored column-wise: one row of `magnitude` per pulse.
+
+    `time` is a single axis of shape `(n_samples,)` when every pulse shares it, and has one row per pulse otherwise.
+    `timestamps` are UTC. Iterating or indexing the batch yields `PulseData` views for code that works pulse by pulse.
+    """
+
+    timestamps: pnp.NpNDArrayDatetime64
+    header: list[str]
+    time: pnp.NpNDArrayFp32
+    magnitude: pnp.NpNDArrayFp32
+
+    @property
+    def num_pulses(self) -> int:
+        return self.magnitude.shape[0]
+
+    @property
+    def num_samples(self) -> int:
+        return self.magnitude.shape[1]
+
+    @property
+    def shared_time(self) -> bool:
+        return self.time.ndim == 1
+
+    def __len__(self) -> int:
+        return self.num_pulses
+
+    def __getitem__(self, index: int) -> PulseData:
+        timestamp = self.timestamps[index].astype(datetime).replace(tzinfo=timezone.utc)
+        time = self.time if self.shared_time else self.time[index]
+        # The arrays are already float32, so the views do not need to be validated again.
+        return PulseData.model_construct(
+            timestamp=timestamp,
+            header=self.header,
+            time=time,
+            magnitude=self.magnitude[index],
+        )
+
+    def __iter__(self) -> Iterator[PulseData]:  # type: ignore[override]
+        return (self[index] for index in range(self.num_pulses))
+
+    def to_pulses(self) -> list[PulseData]:
+        return list(self)
+
+
+class PulseFormatChangedError(RuntimeError):
+    """Raised by `accumulate` when a pulse has another header or number of samples than those accumulated before it.
+
+    That pulse, and those after it, are returned by the next call to `read` or `accumulate`. `result` holds the
+    accumulator, with the pulses before the change folded in.
+    """
+
+    def __init__(self, header: list[str], num_samples: int, accumulated_header: list[str], result: Accumulator) -> None:
+        super().__init__(
+            f"A pulse with header {header} and {num_samples} samples cannot be added to the pulses with header "
+            f"{accumulated_header} and {result.num_samples} samples accumulated before it. Reset the accumulator or "
+            "pass a new one to accumulate it.",
+        )
+        self.result = result
+
+
+class PulseBatchBuilder:
+    """Fills a preallocated `PulseBatch` one decoded pulse at a time.
+
+    Pulses in a batch share its header and number of samples. A pulse that differs from the earlier ones is refused
+    by `set`, so that the caller can build a batch from the pulses before it and start a new one with it.
+    """
+
+    def __init__(self, num_pulses: int) -> None:
+        self.num_pulses = num_pulses
+        self.timestamps = np.empty(num_pulses, dtype=TIMESTAMP_DTYPE)
+        self.header: list[str] = []
+        self.time = np.empty(0, dtype=np.float32)
+        self.magnitude = np.empty((num_pulses, 0), dtype=np.float32)
+        self._allocated = False
+
+    def set(  # noqa: PLR0913
+        self,
+        index: int,
+        timestamp: datetime,
+        header: list[str],
+        time: np.ndarray,
+        magnitude: np.ndarray,
+    ) -> bool:
+        """Stores pulse `index` and returns True, or returns False without storing it if its header or number of
+        samples differs from those of the earlier pulses.
+        """
+        if not self._allocated:
+            self.header = header
+            self.time = np.asarray(time, dtype=np.float32)
+            self.magnitude = np.empty((self.num_pulses, magnitude.size), dtype=np.float32)
+            self._allocated = True
+        elif magnitude.size != self.magnitude.shape[1] or header != self.header:
+            return False
+
+        if self.time.ndim == 1 and not np.array_equal(time, self.time):
+            # The time axis changed mid-batch, so from here on every pulse keeps its own.
+            self.time = np.broadcast_to(self.time, self.magnitude.shape).copy()
+        if self.time.ndim == 2:  # noqa: PLR2004
+            self.time[index] = time
+
+        self.timestamps[index] = np.datetime64(timestamp.astimezone(timezone.utc).replace(tzinfo=None), "us")
+        self.magnitude[index] = magnitude
+        return True
+
+    def build(self, num_pulses: int | None = None) -> PulseBatch:
+        "Builds the batch from its first `num_pulses` pulses, or from all of them."
+        end = self.num_pulses if num_pulses is None else num_pulses
+        time = self.time if self.time.ndim == 1 else self.time[:end]
+        return PulseBatch(
+            timestamps=self.timestamps[:end],
+            header=self.header,
+            time=time,
+            magnitude=self.magnitude[:end],
+        )
+
+
+class CaptureStats(BaseModel):
+    received: int
+    "Pulses received from the instrument this session."
+    dropped: int
+    "Pulses discarded because the buffer between the backend and the reader was full."
+    read: int
+    "Pulses returned by `read` this session."
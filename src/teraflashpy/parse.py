@@ -1,89 +1,117 @@
 from __future__ import annotations
 
 import re
-import typing
+from functools import lru_cache
+from typing import TYPE_CHECKING, NamedTuple
 
-from teraflashpy import Command
 from teraflashpy.commands import (
     AcquisitionAverageInput,
     AcquisitionBeginInput,
     AcquisitionRangeInput,
+    Command,
     CommandInput,
     LaserSetInput,
     NoInput,
     SystemMonitorInput,
 )
 
-REGEX_EXPR = r"""
-((SYSTEM) : ((STOP)|(TELL STATUS)|((MONITOR) (\d+))|(TIA FULL)|(TIA ATN1)|(TIA ATN2)))
-|
-((LASER) : ((OFF)|(ON)|((SET) ([+-]?([0-9]*[.])?[0-9]+))))
-|
-((ACQUISITION) : (((BEGIN) ([+-]?([0-9]*[.])?[0-9]+))|((RANGE) (\d+))|(STOP)|(START)|((AVERAGE) (\d+))|(RESET AVG)))
-|
-((TRANSMISSION) : ((SLIDING)|(BLOCK)))
-""".replace("\n", "")
-
-
-def parse_string(string: str) -> tuple[Command, CommandInput]:  # noqa: PLR0911
-    matches = re.findall(REGEX_EXPR, string)
-
-    for match in matches:
-        system = match[:11]
-        laser = match[11:20]
-        acquisition = match[20:36]
-        transmission = match[36:]
-        if system[0]:
-            match system:
-                case (_, "SYSTEM", "STOP", "STOP", "", "", "", "", "", "", ""):
-                    return Command.SystemStop, NoInput()
-                case (_, "SYSTEM", "TELL STATUS", "", "TELL STATUS", "", "", "", "", "", ""):
-                    return Command.SystemTellStatus, NoInput()
-                case (_, "SYSTEM", _, "", "", _, "MONITOR", code, "", "", ""):
-                    return Command.SystemMonitor, SystemMonitorInput(code=code)
-                case (_, "SYSTEM", "TIA FULL", "", "", "", "", "", "TIA FULL", "", ""):
-                    return Command.SystemTiaFull, NoInput()
-                case (_, "SYSTEM", "TIA ATN1", "", "", "", "", "", "", "TIA ATN1", ""):
-                    return Command.SystemTiaAtn1, NoInput()
-                case (_, "SYSTEM", "TIA ATN2", "", "", "", "", "", "", "", "TIA ATN2"):
-                    return Command.SystemTiaAtn2, NoInput()
-                case _:
-                    typing.assert_never(system)
-        elif laser[0]:
-            match laser:
-                case (_, "LASER", "OFF", "OFF", "", "", "", "", ""):
-                    return Command.LaserOff, NoInput()
-                case (_, "LASER", "ON", "", "ON", "", "", "", ""):
-                    return Command.LaserOn, NoInput()
-                case (_, "LASER", _, "", "", _, "SET", pump_current, _):
-                    return Command.LaserSet, LaserSetInput(pump_current=pump_current)
-                case _:
-                    typing.assert_never(laser)
-        elif acquisition[0]:
-            match acquisition:
-                case (_, "ACQUISITION", _, _, "BEGIN", start_position, _, "", "", "", "", "", "", "", "", ""):
-                    return Command.AcquisitionBegin, AcquisitionBeginInput(start_position=start_position)
-                case (_, "ACQUISITION", _, "", "", "", "", _, "RANGE", measuring_range, "", "", "", "", "", ""):
-                    return Command.AcquisitionRange, AcquisitionRangeInput(measuring_range=measuring_range)
-                case (_, "ACQUISITION", "STOP", "", "", "", "", "", "", "", "STOP", "", "", "", "", ""):
-                    return Command.AcquisitionStop, NoInput()
-                case (_, "ACQUISITION", "START", "", "", "", "", "", "", "", "", "START", "", "", "", ""):
-                    return Command.AcquisitionStart, NoInput()
-                case (_, "ACQUISITION", _, "", "", "", "", "", "", "", "", "", _, "AVERAGE", num_averages, ""):
-                    return Command.AcquisitionAverage, AcquisitionAverageInput(num_averages=num_averages)
-                case (_, "ACQUISITION", "RESET AVG", "", "", "", "", "", "", "", "", "", "", "", "", "RESET AVG"):
-                    return Command.AcquisitionResetAvg, NoInput()
-                case _:
-                    typing.assert_never(laser)
-        elif transmission[0]:
-            match transmission:
-                case (_, "TRANSMISSION", "SLIDING", "SLIDING", ""):
-                    return Command.TransmissionSliding, NoInput()
-                case (_, "TRANSMISSION", "BLOCK", "", "BLOCK"):
-                    return Command.TransmissionBlock, NoInput()
-        else:
-            msg = "Input string cannot be parsed to a command."
-            raise ValueError(msg)
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+_GROUP = re.compile(r"(SYSTEM|LASER|ACQUISITION|TRANSMISSION) : ")
+_INTEGER = re.compile(r"\d+")
+_FLOAT = re.compile(r"[+-]?(?:[0-9]*[.])?[0-9]+")
+
+
+class _Argument(NamedTuple):
+    field: str
+    pattern: re.Pattern[str]
+    convert: Callable[[str], int | float]
+
+
+class _Subcommand(NamedTuple):
+    keyword: str
+    command: Command
+    input_model: type[CommandInput] = NoInput
+    argument: _Argument | None = None
+
+
+# Subcommands of every command group, tried in order against the text following "<GROUP> : ".
+_SUBCOMMANDS: dict[str, tuple[_Subcommand, ...]] = {
+    "SYSTEM": (
+        _Subcommand("STOP", Command.SystemStop),
+        _Subcommand("TELL STATUS", Command.SystemTellStatus),
+        _Subcommand("MONITOR ", Command.SystemMonitor, SystemMonitorInput, _Argument("code", _INTEGER, int)),
+        _Subcommand("TIA FULL", Command.SystemTiaFull),
+        _Subcommand("TIA ATN1", Command.SystemTiaAtn1),
+        _Subcommand("TIA ATN2", Command.SystemTiaAtn2),
+    ),
+    "LASER": (
+        _Subcommand("OFF", Command.LaserOff),
+        _Subcommand("ON", Command.LaserOn),
+        _Subcommand("SET ", Command.LaserSet, LaserSetInput, _Argument("pump_current", _FLOAT, float)),
+    ),
+    "ACQUISITION": (
+        _Subcommand(
+            "BEGIN ",
+            Command.AcquisitionBegin,
+            AcquisitionBeginInput,
+            _Argument("start_position", _FLOAT, float),
+        ),
+        _Subcommand(
+            "RANGE ",
+            Command.AcquisitionRange,
+            AcquisitionRangeInput,
+            _Argument("measuring_range", _INTEGER, int),
+        ),
+        _Subcommand("STOP", Command.AcquisitionStop),
+        _Subcommand("START", Command.AcquisitionStart),
+        _Subcommand(
+            "AVERAGE ",
+            Command.AcquisitionAverage,
+            AcquisitionAverageInput,
+            _Argument("num_averages", _INTEGER, int),
+        ),
+        _Subcommand("RESET AVG", Command.AcquisitionResetAvg),
+    ),
+    "TRANSMISSION": (
+        _Subcommand("SLIDING", Command.TransmissionSliding),
+        _Subcommand("BLOCK", Command.TransmissionBlock),
+    ),
+}
+
+
+def parse_string(string: str) -> tuple[Command, CommandInput]:
+    """Parses the first command found in `string`, such as `"LASER : SET 42.5"`.
+
+    Results are cached per string. Command inputs are frozen, so the cached inputs are returned as they are.
+    """
+    return _parse_cached(string)
+
+
+def parse_strings(strings: Iterable[str]) -> list[tuple[Command, CommandInput]]:
+    return [parse_string(string) for string in strings]
+
+
+def parse_script(script: str) -> list[tuple[Command, CommandInput]]:
+    """Parses one command per line, skipping blank lines and lines starting with `#`."""
+    lines = (line.strip() for line in script.splitlines())
+    return parse_strings(line for line in lines if line and not line.startswith("#"))
+
+
+@lru_cache(maxsize=1024)
+def _parse_cached(string: str) -> tuple[Command, CommandInput]:
+    for group in _GROUP.finditer(string):
+        position = group.end()
+        for subcommand in _SUBCOMMANDS[group[1]]:
+            if not string.startswith(subcommand.keyword, position):
+                continue
+            argument = subcommand.argument
+            if argument is None:
+                return subcommand.command, subcommand.input_model()
+            value = argument.pattern.match(string, position + len(subcommand.keyword))
+            if value is not None:
+                return subcommand.command, subcommand.input_model(**{argument.field: argument.convert(value[0])})
     msg = "Input string cannot be parsed to a command."
     raise ValueError(msg)
 
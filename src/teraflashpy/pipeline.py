@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import contextlib
+import logging
+import math
+import multiprocessing
+import queue
+import threading
+from enum import Enum
+from time import perf_counter
+from typing import TYPE_CHECKING, Self
+
+from teraflashpy.core import WorkerKind
+from teraflashpy.metrics import Metrics
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from types import TracebackType
+
+    from teraflashpy.output import PulseBatch
+    from teraflashpy.writers import PulseWriter
+
+logger = logging.getLogger(__name__)
+
+
+class Backpressure(Enum):
+    Block = 0
+    "Waits for the writer to catch up, which holds up the next read."
+    DropOldest = 1
+    "Discards the oldest batch waiting to be written, or the batch being submitted if that did not make room."
+    DropNewest = 2
+    "Discards the batch being submitted."
+
+
+class BackgroundWriter:
+    """Hands pulse batches to a `PulseWriter` running in a worker thread or process.
+
+    Submitted batches wait in a queue of at most `max_pending` batches. When it is full, `backpressure` decides
+    whether `submit` blocks or a batch is discarded; discarded batches are counted in `dropped`. Errors raised by the
+    writer are re-raised by the next call to `submit` or `close`.
+
+    The time `submit` blocks, the depth of the queue and the time the writer takes per batch are registered in
+    `metrics`. A worker process sends its write times back through a queue of their own, which is drained by `submit`
+    and `close`.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        writer: PulseWriter,
+        max_pending: int = 4,
+        backpressure: Backpressure = Backpressure.Block,
+        worker: WorkerKind = WorkerKind.Thread,
+        metrics: Metrics | None = None,
+    ) -> None:
+        self.writer = writer
+        self.max_pending = max_pending
+        self.backpressure = backpressure
+        self.worker_kind = worker
+        self.dropped = 0
+        self.submitted = 0
+        self.max_pending_seen = 0
+        self.poll_interval = 0.5
+        self._error: BaseException | None = None
+        self.metrics = Metrics() if metrics is None else metrics
+
+    def __enter__(self) -> Self:
+        metrics = self.metrics
+        metrics.gauge("writer_pending", "Batches waiting to be written.", lambda: self.pending)
+        metrics.counter("batches_submitted", "Batches submitted for writing.", lambda: self.submitted)
+        metrics.counter("batches_dropped", "Batches discarded as the writer fell behind.", lambda: self.dropped)
+        self._submit_time = metrics.histogram("submit_seconds", "Time `submit` blocked for.")
+        self._write_time = metrics.histogram("write_seconds", "Time the writer took per batch.")
+        if self.worker_kind is WorkerKind.Process:
+            self.queue = multiprocessing.Queue(maxsize=self.max_pending)
+            self._write_times: multiprocessing.Queue[float] | None = multiprocessing.Queue()
+            self.worker = multiprocessing.Process(
+                target=_write_batches,
+                args=(self.writer, self.queue, self._write_times.put),
+            )
+        else:
+            self.queue = queue.Queue(maxsize=self.max_pending)
+            self._write_times = None
+            self.worker = threading.Thread(target=self._write_batches_in_thread, daemon=True)
+        self.worker.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    @property
+    def pending(self) -> float:
+        "Number of batches waiting to be written, or nan where it cannot be known."
+        try:
+            return self.queue.qsize()
+        except NotImplementedError:
+            # `qsize` is not available on macOS.
+            return float("nan")
+
+    def submit(self, batch: PulseBatch) -> bool:
+        """Queues a batch for writing. Returns whether the batch was queued."""
+        self._raise_worker_error()
+        self._collect_write_times()
+        start = perf_counter()
+        self.submitted += 1
+        queued = True
+        match self.backpressure:
+            case Backpressure.Block:
+                self._put_blocking(batch)
+            case Backpressure.DropOldest:
+                queued = self._put_in_place_of_oldest(batch)
+            case Backpressure.DropNewest:
+                try:
+                    self.queue.put_nowait(batch)
+                except queue.Full:
+                    self.dropped += 1
+                    queued = False
+                    logger.warning("Writer is %d batches behind, discarding the newest batch.", self.max_pending)
+        pending = self.pending
+        if not math.isnan(pending):
+            self.max_pending_seen = max(self.max_pending_seen, int(pending))
+        self._submit_time.observe(perf_counter() - start)
+        return queued
+
+    def close(self) -> None:
+        """Writes the remaining batches, then stops the worker."""
+        if self.worker.is_alive():
+            self._put_blocking(None)
+            self.worker.join()
+        self._collect_write_times()
+        self._raise_worker_error()
+
+    def _put_blocking(self, batch: PulseBatch | None) -> None:
+        while True:
+            try:
+                self.queue.put(batch, timeout=self.poll_interval)
+            except queue.Full:  # noqa: PERF203
+                # Without this check, a writer that died would leave us waiting for space forever.
+                if not self.worker.is_alive():
+                    self._raise_worker_error()
+                    msg = "Writer stopped before all batches were written."
+                    raise RuntimeError(msg) from None
+            else:
+                return
+
+    def _put_in_place_of_oldest(self, batch: PulseBatch) -> bool:
+        with contextlib.suppress(queue.Full):
+            self.queue.put_nowait(batch)
+            return True
+        # Like `teraflashpy.client._put_latest`, give up after one retry rather than spin: a full process queue can look
+        # empty to `get_nowait` until its feeder thread has flushed it.
+        self._discard_oldest()
+        try:
+            self.queue.put_nowait(batch)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Writer is %d batches behind, discarding the newest batch.", self.max_pending)
+            return False
+        return True
+
+    def _discard_oldest(self) -> None:
+        try:
+            self.queue.get_nowait()
+        except queue.Empty:
+            return
+        self.dropped += 1
+        logger.warning("Writer is %d batches behind, discarding the oldest batch.", self.max_pending)
+
+    def _collect_write_times(self) -> None:
+        if self._write_times is None:
+            return
+        while True:
+            try:
+                self._write_time.observe(self._write_times.get_nowait())
+            except queue.Empty:  # noqa: PERF203
+                return
+
+    def _write_batches_in_thread(self) -> None:
+        try:
+            _write_batches(self.writer, self.queue, self._write_time.observe)
+        except BaseException as e:  # noqa: BLE001
+            self._error = e
+
+    def _raise_worker_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        if self.worker_kind is WorkerKind.Process and self.worker.exitcode not in (None, 0):
+            msg = f"Writer process exited with code {self.worker.exitcode}."
+            raise RuntimeError(msg)
+
+
+def _write_batches(
+    writer: PulseWriter,
+    batches: queue.Queue[PulseBatch | None],
+    observe_write_time: Callable[[float], None],
+) -> None:
+    with writer:
+        while (batch := batches.get()) is not None:
+            start = perf_counter()
+            writer.write(batch)
+            observe_write_time(perf_counter() - start)
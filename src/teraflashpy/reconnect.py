@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from teraflashpy.framing import FrameProtocol
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class Backoff(BaseModel):
+    """How long to wait before each attempt to reconnect: `initial` seconds after the first failure, growing by
+    `factor` with every failure in a row up to `maximum`. Each delay is randomised by up to `jitter` of itself, so
+    clients that lost the instrument together do not retry in lockstep.
+    """
+
+    initial: float = 0.1
+    maximum: float = 10.0
+    factor: float = 2.0
+    jitter: float = 0.2
+    attempts: int | None = None
+    "Gives up after this many attempts to reconnect fail in a row. None retries forever, 0 never reconnects."
+
+    def delay(self, attempt: int) -> float:
+        """The delay before attempt `attempt` to reconnect, counting from 0."""
+        delay = min(self.initial * self.factor**attempt, self.maximum)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)  # noqa: S311
+
+
+class FrameReceiver:
+    """Receives frames from an acquisition port into `on_frame`, reconnecting with `backoff` when the connection fails
+    or is closed.
+
+    Every connection gets a new parser, so a frame cut short by a lost connection is discarded rather than joined to
+    the start of the next one. The state of the connection is kept in the attributes, for reporting health.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        on_frame: Callable[[bytes, datetime], None],
+        backoff: Backoff | None = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.on_frame = on_frame
+        self.backoff = Backoff() if backoff is None else backoff
+        self.connected = False
+        self.connects = 0
+        self.disconnects = 0
+        self.retries = 0
+        "Attempts to reconnect since the last successful connection."
+        self.last_error: str | None = None
+        self.frames = 0
+        self.bytes_received = 0
+        self.last_frame: float | None = None
+        "`time.monotonic()` when the latest frame arrived."
+
+    async def run(self) -> None:
+        """Receives frames until cancelled, or until `backoff.attempts` attempts to reconnect in a row have failed.
+
+        Then returns if the instrument closed the last connection, and raises the error it failed with otherwise.
+        """
+        while True:
+            error = None
+            try:
+                await self._receive()
+                self.last_error = "The instrument closed the connection."
+            except OSError as e:
+                error = e
+                self.last_error = f"{type(e).__name__}: {e}"
+            if self.backoff.attempts is not None and self.retries >= self.backoff.attempts:
+                if error is None:
+                    return
+                raise error
+            delay = self.backoff.delay(self.retries)
+            self.retries += 1
+            logger.warning(
+                "Lost the connection to %s:%d (%s). Reconnecting in %.2f s.",
+                self.host,
+                self.port,
+                self.last_error,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+    async def _receive(self) -> None:
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_connection(lambda: FrameProtocol(self._on_frame), self.host, self.port)
+        self.connected = True
+        self.connects += 1
+        self.retries = 0
+        logger.info("Connected to %s:%d.", self.host, self.port)
+        try:
+            await protocol.closed
+        finally:
+            self.connected = False
+            self.disconnects += 1
+            transport.close()
+            parser = protocol.parser
+            logger.debug(
+                {
+                    "frames": parser.frames,
+                    "bytes_received": parser.bytes_received,
+                    "bytes_skipped": parser.bytes_skipped,
+                    "bytes_buffered": parser.buffered,
+                },
+            )
+
+    def _on_frame(self, frame: bytes, timestamp: datetime) -> None:
+        self.frames += 1
+        self.bytes_received += len(frame)
+        self.last_frame = time.monotonic()
+        self.on_frame(frame, timestamp)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+    from types import TracebackType
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TFRAWLOG"
+VERSION = 1
+INDEX_SUFFIX = ".idx"
+INDEX_DTYPE = np.dtype([("offset", "<i8"), ("length", "<i8"), ("timestamp", "<i8")])
+"One index entry per frame: offset and length of its payload in the log, and its timestamp in us since the epoch."
+
+_FILE_HEADER = struct.Struct("<8sI")
+# Every record starts with the timestamp of the frame in us since the epoch, and the length of its payload.
+_RECORD_HEADER = struct.Struct("<qI")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def index_path(path: Path) -> Path:
+    return path.with_suffix(path.suffix + INDEX_SUFFIX)
+
+
+class FrameRecorder:
+    """Appends raw frames from an acquisition port and their receive timestamps to a new frame log at `path`.
+
+    The log holds one record per frame, a small header followed by the payload as received. The sidecar index next to
+    it holds the offset, length and timestamp of every record and is written after the record, so every indexed frame
+    is complete on disk. Writes are unbuffered, so a recorder in a process that is terminated loses at most the frame it
+    was writing.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.num_frames = 0
+        # Exclusive creation, so that a recording is never overwritten by accident.
+        self._log = path.open("xb", buffering=0)
+        self._index = index_path(path).open("xb", buffering=0)
+        self._log.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        self._offset = _FILE_HEADER.size
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def write(self, frame: bytes | bytearray | memoryview, timestamp: datetime) -> None:
+        length = len(frame)
+        timestamp_us = (timestamp - _EPOCH) // _MICROSECOND
+        self._log.write(_RECORD_HEADER.pack(timestamp_us, length) + frame)
+        payload_offset = self._offset + _RECORD_HEADER.size
+        self._index.write(np.array((payload_offset, length, timestamp_us), dtype=INDEX_DTYPE).tobytes())
+        self._offset = payload_offset + length
+        self.num_frames += 1
+
+    def close(self) -> None:
+        self._log.close()
+        self._index.close()
+
+
+class FrameLog:
+    """Memory-maps a frame log written by `FrameRecorder`, for random access to the frames in it.
+
+    Frames are returned as views of the mapped file, so nothing is read from disk until it is used. Release the views,
+    or copy them, before closing the log.
+
+    An index that is missing or lags behind the log, as after a crash, is completed by scanning the records it does
+    not cover; a record cut short at the end of the log is ignored.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as f:
+            if os.fstat(f.fileno()).st_size < _FILE_HEADER.size:
+                # Too short to map, as when the recorder crashed right after creating the log.
+                msg = f"{path} is cut short before the end of its header."
+                raise ValueError(msg)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, version = _FILE_HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            msg = f"{path} is not a frame log of version {VERSION}."
+            raise ValueError(msg)
+        self.index = self._load_index()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, index: int) -> tuple[memoryview, datetime]:
+        offset, length, timestamp_us = self.index[index].tolist()
+        return self._view[offset : offset + length], _EPOCH + timestamp_us * _MICROSECOND
+
+    def __iter__(self) -> Iterator[tuple[memoryview, datetime]]:
+        return (self[index] for index in range(len(self)))
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        "Receive time of every frame as UTC datetime64[us]."
+        return self.index["timestamp"].astype("datetime64[us]")
+
+    def close(self) -> None:
+        self._view.release()
+        self._mmap.close()
+
+    def _load_index(self) -> np.ndarray:
+        size = len(self._mmap)
+        path = index_path(self.path)
+        index = np.fromfile(path, dtype=INDEX_DTYPE) if path.exists() else np.empty(0, dtype=INDEX_DTYPE)
+        index = index[index["offset"] + index["length"] <= size]
+        offset = int(index["offset"][-1] + index["length"][-1]) if len(index) else _FILE_HEADER.size
+        if offset == size:
+            return index
+
+        recovered = []
+        while offset + _RECORD_HEADER.size <= size:
+            timestamp_us, length = _RECORD_HEADER.unpack_from(self._mmap, offset)
+            offset += _RECORD_HEADER.size
+            if offset + length > size:
+                break
+            recovered.append((offset, length, timestamp_us))
+            offset += length
+        if not recovered:
+            # Only a record cut short follows the frames in the index.
+            return index
+        logger.warning("Recovered %d frames of %s missing from its index.", len(recovered), self.path)
+        return np.concatenate([index, np.array(recovered, dtype=INDEX_DTYPE)])
+
+
+def replay(log: FrameLog, speed: float | None = 1.0) -> Iterator[tuple[memoryview, datetime]]:
+    """Yields the frames in `log` with their original timestamps.
+
+    Frames are paced as they were received, sped up by `speed`. With `speed=None`, they are yielded as fast as they
+    are consumed.
+    """
+    timestamps = log.index["timestamp"]
+    start = time.perf_counter()
+    for index in range(len(log)):
+        if speed is not None:
+            due = start + (timestamps[index] - timestamps[0]) / 1e6 / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        yield log[index]
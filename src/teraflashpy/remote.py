@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import logging
+import select
+import socket
+import struct
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import TYPE_CHECKING, Self
+
+from pydantic import BaseModel
+
+from teraflashpy.commands import INPUT_TYPES, Command, CommandInput, CommandResult, NoInput
+from teraflashpy.core import COMMAND_PORT, HOST_ADDRESS, LOCALHOST, RC_DEVICE_PORT, RC_READ_PORT, RC_WRITE_PORT
+from teraflashpy.oem_commands import INPUT_TYPES as OEM_INPUT_TYPES
+from teraflashpy.oem_commands import OemCommandInput, RcCommand, RdCommand
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from types import TracebackType
+
+logger = logging.getLogger(__name__)
+
+AnyCommand = Command | RcCommand | RdCommand
+AnyCommandInput = CommandInput | OemCommandInput
+Request = AnyCommand | tuple[AnyCommand, AnyCommandInput | None]
+"A command, or a command with its input."
+
+# Every message to and from the device's command port starts with these five big-endian 32-bit words.
+MESSAGE_HEADER = struct.Struct(">5I")
+MESSAGE_MAGIC = (0xCDEF1234, 0x789AFEDC)
+MESSAGE_COMMAND = 2
+MESSAGE_ANSWER = 3
+
+NOT_IDEMPOTENT: frozenset[AnyCommand] = frozenset(
+    {
+        Command.AcquisitionResetAvg,
+        RcCommand.SaveWithSpectrum,
+        RcCommand.SaveWithoutSpectrum,
+        RcCommand.SetRef,
+        RcCommand.SetBackground,
+    },
+)
+"Commands that act anew every time they are carried out, so they are never sent again after a timeout."
+
+
+class RemoteControlError(RuntimeError):
+    pass
+
+
+class Reply(BaseModel):
+    command: AnyCommand
+    result: CommandResult
+    value: str | None = None
+    "The parameter of an `OK` reply, the error description, or the reported parameter."
+    raw: str
+
+    @classmethod
+    def parse(cls: type[Reply], command: AnyCommand, raw: str) -> Reply:
+        # Replies are "OK", "OK <parameter>", "ERROR ...", or, for some `Command`s, just a parameter.
+        word, _, rest = raw.strip().partition(" ")
+        match word:
+            case "OK":
+                return cls(command=command, result=CommandResult.Ok, value=rest.strip() or None, raw=raw)
+            case "ERROR":
+                return cls(command=command, result=CommandResult.Error, value=rest.strip() or None, raw=raw)
+            case _:
+                return cls(command=command, result=CommandResult.Parameter, value=raw.strip(), raw=raw)
+
+
+def format_command(command: AnyCommand, command_input: AnyCommandInput | None = None) -> str:
+    """Fills the arguments from `command_input` into the template of `command`, e.g. `"RC-BEGIN %.1f"`.
+
+    Raises `TypeError` if `command_input` is not the input `command` takes, so that nothing the instrument would
+    misread is sent.
+    """
+    expected = INPUT_TYPES.get(command) if isinstance(command, Command) else OEM_INPUT_TYPES.get(command)
+    if expected is None:
+        if command_input is not None and not isinstance(command_input, NoInput):
+            msg = f"{command.name} takes no argument, not {type(command_input).__name__}."
+            raise TypeError(msg)
+        return command.value
+    if not isinstance(command_input, expected):
+        msg = f"{command.name} takes {expected.__name__}, not {type(command_input).__name__}."
+        raise TypeError(msg)
+    return command.value % tuple(command_input.model_dump(mode="json").values())
+
+
+def _requests(requests: Iterable[Request]) -> list[tuple[AnyCommand, str]]:
+    formatted = []
+    for request in requests:
+        command, command_input = request if isinstance(request, tuple) else (request, None)
+        formatted.append((command, format_command(command, command_input)))
+    return formatted
+
+
+class RemoteControl(ABC):
+    """Sends commands to the instrument over one persistent connection and returns its replies.
+
+    `send_many` pipelines requests: it keeps up to `window` of them in flight instead of waiting for each reply before
+    sending the next. Replies carry no request id, so they are matched to requests in the order they were sent.
+
+    A reply that has not arrived within `timeout` seconds may be lost or only late, and a late one would be taken for
+    the reply to a later request. So the transport is first resynchronised, as the subclasses describe, and the
+    requests in flight are then sent again, up to `retries` times. Commands in `NOT_IDEMPOTENT` may have been carried
+    out already, so rather than send one again, `TimeoutError` is raised.
+
+    A reply of `ERROR` raises `RemoteControlError` unless `check=False`, once the replies to the requests pipelined
+    behind it have been read and discarded. Those requests may have been carried out.
+    """
+
+    commands: tuple[type[AnyCommand], ...]
+
+    def __init__(self, timeout: float = 1.0, retries: int = 2, window: int = 16) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self.window = window
+        self.sent = 0
+        self.retried = 0
+
+    def __enter__(self) -> Self:
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    @abstractmethod
+    def open(self) -> None: ...
+
+    @abstractmethod
+    def close(self) -> None: ...
+
+    def send(
+        self,
+        command: AnyCommand,
+        command_input: AnyCommandInput | None = None,
+        *,
+        timeout: float | None = None,
+        check: bool = True,
+    ) -> Reply:
+        return self.send_many([(command, command_input)], timeout=timeout, check=check)[0]
+
+    def send_many(
+        self,
+        requests: Iterable[Request],
+        *,
+        timeout: float | None = None,
+        check: bool = True,
+    ) -> list[Reply]:
+        timeout = self.timeout if timeout is None else timeout
+        formatted = _requests(requests)
+        for command, _ in formatted:
+            if not isinstance(command, self.commands):
+                msg = f"{type(self).__name__} cannot send {command}."
+                raise TypeError(msg)
+
+        replies: list[Reply] = []
+        in_flight: deque[int] = deque()
+        attempts = [0] * len(formatted)
+        next_index = 0
+        while len(replies) < len(formatted):
+            while next_index < len(formatted) and len(in_flight) < self.window:
+                self._write(formatted[next_index][1])
+                in_flight.append(next_index)
+                next_index += 1
+            index = in_flight[0]
+            command, text = formatted[index]
+            try:
+                raw = self._read(timeout)
+            except TimeoutError:
+                attempts[index] += 1
+                self._resynchronize(timeout)
+                if attempts[index] > self.retries:
+                    msg = f"No reply to {text!r} after {attempts[index]} attempts of {timeout} s."
+                    raise TimeoutError(msg) from None
+                unsafe = [formatted[pending][1] for pending in in_flight if formatted[pending][0] in NOT_IDEMPOTENT]
+                if unsafe:
+                    msg = f"No reply to {text!r} within {timeout} s. {unsafe} may have been done, so not resending."
+                    raise TimeoutError(msg) from None
+                logger.warning("No reply to %r within %s s, sending %d requests again.", text, timeout, len(in_flight))
+                self.retried += len(in_flight)
+                for pending in in_flight:
+                    self._write(formatted[pending][1])
+                continue
+            in_flight.popleft()
+            reply = Reply.parse(command, raw)
+            if check and reply.result is CommandResult.Error:
+                self._discard(len(in_flight), timeout)
+                msg = f"{text!r} failed: {reply.raw}"
+                raise RemoteControlError(msg)
+            replies.append(reply)
+        return replies
+
+    def _discard(self, count: int, timeout: float) -> None:
+        """Reads the replies to `count` requests still in flight, so that they are not taken for later replies."""
+        try:
+            for _ in range(count):
+                self._read(timeout)
+        except TimeoutError:
+            self._resynchronize(timeout)
+
+    def _write(self, text: str) -> None:
+        self._send(text.encode("ascii"))
+        self.sent += 1
+
+    @abstractmethod
+    def _send(self, payload: bytes) -> None: ...
+
+    @abstractmethod
+    def _read(self, timeout: float) -> str:
+        """Returns the next reply, raising `TimeoutError` if none arrives within `timeout` seconds."""
+
+    @abstractmethod
+    def _resynchronize(self, timeout: float) -> None:
+        """Called once no reply has arrived within `timeout` seconds, so that no reply to a request sent so far can
+        arrive afterwards.
+        """
+
+
+class UdpRemoteControl(RemoteControl):
+    """Sends OEM RC/RD commands to the TeraFlash software over UDP.
+
+    As the protocol specifies, commands are sent from local port `write_port` to `device_port`, and replies are read
+    on local port `read_port`. Replies carry nothing to tell which request they answer, so when one is lost, up to
+    `window - 1` of the replies after it are matched to the wrong requests before the retry realigns them. On a link
+    that loses datagrams, use `window=1`; on localhost, as the protocol intends, datagrams are not lost.
+
+    After a timeout, replies are discarded until none has arrived for another `timeout` seconds. Only a reply later
+    than that can still be taken for the reply to a later request.
+    """
+
+    commands = (RcCommand, RdCommand)
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str = LOCALHOST,
+        device_port: int = RC_DEVICE_PORT,
+        read_port: int = RC_READ_PORT,
+        write_port: int = RC_WRITE_PORT,
+        timeout: float = 1.0,
+        retries: int = 2,
+        window: int = 16,
+    ) -> None:
+        super().__init__(timeout, retries, window)
+        self.host = host
+        self.device_port = device_port
+        self.read_port = read_port
+        self.write_port = write_port
+
+    def open(self) -> None:
+        self.reader = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.reader.bind((self.host, self.read_port))
+        self.writer = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.writer.bind((self.host, self.write_port))
+        self.writer.connect((self.host, self.device_port))
+        # The ports may have been chosen by the operating system.
+        self.read_port = self.reader.getsockname()[1]
+        self.write_port = self.writer.getsockname()[1]
+
+    def close(self) -> None:
+        self.reader.close()
+        self.writer.close()
+
+    def _send(self, payload: bytes) -> None:
+        self.writer.send(payload)
+
+    def _read(self, timeout: float) -> str:
+        readable, _, _ = select.select([self.reader], [], [], timeout)
+        if not readable:
+            raise TimeoutError
+        return self.reader.recv(1 << 16).decode("ascii", errors="replace")
+
+    def _resynchronize(self, timeout: float) -> None:
+        # There is no telling a late reply from a lost one, so wait for the replies to stop coming.
+        while select.select([self.reader], [], [], timeout)[0]:
+            self.reader.recv(1 << 16)
+
+
+class TcpRemoteControl(RemoteControl):
+    """Sends `Command`s to the device over TCP.
+
+    The device connects to the host, so `open` listens on `host`:`port` and waits up to `connect_timeout` seconds for
+    it. Every message is framed by `MESSAGE_HEADER`.
+
+    Replies are not lost over TCP, but they can be late: the device answers a time-consuming command once it has been
+    carried out. After a timeout, the connection is closed and the device, which keeps connecting to the host, is
+    accepted again, so that a late reply cannot arrive.
+    """
+
+    commands = (Command,)
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str = HOST_ADDRESS,
+        port: int = COMMAND_PORT,
+        connect_timeout: float | None = 30,
+        timeout: float = 1.0,
+        retries: int = 2,
+        window: int = 16,
+    ) -> None:
+        super().__init__(timeout, retries, window)
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self._received = bytearray()
+
+    def listen(self) -> None:
+        """Starts listening for the device; `port` is the bound port afterwards. Called by `open` if needed."""
+        self.server = socket.create_server((self.host, self.port))
+        self.port = self.server.getsockname()[1]
+
+    def open(self) -> None:
+        if not hasattr(self, "server"):
+            self.listen()
+        self._accept()
+
+    def _accept(self) -> None:
+        self.server.settimeout(self.connect_timeout)
+        try:
+            self.connection, address = self.server.accept()
+        except TimeoutError:
+            self.server.close()
+            msg = f"The device did not connect to {self.host}:{self.port} within {self.connect_timeout} s."
+            raise TimeoutError(msg) from None
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        logger.info("Device connected from %s:%d.", *address)
+
+    def close(self) -> None:
+        if hasattr(self, "connection"):
+            self.connection.close()
+        self.server.close()
+
+    def _send(self, payload: bytes) -> None:
+        self.connection.sendall(MESSAGE_HEADER.pack(*MESSAGE_MAGIC, MESSAGE_COMMAND, 0, len(payload)) + payload)
+
+    def _read(self, timeout: float) -> str:
+        deadline = time.monotonic() + timeout
+        # Bytes stay in `_received` until a whole message has arrived, so a timeout halfway through one loses nothing.
+        self._receive(MESSAGE_HEADER.size, deadline)
+        *magic, code, _, length = MESSAGE_HEADER.unpack_from(self._received)
+        if tuple(magic) != MESSAGE_MAGIC or code != MESSAGE_ANSWER:
+            msg = f"Unexpected message header {bytes(self._received[: MESSAGE_HEADER.size]).hex()} from the device."
+            raise RemoteControlError(msg)
+        end = MESSAGE_HEADER.size + length
+        self._receive(end, deadline)
+        answer = self._received[MESSAGE_HEADER.size : end].decode("ascii", errors="replace")
+        del self._received[:end]
+        return answer
+
+    def _resynchronize(self, timeout: float) -> None:  # noqa: ARG002
+        logger.warning("Reconnecting to the device, so that a late reply is not taken for a later one.")
+        self.connection.close()
+        self._received.clear()
+        self._accept()
+
+    def _receive(self, size: int, deadline: float) -> None:
+        while len(self._received) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError
+            self.connection.settimeout(remaining)
+            chunk = self.connection.recv(1 << 16)
+            if not chunk:
+                msg = "The device closed the connection."
+                raise ConnectionError(msg)
+            self._received += chunk
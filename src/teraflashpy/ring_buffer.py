@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from queue import Empty, Full
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+from teraflashpy.core import MAX_FRAME_LENGTH
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Layout of the control block at the start of the shared memory segment.
+_NUM_SLOTS, _SLOT_SIZE, _OVERWRITE, _WRITE_SEQ, _READ_SEQ, _DROPPED = range(6)
+_CONTROL_SIZE = 8
+# Layout of the header in front of every slot.
+_SEQ, _LENGTH, _TIMESTAMP = range(3)
+_SLOT_HEADER_SIZE = 3
+_WRITING = -1
+_SHM_DIRECTORY = Path("/dev/shm")  # noqa: S108
+
+
+class RingFrame(NamedTuple):
+    seq: int
+    "Sequence number of the frame, counting every frame written since the buffer was created."
+    payload: np.ndarray
+    "A uint8 view into the shared memory slot holding the frame."
+    timestamp: datetime
+
+
+class SharedMemoryRingBuffer:
+    """A single-producer, single-consumer ring buffer of fixed-size slots in shared memory.
+
+    The writer copies each frame into the next slot in place and the reader gets views into those slots, so frames are
+    never pickled or copied between processes. When the reader falls behind, the writer either overwrites the oldest
+    slots (`overwrite=True`), which the reader detects and counts as dropped frames, or waits for the reader to free a
+    slot (`overwrite=False`).
+
+    A frame returned by `read` stays valid until the next call to `read`, unless the writer overwrites it. Use
+    `is_valid` to check whether a frame has been overwritten in the meantime. Readers of an overwriting buffer that
+    keep track of their own position can use `get` instead, and share the buffer between any number of them.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, *, owner: bool) -> None:
+        self._shm = shm
+        self._owner = owner
+        self._control = np.ndarray((_CONTROL_SIZE,), dtype=np.int64, buffer=shm.buf)
+        num_slots, slot_size = int(self._control[_NUM_SLOTS]), int(self._control[_SLOT_SIZE])
+        offset = self._control.nbytes
+        self._headers = np.ndarray((num_slots, _SLOT_HEADER_SIZE), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += self._headers.nbytes
+        self._payloads = np.ndarray((num_slots, slot_size), dtype=np.uint8, buffer=shm.buf, offset=offset)
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self.poll_interval = 1e-4
+        self._pending = False
+
+    @classmethod
+    def create(
+        cls: type[SharedMemoryRingBuffer],
+        num_slots: int = 8,
+        slot_size: int = MAX_FRAME_LENGTH,
+        *,
+        overwrite: bool = True,
+    ) -> SharedMemoryRingBuffer:
+        if num_slots < 1:
+            msg = "num_slots must be at least 1."
+            raise ValueError(msg)
+        size = 8 * (_CONTROL_SIZE + num_slots * _SLOT_HEADER_SIZE) + num_slots * slot_size
+        free = _shared_memory_free()
+        if free is not None and size > free:
+            # The segment would be created anyway, and the writer killed by SIGBUS once it runs out of room.
+            msg = (
+                f"A ring of {num_slots} slots of {slot_size} bytes needs {size / 2**20:.0f} MiB of shared memory, but "
+                f"only {free / 2**20:.0f} MiB is free. Use fewer slots, or slots the size of your frames."
+            )
+            raise ValueError(msg)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        words = np.ndarray((_CONTROL_SIZE + num_slots * _SLOT_HEADER_SIZE,), dtype=np.int64, buffer=shm.buf)
+        words[:_CONTROL_SIZE] = 0
+        words[[_NUM_SLOTS, _SLOT_SIZE, _OVERWRITE]] = num_slots, slot_size, overwrite
+        words[_CONTROL_SIZE + _SEQ :: _SLOT_HEADER_SIZE] = _WRITING
+        del words
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls: type[SharedMemoryRingBuffer], name: str, *, track: bool = True) -> SharedMemoryRingBuffer:
+        """Attaches to the buffer `name`. Pass `track=False` from a process that was not started by its owner, so that
+        the buffer is not unlinked from under the owner when this process exits.
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        if not track and os.name == "posix":
+            # Attaching registers the segment with the resource tracker of this process, which unlinks it at exit.
+            # Python 3.13 has `SharedMemory(track=False)` for this.
+            resource_tracker.unregister(shm._name, "shared_memory")  # noqa: SLF001
+        return cls(shm, owner=False)
+
+    def __reduce__(self) -> tuple:
+        return self.attach, (self.name,)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def overwrite(self) -> bool:
+        return bool(self._control[_OVERWRITE])
+
+    @property
+    def written(self) -> int:
+        "Number of frames written to the buffer so far."
+        return int(self._control[_WRITE_SEQ])
+
+    @property
+    def dropped(self) -> int:
+        "Number of frames overwritten before the reader got to them."
+        return int(self._control[_DROPPED])
+
+    @property
+    def lag(self) -> int:
+        "Number of written frames the reader has not read yet, including any that have already been overwritten."
+        return int(self._control[_WRITE_SEQ] - self._control[_READ_SEQ]) - self._pending
+
+    def write(self, data: bytes, timestamp: datetime, timeout: float | None = None) -> None:
+        """Copies a frame into the next slot.
+
+        Without `overwrite`, blocks until the reader frees a slot and raises `queue.Full` if that takes longer than
+        `timeout` seconds.
+        """
+        length = len(data)
+        if length > self.slot_size:
+            msg = f"Frame of {length} bytes does not fit in slots of {self.slot_size} bytes."
+            raise ValueError(msg)
+
+        seq = int(self._control[_WRITE_SEQ])
+        if not self.overwrite:
+            self._wait(lambda: seq - self._control[_READ_SEQ] < self.num_slots, _deadline(timeout), Full)
+
+        slot = seq % self.num_slots
+        header = self._headers[slot]
+        header[_SEQ] = _WRITING
+        self._payloads[slot, :length] = np.frombuffer(data, dtype=np.uint8)
+        header[_LENGTH] = length
+        header[_TIMESTAMP] = (timestamp - _EPOCH) // _MICROSECOND
+        header[_SEQ] = seq
+        self._control[_WRITE_SEQ] = seq + 1
+
+    def read(self, timeout: float | None = None) -> RingFrame:
+        """Returns the oldest unread frame, waiting up to `timeout` seconds for one to arrive.
+
+        Raises `queue.Empty` on timeout, like `multiprocessing.Queue.get`. Frames the writer has overwritten in the
+        meantime are skipped and added to `dropped`.
+        """
+        if self._pending:
+            # The previous frame is only released now, so that a non-overwriting writer cannot reuse its slot while the
+            # caller still holds a view of it.
+            self._control[_READ_SEQ] += 1
+            self._pending = False
+
+        deadline = _deadline(timeout)
+        read_seq = int(self._control[_READ_SEQ])
+        while True:
+            self._wait(lambda: self._control[_WRITE_SEQ] > read_seq, deadline, Empty)  # noqa: B023
+            lost = int(self._control[_WRITE_SEQ]) - self.num_slots - read_seq
+            if lost > 0:
+                read_seq += lost
+                self.mark_dropped(lost)
+                self._control[_READ_SEQ] = read_seq
+
+            slot = read_seq % self.num_slots
+            header = self._headers[slot].copy()
+            if header[_SEQ] == read_seq:
+                break
+            # The writer lapped us between the checks above and reading the slot header.
+            read_seq += 1
+            self.mark_dropped()
+            self._control[_READ_SEQ] = read_seq
+
+        self._pending = True
+        timestamp = _EPOCH + int(header[_TIMESTAMP]) * _MICROSECOND
+        return RingFrame(read_seq, self._payloads[slot, : header[_LENGTH]], timestamp)
+
+    def get(self, seq: int) -> RingFrame | None:
+        """Returns frame `seq` if it is still in the buffer, without moving the read position.
+
+        For readers that keep track of their own position, so that any number of them can share an overwriting buffer.
+        Returns None if the frame has not been written yet, or has been overwritten. Check `is_valid` once done with
+        the frame, as the writer may overwrite it at any time.
+        """
+        slot = seq % self.num_slots
+        header = self._headers[slot].copy()
+        if header[_SEQ] != seq:
+            return None
+        timestamp = _EPOCH + int(header[_TIMESTAMP]) * _MICROSECOND
+        return RingFrame(seq, self._payloads[slot, : header[_LENGTH]], timestamp)
+
+    def is_valid(self, frame: RingFrame) -> bool:
+        return bool(self._headers[frame.seq % self.num_slots, _SEQ] == frame.seq)
+
+    def mark_dropped(self, count: int = 1) -> None:
+        "Counts frames the reader had to discard, e.g. because they were overwritten while it was still using them."
+        self._control[_DROPPED] += count
+
+    def close(self) -> None:
+        # Views into the buffer must be released before the shared memory can be closed.
+        del self._control, self._headers, self._payloads
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def _wait(self, condition: Callable[[], bool], deadline: float | None, error: type[Exception]) -> None:
+        while not condition():
+            if deadline is not None and time.monotonic() >= deadline:
+                raise error
+            time.sleep(self.poll_interval)
+
+
+def _deadline(timeout: float | None) -> float | None:
+    return None if timeout is None else time.monotonic() + timeout
+
+
+def _shared_memory_free() -> int | None:
+    "Bytes free for shared memory segments, where they are files in `/dev/shm`."
+    if not _SHM_DIRECTORY.is_dir():
+        return None
+    return shutil.disk_usage(_SHM_DIRECTORY).free
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, tzinfo
+from enum import Enum
+from typing import TYPE_CHECKING, NamedTuple
+
+from pydantic import BaseModel
+
+from teraflashpy.metrics import Metrics
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class Overrun(Enum):
+    """What a `Scheduler` does with deadlines that passed while the previous tick was still running."""
+
+    Skip = 0
+    "Runs one tick for the latest deadline that passed and drops the ones before it."
+    CatchUp = 1
+    "Runs a tick for every deadline that passed, back to back."
+
+
+class Schedule(ABC):
+    @abstractmethod
+    def deadlines(self, start: float) -> Iterator[float]:
+        """Yields the deadlines of a run that starts at `start`, in ascending `time.monotonic()` seconds."""
+
+
+class FixedRate(Schedule):
+    """A tick every `period`, the first `offset` after the start.
+
+    Deadlines are counted from the start, so the time a tick takes does not push back the ones after it.
+    """
+
+    def __init__(self, period: timedelta, offset: timedelta = timedelta(0)) -> None:
+        if period <= timedelta(0):
+            msg = f"period must be positive, got {period}."
+            raise ValueError(msg)
+        self.period = period
+        self.offset = offset
+
+    def deadlines(self, start: float) -> Iterator[float]:
+        first = start + self.offset.total_seconds()
+        period = self.period.total_seconds()
+        return (first + index * period for index in itertools.count())
+
+
+class Burst(Schedule):
+    """Bursts of `size` ticks, `spacing` apart, starting every `period`. For example, 5 reads a second apart every
+    10 minutes.
+    """
+
+    def __init__(self, size: int, spacing: timedelta, period: timedelta) -> None:
+        if size < 1 or spacing * (size - 1) >= period:
+            msg = f"A burst of {size} ticks {spacing} apart does not fit in a period of {period}."
+            raise ValueError(msg)
+        self.size = size
+        self.spacing = spacing
+        self.period = period
+
+    def deadlines(self, start: float) -> Iterator[float]:
+        period, spacing = self.period.total_seconds(), self.spacing.total_seconds()
+        for burst in itertools.count():
+            for index in range(self.size):
+                yield start + burst * period + index * spacing
+
+
+class Cron(Schedule):
+    """A tick at every minute that matches a crontab `expression`: minute, hour, day of month, month and day of week.
+
+    Each field is `*`, a number, a range `a-b`, either with a step `/n`, or a comma-separated list of those. Days of
+    the week count from 0 for Sunday; 7 is Sunday too. As in cron, when both days are restricted, a minute matches if
+    either does. Times are in `tz`, by default the local time zone.
+    """
+
+    _FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str, tz: tzinfo | None = None) -> None:
+        fields = expression.split()
+        if len(fields) != len(self._FIELDS):
+            msg = f"Cron expression {expression!r} must have 5 fields, got {len(fields)}."
+            raise ValueError(msg)
+        self.expression = expression
+        self.tz = tz
+        minutes, hours, days, months, weekdays = (
+            _parse_cron_field(field, low, high) for field, (low, high) in zip(fields, self._FIELDS, strict=True)
+        )
+        self.minutes, self.hours, self.days, self.months = minutes, hours, days, months
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def deadlines(self, start: float) -> Iterator[float]:  # noqa: ARG002
+        previous = None
+        while True:
+            # Convert each wall-clock match to the monotonic clock as it comes up, so clock adjustments in between are
+            # taken into account.
+            now = datetime.now(tz=self.tz).astimezone(self.tz)
+            after = now if previous is None else max(now, previous)
+            previous = self.next_match(after)
+            yield time.monotonic() + (previous - datetime.now(tz=self.tz).astimezone(self.tz)).total_seconds()
+
+    def next_match(self, after: datetime) -> datetime:
+        """The first matching minute after `after`."""
+        candidate = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Any expression matches within a few years, e.g. on 29 February.
+        limit = candidate + timedelta(days=5 * 366)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._matches_day(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        msg = f"Cron expression {self.expression!r} never matches."
+        raise ValueError(msg)
+
+    def _matches_day(self, candidate: datetime) -> bool:
+        day = candidate.day in self.days
+        # `isoweekday` counts from 1 for Monday to 7 for Sunday.
+        weekday = candidate.isoweekday() % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> set[int]:
+    values: set[int] = set()
+    for part in field.split(","):
+        spec, _, step = part.partition("/")
+        try:
+            if spec == "*":
+                first, last = low, high
+            elif "-" in spec:
+                first, last = map(int, spec.split("-"))
+            else:
+                first = last = int(spec)
+            values.update(range(first, last + 1, int(step) if step else 1))
+        except ValueError:
+            msg = f"Invalid cron field {field!r}."
+            raise ValueError(msg) from None
+    if not values or min(values) < low or max(values) > high:
+        msg = f"Cron field {field!r} must be within {low}-{high}."
+        raise ValueError(msg)
+    return values
+
+
+class Tick(NamedTuple):
+    index: int
+    "Number of ticks run before this one."
+    due: float
+    "The deadline of the tick, in `time.monotonic()` seconds."
+    lateness: float
+    "Seconds between the deadline and the tick starting."
+    skipped: int
+    "Deadlines dropped in favour of this one, with `Overrun.Skip`."
+
+
+class ScheduleStats(BaseModel):
+    ticks: int
+    skipped: int
+    "Deadlines dropped because earlier ticks overran."
+    overruns: int
+    "Ticks that were still running at the next deadline."
+    lateness_mean: float
+    lateness_p50: float
+    lateness_p99: float
+    lateness_max: float
+    "How late ticks started, in seconds."
+
+
+class Scheduler:
+    """Runs a loop on the deadlines of `schedule`: iterating waits for each deadline and yields a `Tick`.
+
+    The loop ends once the next deadline is `duration` after the start, or after `max_ticks` ticks, or when `stop` is
+    called from another thread. When a tick runs past the next deadline, `overrun` decides whether deadlines are
+    skipped or caught up with. How late every tick started is recorded in `metrics`, and summarised in `stats`.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        schedule: Schedule,
+        overrun: Overrun = Overrun.Skip,
+        duration: timedelta | None = None,
+        max_ticks: int | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
+        self.schedule = schedule
+        self.overrun = overrun
+        self.duration = duration
+        self.max_ticks = max_ticks
+        self.metrics = Metrics() if metrics is None else metrics
+        self.ticks = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.metrics.counter("schedule_ticks", "Ticks run.", lambda: self.ticks)
+        self.metrics.counter("schedule_skipped", "Deadlines skipped as earlier ticks overran.", lambda: self.skipped)
+        self.metrics.counter("schedule_overruns", "Ticks still running at the next deadline.", lambda: self.overruns)
+        self.lateness = self.metrics.histogram("schedule_lateness_seconds", "How late every tick started.")
+        self._stop = threading.Event()
+
+    def __iter__(self) -> Iterator[Tick]:
+        start = time.monotonic()
+        end = None if self.duration is None else start + self.duration.total_seconds()
+        deadlines = self.schedule.deadlines(start)
+        upcoming = next(deadlines)
+        while self.max_ticks is None or self.ticks < self.max_ticks:
+            due, upcoming = upcoming, next(deadlines)
+            skipped = 0
+            if self.overrun is Overrun.Skip:
+                now = time.monotonic()
+                while upcoming <= now:
+                    due, upcoming = upcoming, next(deadlines)
+                    skipped += 1
+            if end is not None and due >= end:
+                return
+            if self._stop.wait(max(due - time.monotonic(), 0)):
+                return
+            lateness = time.monotonic() - due
+            self.lateness.observe(lateness)
+            self.skipped += skipped
+            yield Tick(self.ticks, due, lateness, skipped)
+            self.ticks += 1
+            overrun = time.monotonic() - upcoming
+            if overrun > 0:
+                self.overruns += 1
+                logger.debug("Tick %d overran the next deadline by %.3f s.", self.ticks - 1, overrun)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    @property
+    def stats(self) -> ScheduleStats:
+        return ScheduleStats(
+            ticks=self.ticks,
+            skipped=self.skipped,
+            overruns=self.overruns,
+            lateness_mean=self.lateness.mean,
+            lateness_p50=self.lateness.percentile(50),
+            lateness_p99=self.lateness.percentile(99),
+            lateness_max=self.lateness.max,
+        )
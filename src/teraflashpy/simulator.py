@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+from pydantic import BaseModel
+
+from teraflashpy.core import (
+    ACQUISITION_PORT_MAP,
+    COMMAND_PORT,
+    LENGTH_PREFIX_SIZE,
+    LOCALHOST,
+    RC_DEVICE_PORT,
+    RC_READ_PORT,
+    AcquisitionMode,
+)
+from teraflashpy.remote import MESSAGE_ANSWER, MESSAGE_HEADER, MESSAGE_MAGIC
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatorConfig(BaseModel):
+    num_samples: int = 2000
+    start_position: float = 850.0
+    "Delay of the first sample, in ps."
+    step: float = 0.05
+    "Delay between samples, in ps."
+    noise: float = 0.5
+    "Standard deviation of the noise added to the signal, in nA."
+    header: str = "Time/ps, Signal/nA"
+    rate: float | None = 4.0
+    "Pulses sent per second. None sends pulses as fast as the client reads them."
+    jitter: float = 0.0
+    "Standard deviation of the time between pulses, in seconds."
+    num_variants: int = 16
+    "Number of distinct pulses rendered up front and sent in turn."
+    corrupt_probability: float = 0.0
+    "Probability that a frame is sent with a corrupt length prefix."
+    truncate_probability: float = 0.0
+    "Probability that the connection fails halfway through sending a frame, which is then cut off."
+    disconnect_after: int | None = None
+    "Closes each connection after this many frames."
+    seed: int | None = None
+
+
+def render_frames(config: SimulatorConfig) -> list[bytes]:
+    """Renders `config.num_variants` framed pulses: a THz pulse shaped like the derivative of a Gaussian, plus noise."""
+    rng = np.random.default_rng(config.seed)
+    time = config.start_position + config.step * np.arange(config.num_samples)
+    center = time[config.num_samples // 3]
+    width = 0.4
+    signal = -100 * (time - center) / width * np.exp(-0.5 * ((time - center) / width) ** 2)
+    frames = []
+    for _ in range(config.num_variants):
+        magnitude = signal + rng.normal(0, config.noise, config.num_samples)
+        rows = "".join(f"{t:.3f},{m:.6f}\r\n" for t, m in zip(time.tolist(), magnitude.tolist(), strict=True))
+        payload = f"{config.header}\r\n{rows}".encode()
+        frames.append(f"{len(payload):0{LENGTH_PREFIX_SIZE}d}".encode() + payload)
+    return frames
+
+
+class TeraflashSimulator:
+    """Serves simulated pulses the way the acquisition ports of a TeraFlash Pro do.
+
+    Every connection gets its own stream of frames: a 6 digit length prefix, the header line, then one `time,magnitude`
+    row per sample, separated by CRLF. Faults are injected at random as set in the config and are counted in `faults`.
+    With `port=0`, the operating system picks a free port, which is available as `port` once the server has started.
+    """
+
+    def __init__(
+        self,
+        config: SimulatorConfig | None = None,
+        host: str = LOCALHOST,
+        port: int = ACQUISITION_PORT_MAP[AcquisitionMode.Asynchronous],
+    ) -> None:
+        self.config = SimulatorConfig() if config is None else config
+        self.host = host
+        self.port = port
+        self.frames = render_frames(self.config)
+        self.rng = np.random.default_rng(self.config.seed)
+        self.sent = 0
+        self.connections = 0
+        self.faults = {"corrupt": 0, "truncate": 0, "disconnect": 0}
+        self.server: asyncio.Server | None = None
+        self._connections: set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> Self:
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info("Simulating a TeraFlash Pro on %s:%d.", self.host, self.port)
+
+    async def serve_forever(self) -> None:
+        if self.server is None:
+            await self.start()
+        await self.server.serve_forever()
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            # The server does not stop connections that are still being served.
+            for task in self._connections:
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+
+    def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:  # noqa: ARG002
+        self.connections += 1
+        # A task of our own rather than the server's, so that `close` can cancel it and collect the cancellation.
+        task = asyncio.create_task(self._send_frames(writer))
+        self._connections.add(task)
+        task.add_done_callback(self._connections.discard)
+
+    async def _send_frames(self, writer: asyncio.StreamWriter) -> None:
+        config = self.config
+        loop = asyncio.get_running_loop()
+        next_send = loop.time()
+        index = 0
+        try:
+            while config.disconnect_after is None or index < config.disconnect_after:
+                if config.rate is None:
+                    # Let other connections have a turn, as `drain` does not yield while the client keeps up.
+                    await asyncio.sleep(0)
+                else:
+                    # Sending on a fixed schedule keeps the average rate exact, however long each send took.
+                    next_send += 1 / config.rate
+                    send_at = next_send + self.rng.normal(0, config.jitter) if config.jitter else next_send
+                    await asyncio.sleep(max(send_at - loop.time(), 0))
+                frame = self._next_frame(index)
+                if self.rng.random() < config.truncate_probability:
+                    # A short read, as when the instrument or the network fails: the client gets part of the frame and
+                    # then loses the connection.
+                    self.faults["truncate"] += 1
+                    writer.write(frame[: len(frame) // 2])
+                    await writer.drain()
+                    return
+                writer.write(frame)
+                await writer.drain()
+                index += 1
+                self.sent += 1
+            self.faults["disconnect"] += 1
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _next_frame(self, index: int) -> bytes:
+        frame = self.frames[index % len(self.frames)]
+        if self.rng.random() < self.config.corrupt_probability:
+            self.faults["corrupt"] += 1
+            return b"x" * LENGTH_PREFIX_SIZE + frame[LENGTH_PREFIX_SIZE:]
+        return frame
+
+
+OEM_DEFAULTS = {
+    "RD-AMPLITUDE": "0.0",
+    "RD-TAC.TIME": "0.0",
+    "RD-XAC.TIME": "0.0",
+    "RD-LASER": "OFF",
+    "RD-VOLTAGE": "OFF",
+    "RD-RUN": "OFF",
+    "RD-BEGIN": "850.0",
+    "RD-RANGE": "100",
+    "RD-AVERAGE": "1",
+    "RD-TRANSFER": "SLIDING",
+    "RD-ANALYSIS": "REDUCED",
+    "RD-TIA-MODE": "INTERN",
+    "RD-TIA-SENSITIVITY": "1000",
+    "RD-WAIT": "OFF",
+    "RD-AUTO": "OFF",
+    "RD-REVERSE": "OFF",
+}
+"What the simulated OEM software reports for every RD command before any RC command has been sent."
+
+
+class _RemoteControlProtocol(asyncio.DatagramProtocol):
+    def __init__(self, simulator: RemoteControlSimulator) -> None:
+        self.simulator = simulator
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        simulator = self.simulator
+        simulator.received += 1
+        if simulator.rng.random() < simulator.drop_probability:
+            simulator.dropped += 1
+            return
+        reply = simulator.reply(data.decode("ascii", errors="replace")).encode("ascii")
+        # Replies go to the read port on the sender's host, not to the port the command came from.
+        address = (addr[0], simulator.reply_port)
+        if simulator.delay:
+            asyncio.get_running_loop().call_later(simulator.delay, self.transport.sendto, reply, address)
+        else:
+            self.transport.sendto(reply, address)
+
+
+class RemoteControlSimulator:
+    """Answers OEM RC/RD commands over UDP the way the TeraFlash software does.
+
+    RC commands set the state that the RD commands of the same name read back. Replies are sent `delay` seconds after
+    each command, to `reply_port` on the sender's host, and a `drop_probability` fraction of commands is ignored.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str = LOCALHOST,
+        port: int = RC_DEVICE_PORT,
+        reply_port: int = RC_READ_PORT,
+        delay: float = 0.0,
+        drop_probability: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.reply_port = reply_port
+        self.delay = delay
+        self.drop_probability = drop_probability
+        self.rng = np.random.default_rng(seed)
+        self.state = dict(OEM_DEFAULTS)
+        self.received = 0
+        self.dropped = 0
+        self.transport: asyncio.DatagramTransport | None = None
+
+    async def __aenter__(self) -> Self:
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        self.transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: _RemoteControlProtocol(self),
+            local_addr=(self.host, self.port),
+        )
+        self.port = self.transport.get_extra_info("sockname")[1]
+        logger.info("Simulating the TeraFlash remote control on %s:%d.", self.host, self.port)
+
+    async def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    def reply(self, text: str) -> str:
+        if text in self.state:
+            return f"OK {self.state[text]}"
+        if not text.startswith("RC-"):
+            return "ERROR unknown command"
+        name, _, argument = text[3:].partition(" ")
+        argument = argument.removeprefix(": ")
+        match name, argument:
+            case "TIA", "INTERN" | "EXTERN":
+                self.state["RD-TIA-MODE"] = argument
+            case "TIA", _ if argument.startswith("SENSITIVITY "):
+                self.state["RD-TIA-SENSITIVITY"] = argument.removeprefix("SENSITIVITY ")
+            case "VOLTAGE", "ON" if self.state["RD-LASER"] != "ON":
+                return "ERROR laser is off"
+            case "LASER", "ON" | "OFF":
+                self.state["RD-LASER"] = self.state["RD-VOLTAGE"] = argument
+            case "REF" | "CLR" | "BGR" | "BCL" | "SAVE" | "FILEPATH", _:
+                pass
+            case _ if f"RD-{name}" in self.state and argument:
+                self.state[f"RD-{name}"] = argument
+            case _:
+                return "ERROR unknown command"
+        return "OK"
+
+
+class DeviceSimulator:
+    """Connects to a `TcpRemoteControl` the way the device does, and answers every `Command` with `OK`.
+
+    Like the device, it connects again whenever the host closes the connection.
+    """
+
+    def __init__(self, host: str = LOCALHOST, port: int = COMMAND_PORT) -> None:
+        self.host = host
+        self.port = port
+        self.received: list[str] = []
+        self.connections = 0
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        self._task = asyncio.create_task(self._run(reader, writer))
+
+    async def _run(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while True:
+            self.connections += 1
+            await self._serve(reader, writer)
+            while True:
+                try:
+                    reader, writer = await asyncio.open_connection(self.host, self.port)
+                    break
+                except OSError:
+                    await asyncio.sleep(0.1)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        reply = b"OK"
+        answer = MESSAGE_HEADER.pack(*MESSAGE_MAGIC, MESSAGE_ANSWER, 0, len(reply)) + reply
+        try:
+            while True:
+                *_, length = MESSAGE_HEADER.unpack(await reader.readexactly(MESSAGE_HEADER.size))
+                self.received.append((await reader.readexactly(length)).decode("ascii"))
+                writer.write(answer)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class BackgroundSimulator:
+    """Runs a simulator, `TeraflashSimulator` by default, on an event loop in a daemon thread, for synchronous code."""
+
+    def __init__(
+        self,
+        config: SimulatorConfig | None = None,
+        host: str = LOCALHOST,
+        port: int = ACQUISITION_PORT_MAP[AcquisitionMode.Asynchronous],
+        simulator: TeraflashSimulator | RemoteControlSimulator | DeviceSimulator | None = None,
+    ) -> None:
+        self.simulator = TeraflashSimulator(config, host, port) if simulator is None else simulator
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self) -> Self:
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.simulator.start(), self.loop).result()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        asyncio.run_coroutine_threadsafe(self.simulator.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    @property
+    def port(self) -> int:
+        return self.simulator.port
+
+
+def run(
+    config: SimulatorConfig | None = None,
+    host: str = LOCALHOST,
+    port: int = ACQUISITION_PORT_MAP[AcquisitionMode.Asynchronous],
+) -> None:
+    asyncio.run(TeraflashSimulator(config, host, port).serve_forever())
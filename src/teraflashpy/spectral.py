@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from enum import Enum
+from functools import lru_cache
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from teraflashpy.output import PulseBatch, PulseData
+
+
+class Window(Enum):
+    Boxcar = 0
+    "No windowing."
+    Hann = 1
+    Hamming = 2
+    Blackman = 3
+
+
+_WINDOW_FUNCTIONS = {
+    Window.Boxcar: np.ones,
+    Window.Hann: np.hanning,
+    Window.Hamming: np.hamming,
+    Window.Blackman: np.blackman,
+}
+
+
+class SpectralSetup(NamedTuple):
+    """Everything about the spectrum that depends only on the acquisition geometry."""
+
+    num_samples: int
+    dt: float
+    "Time between samples, in ps."
+    num_fft: int
+    window: np.ndarray
+    frequency: np.ndarray
+    "Frequency of every bin of the spectrum, in THz."
+
+
+@lru_cache(maxsize=32)
+def spectral_setup(
+    num_samples: int,
+    dt: float,
+    window: Window = Window.Hann,
+    num_fft: int | None = None,
+) -> SpectralSetup:
+    """Returns the window and frequency axis for pulses of `num_samples` samples `dt` ps apart, padded to `num_fft`.
+
+    Cached per geometry; the arrays are read-only, as they are shared between every caller.
+    """
+    num_fft = num_samples if num_fft is None else num_fft
+    if num_fft < num_samples:
+        msg = f"Cannot zero-pad pulses of {num_samples} samples to {num_fft} samples."
+        raise ValueError(msg)
+    window_values = _WINDOW_FUNCTIONS[window](num_samples).astype(np.float32)
+    frequency = np.fft.rfftfreq(num_fft, d=dt)
+    window_values.flags.writeable = False
+    frequency.flags.writeable = False
+    return SpectralSetup(num_samples, dt, num_fft, window_values, frequency)
+
+
+def sample_spacing(time: np.ndarray) -> float:
+    """Mean time between samples, rounded so that the time axes of pulses from the same acquisition compare equal."""
+    axis = time if time.ndim == 1 else time[0]
+    if len(axis) < 2:  # noqa: PLR2004
+        msg = f"Cannot tell the sample spacing of a time axis of {len(axis)} samples; it takes at least 2."
+        raise ValueError(msg)
+    dt = (float(axis[-1]) - float(axis[0])) / (len(axis) - 1)
+    return float(f"{dt:.6g}")
+
+
+class Spectra(NamedTuple):
+    frequency: np.ndarray
+    "Frequency of every bin, in THz."
+    spectrum: np.ndarray
+    "Complex spectrum, with one row per pulse for a batch."
+
+    @property
+    def amplitude(self) -> np.ndarray:
+        return np.abs(self.spectrum)
+
+    @property
+    def phase(self) -> np.ndarray:
+        "Unwrapped phase, in radians."
+        return np.unwrap(np.angle(self.spectrum), axis=-1)
+
+
+class SpectralProcessor:
+    """Computes the spectra of whole pulse batches with one real FFT.
+
+    The window and frequency axis come from `spectral_setup`, so they are computed once per acquisition geometry, and
+    the batch is windowed into a work buffer that is reused between batches of the same shape.
+
+    Like the instrument's `RC-BGR` and `RC-REF` commands, `set_background` and `set_reference` take the average of a
+    measurement: the background pulse is subtracted from every pulse before windowing, and spectra are divided by the
+    reference spectrum. Bins where the reference amplitude is below `reference_floor` times its peak are set to zero
+    rather than amplifying noise.
+    """
+
+    def __init__(self, window: Window = Window.Hann, num_fft: int | None = None, reference_floor: float = 1e-4) -> None:
+        self.window = window
+        self.num_fft = num_fft
+        self.reference_floor = reference_floor
+        self.background: np.ndarray | None = None
+        self.reference: np.ndarray | None = None
+        self._reference_setup: SpectralSetup | None = None
+        self._inverse_reference: np.ndarray | None = None
+        self._work = np.empty((0, 0), dtype=np.float32)
+
+    def setup(self, time: np.ndarray, num_samples: int) -> SpectralSetup:
+        return spectral_setup(num_samples, sample_spacing(time), self.window, self.num_fft)
+
+    def transform(self, pulses: PulseBatch | PulseData) -> Spectra:
+        """Returns the spectrum of every pulse in a batch, or of a single pulse."""
+        magnitude = pulses.magnitude
+        setup = self.setup(pulses.time, magnitude.shape[-1])
+        spectrum = np.fft.rfft(self._windowed(magnitude, setup), n=setup.num_fft, axis=-1)
+        if self._inverse_reference is not None:
+            if setup[:3] != self._reference_setup[:3]:
+                msg = "The reference was measured with a different number of samples or sample spacing."
+                raise ValueError(msg)
+            spectrum *= self._inverse_reference
+        return Spectra(setup.frequency, spectrum)
+
+    def set_background(self, pulses: PulseBatch | PulseData) -> None:
+        self.background = _average(pulses.magnitude)
+
+    def clear_background(self) -> None:
+        self.background = None
+
+    def set_reference(self, pulses: PulseBatch | PulseData) -> None:
+        # Measured without a reference, but with the current background.
+        self.clear_reference()
+        average = _average(pulses.magnitude)
+        setup = self.setup(pulses.time, len(average))
+        self.reference = np.fft.rfft(self._windowed(average, setup), n=setup.num_fft)
+        amplitude = np.abs(self.reference)
+        valid = amplitude >= self.reference_floor * amplitude.max()
+        self._inverse_reference = np.zeros_like(self.reference)
+        np.divide(1, self.reference, out=self._inverse_reference, where=valid)
+        self._reference_setup = setup
+
+    def clear_reference(self) -> None:
+        self.reference = None
+        self._inverse_reference = None
+        self._reference_setup = None
+
+    def _windowed(self, magnitude: np.ndarray, setup: SpectralSetup) -> np.ndarray:
+        if self.background is not None and len(self.background) != setup.num_samples:
+            msg = f"The background has {len(self.background)} samples, but the pulses have {setup.num_samples}."
+            raise ValueError(msg)
+        if self._work.shape != magnitude.shape:
+            self._work = np.empty(magnitude.shape, dtype=np.float32)
+        work = self._work
+        if self.background is None:
+            np.multiply(magnitude, setup.window, out=work)
+        else:
+            np.subtract(magnitude, self.background, out=work)
+            work *= setup.window
+        return work
+
+
+def _average(magnitude: np.ndarray) -> np.ndarray:
+    return magnitude if magnitude.ndim == 1 else magnitude.mean(axis=0, dtype=np.float64).astype(np.float32)
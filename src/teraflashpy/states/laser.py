@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import math
 from enum import Enum
 from typing import Annotated
 
-from pydantic import BaseModel, Field, ValidationError, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from teraflashpy.states.trans_impedance_amplifier import TransImpedanceAmplifierStatus  # noqa: TCH001
 from teraflashpy.states.transfer import TransferStatus  # noqa: TCH001
@@ -20,6 +21,8 @@ class AcquisitionStatus(Enum):
 
 
 class AcquisitionState(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     state: AcquisitionStatus
     start_position: Annotated[float, Field(ge=0, le=3000)]
     measuring_range: Annotated[int, Field(ge=20, le=200)]
@@ -28,16 +31,18 @@ class AcquisitionState(BaseModel):
     @field_validator("start_position")
     @classmethod
     def check_is_divisible(cls: type[AcquisitionState], v: float) -> float:
-        is_divisible = v % 0.1 == 0
+        is_divisible = math.isclose(v * 10, round(v * 10), abs_tol=1e-9)
         if not is_divisible:
             msg = "start_position must be divisible by 0.1"
-            raise ValidationError(msg)
+            raise ValueError(msg)
         return v
 
 
 class LaserState(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     status: LaserStatus
-    pump_current: Annotated[int, Field(ge=0, le=100)]
+    pump_current: Annotated[float, Field(ge=0, le=100)] | None = None
+    "None where it is not known, as the OEM remote control cannot read it back."
     transfer_status: TransferStatus
     tia_status: TransImpedanceAmplifierStatus
-    # acquisition_state: AcquisitionState
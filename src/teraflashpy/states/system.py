@@ -1,8 +1,8 @@
 from enum import Enum
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
-from teraflashpy.states.laser import LaserState
+from teraflashpy.states.laser import AcquisitionState, AcquisitionStatus, LaserState
 
 
 class SystemStatus(Enum):
@@ -11,5 +11,15 @@ class SystemStatus(Enum):
 
 
 class SystemState(BaseModel):
+    # Frozen, so that `commands.run` can share the sub-states a command leaves unchanged between states.
+    model_config = ConfigDict(frozen=True)
+
     status: SystemStatus
     laser_state: LaserState
+    acquisition_state: AcquisitionState = AcquisitionState(
+        state=AcquisitionStatus.Off,
+        start_position=850.0,
+        measuring_range=100,
+        num_averages=1,
+    )
+    "Defaults to a stopped acquisition with the settings the simulator starts with, for states made without one."
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class Accumulator(ABC):
+    """Folds pulses into running statistics per sample as they arrive, in buffers allocated on the first pulse.
+
+    `update` takes the magnitude of a single pulse, shape (n_samples,), or of a batch, shape (n_pulses, n_samples).
+    The time axis of the latest update is kept in `time`. `reset` starts over, like the instrument's
+    `AcquisitionResetAvg` command does for its own average.
+
+    The arrays returned by `RunningStatistics.mean` and `ExponentialMovingAverage.mean` are updated in place; copy them
+    to keep a snapshot.
+    """
+
+    def __init__(self, dtype: type[np.floating] = np.float64) -> None:
+        self.dtype = np.dtype(dtype)
+        self.time: np.ndarray | None = None
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self._mean: np.ndarray | None = None
+
+    @property
+    def mean(self) -> np.ndarray:
+        if self._mean is None:
+            msg = "No pulses have been accumulated yet."
+            raise ValueError(msg)
+        return self._mean
+
+    @property
+    def num_samples(self) -> int | None:
+        "Number of samples of the pulses accumulated, or None before the first."
+        return None if self._mean is None else self._mean.shape[0]
+
+    @property
+    @abstractmethod
+    def variance(self) -> np.ndarray: ...
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+    def update(self, magnitude: np.ndarray, time: np.ndarray | None = None) -> None:
+        if time is not None:
+            self.time = time
+        if magnitude.ndim == 1:
+            magnitude = magnitude[np.newaxis]
+        if len(magnitude) == 0:
+            return
+        if self._mean is None:
+            self._allocate(magnitude.shape[1])
+        elif magnitude.shape[1] != self._mean.shape[0]:
+            msg = f"Pulses of {magnitude.shape[1]} samples cannot be added to an average of {self._mean.shape[0]}."
+            raise ValueError(msg)
+        self._update(magnitude)
+        self.count += len(magnitude)
+
+    @abstractmethod
+    def _allocate(self, num_samples: int) -> None: ...
+
+    @abstractmethod
+    def _update(self, magnitude: np.ndarray) -> None: ...
+
+
+class RunningStatistics(Accumulator):
+    """Mean and variance over every pulse since the last reset, using Welford's algorithm.
+
+    A batch is first reduced to its own mean and variance, which are then merged in (Chan et al.), so the cost per pulse
+    does not depend on how pulses are grouped.
+    """
+
+    @property
+    def variance(self) -> np.ndarray:
+        "Sample variance of every sample."
+        if self.count < 2:  # noqa: PLR2004
+            msg = "The variance needs at least two pulses."
+            raise ValueError(msg)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def standard_error(self) -> np.ndarray:
+        "Standard deviation of `mean` as an estimate of the noise-free pulse."
+        return np.sqrt(self.variance / self.count)
+
+    @property
+    def snr(self) -> float:
+        "Peak amplitude of the averaged pulse over its mean standard error."
+        return float(np.abs(self.mean).max() / self.standard_error.mean())
+
+    def _allocate(self, num_samples: int) -> None:
+        self._mean = np.zeros(num_samples, dtype=self.dtype)
+        self._m2 = np.zeros(num_samples, dtype=self.dtype)
+        self._delta = np.empty(num_samples, dtype=self.dtype)
+
+    def _update(self, magnitude: np.ndarray) -> None:
+        mean, m2, delta = self._mean, self._m2, self._delta
+        if len(magnitude) == 1:
+            count = self.count + 1
+            np.subtract(magnitude[0], mean, out=delta)
+            mean += delta / count
+            # delta * (x - new mean), in place.
+            delta *= magnitude[0] - mean
+            m2 += delta
+            return
+
+        num_pulses = len(magnitude)
+        count = self.count + num_pulses
+        batch_mean = magnitude.mean(axis=0, dtype=self.dtype)
+        batch_m2 = ((magnitude - batch_mean) ** 2).sum(axis=0, dtype=self.dtype)
+        np.subtract(batch_mean, mean, out=delta)
+        mean += delta * (num_pulses / count)
+        m2 += batch_m2
+        m2 += delta**2 * (self.count * num_pulses / count)
+
+
+class ExponentialMovingAverage(Accumulator):
+    """Exponentially weighted mean and variance, weighting each new pulse by `alpha`.
+
+    With `span`, `alpha` is `2 / (span + 1)`, so the average follows roughly the last `span` pulses.
+    """
+
+    def __init__(
+        self,
+        alpha: float | None = None,
+        span: int | None = None,
+        dtype: type[np.floating] = np.float64,
+    ) -> None:
+        if (alpha is None) == (span is None):
+            msg = "Give exactly one of `alpha` and `span`."
+            raise ValueError(msg)
+        self.alpha = 2 / (span + 1) if alpha is None else alpha
+        if not 0 < self.alpha <= 1:
+            msg = f"alpha must be in (0, 1], got {self.alpha}."
+            raise ValueError(msg)
+        super().__init__(dtype)
+
+    @property
+    def variance(self) -> np.ndarray:
+        if self._mean is None:
+            msg = "No pulses have been accumulated yet."
+            raise ValueError(msg)
+        return self._variance
+
+    def _allocate(self, num_samples: int) -> None:
+        self._mean = np.zeros(num_samples, dtype=self.dtype)
+        self._variance = np.zeros(num_samples, dtype=self.dtype)
+        self._delta = np.empty(num_samples, dtype=self.dtype)
+
+    def _update(self, magnitude: np.ndarray) -> None:
+        mean, variance, delta = self._mean, self._variance, self._delta
+        alpha = self.alpha
+        start = 0
+        if self.count == 0:
+            mean[:] = magnitude[0]
+            start = 1
+        for pulse in magnitude[start:]:
+            np.subtract(pulse, mean, out=delta)
+            # variance = (1 - alpha) * (variance + alpha * delta**2), then mean += alpha * delta.
+            variance += alpha * delta**2
+            variance *= 1 - alpha
+            delta *= alpha
+            mean += delta
+
+
+class WindowedAverage(Accumulator):
+    """Mean and variance over the last `window` pulses.
+
+    The pulses in the window are kept in a ring of `window` rows, and running sums are updated as pulses enter and
+    leave it. The sums are recomputed from the ring each time it wraps around, so rounding errors do not build up.
+    """
+
+    def __init__(self, window: int, dtype: type[np.floating] = np.float64) -> None:
+        if window < 1:
+            msg = "window must be at least 1."
+            raise ValueError(msg)
+        self.window = window
+        super().__init__(dtype)
+
+    @property
+    def size(self) -> int:
+        "Number of pulses in the window."
+        return min(self.count, self.window)
+
+    @property
+    def mean(self) -> np.ndarray:
+        return super().mean / self.size
+
+    @property
+    def variance(self) -> np.ndarray:
+        size = self.size
+        if size < 2:  # noqa: PLR2004
+            msg = "The variance needs at least two pulses."
+            raise ValueError(msg)
+        return np.maximum(self._sum_squares - self._mean**2 / size, 0) / (size - 1)
+
+    def _allocate(self, num_samples: int) -> None:
+        # `_mean` holds the sum over the window, and is divided by its size on access.
+        self._mean = np.zeros(num_samples, dtype=self.dtype)
+        self._sum_squares = np.zeros(num_samples, dtype=self.dtype)
+        self._ring = np.zeros((self.window, num_samples), dtype=self.dtype)
+
+    def _update(self, magnitude: np.ndarray) -> None:
+        total, sum_squares, ring = self._mean, self._sum_squares, self._ring
+        # Pulses of a batch longer than the window would be overwritten by the rest of it right away.
+        skipped = max(len(magnitude) - self.window, 0)
+        for offset, pulse in enumerate(magnitude[skipped:], start=self.count + skipped):
+            slot = offset % self.window
+            old = ring[slot]
+            total -= old
+            sum_squares -= old**2
+            old[:] = pulse
+            total += old
+            sum_squares += old**2
+            if slot == self.window - 1:
+                np.sum(ring, axis=0, out=total)
+                np.sum(ring**2, axis=0, out=sum_squares)
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+
+from teraflashpy.codec import TimeAxis, affine_time_axis, encode_time_axis
+from teraflashpy.output import PulseBatch
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+    from types import TracebackType
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TFPULSES"
+VERSION = 2
+EXTENSION = ".tfp"
+INDEX_SUFFIX = ".idx"
+INDEX_DTYPE = np.dtype([("timestamp", "<i8"), ("offset", "<i8")])
+"One index entry per pulse: its timestamp in us since the epoch, and the offset of its record in the store."
+
+# Magic, version, number of samples per pulse, offset of the first record, length of the JSON header after this, how
+# the time axis is kept, and its begin and step if it is affine. A shared axis follows the JSON header.
+FILE_HEADER = struct.Struct("<8sIIQIIdd")
+# Records start at a multiple of this, so the sample blocks of a mapped store are aligned.
+ALIGNMENT = 64
+
+
+def record_dtype(num_samples: int, *, time: bool = True) -> np.dtype:
+    """The fixed layout of every pulse: its timestamp, then `time`, unless the store keeps it once, and `magnitude`."""
+    fields = [
+        ("timestamp", "datetime64[us]"),
+        ("time", np.float32, (num_samples,)),
+        ("magnitude", np.float32, (num_samples,)),
+    ]
+    return np.dtype(fields if time else [fields[0], fields[2]])
+
+
+def index_path(path: Path) -> Path:
+    return path.with_suffix(path.suffix + INDEX_SUFFIX)
+
+
+def pack_header(batch: PulseBatch) -> tuple[bytes, TimeAxis]:
+    """The start of a store for pulses like those of `batch`, padded to where the records begin, and how it keeps the
+    time axis.
+    """
+    encoded = json.dumps(batch.header).encode()
+    time_axis, begin, step = encode_time_axis(batch.time)
+    time = b""
+    if time_axis is TimeAxis.Shared:
+        time = np.asarray(batch.time if batch.shared_time else batch.time[0], dtype="<f4").tobytes()
+    data_offset = -(-(FILE_HEADER.size + len(encoded) + len(time)) // ALIGNMENT) * ALIGNMENT
+    packed = FILE_HEADER.pack(
+        MAGIC,
+        VERSION,
+        batch.num_samples,
+        data_offset,
+        len(encoded),
+        time_axis.value,
+        begin,
+        step,
+    )
+    return (packed + encoded + time).ljust(data_offset, b"\0"), time_axis
+
+
+def to_datetime64(timestamp: datetime | np.datetime64) -> np.datetime64:
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(timestamp, "us")
+
+
+class PulseStore:
+    """Memory-maps a pulse store written by `TfpWriter`, for pulse-range and time-range queries.
+
+    A store holds pulses with the same number of samples and header as fixed-size records, so pulse `i` is at a known
+    offset and a range of pulses is a slice of the mapped file. A time axis that every pulse shares is kept once, in
+    the header, and returned as a single axis. The sidecar index holds the timestamp and offset of
+    every record, so a time-range query searches the small index without touching the sample blocks.
+
+    Queries return `PulseBatch`es whose arrays are views of the mapped file, so nothing is read from disk until it is
+    used. Release the batches, or copy them, before closing the store. An index that is missing or lags behind the
+    store, as after a crash, is completed from the timestamps in the records; a record cut short is ignored.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as f:
+            if os.fstat(f.fileno()).st_size < FILE_HEADER.size:
+                # Too short to map, as when the writer crashed before writing the header.
+                msg = f"{path} is cut short before the end of its header."
+                raise ValueError(msg)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        fields = FILE_HEADER.unpack_from(self._mmap)
+        magic, version, self.num_samples, data_offset, header_length, time_value, begin, step = fields
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            msg = f"{path} is not a pulse store of version {VERSION}."
+            raise ValueError(msg)
+        if len(self._mmap) < data_offset:
+            self.close()
+            msg = f"{path} is cut short before the end of its header."
+            raise ValueError(msg)
+        header_end = FILE_HEADER.size + header_length
+        self.header: list[str] = json.loads(self._mmap[FILE_HEADER.size : header_end])
+        self.time_axis = TimeAxis(time_value)
+        self.time: np.ndarray | None = None
+        "The time axis of every pulse, unless each has its own."
+        if self.time_axis is TimeAxis.Affine:
+            self.time = affine_time_axis(begin, step, self.num_samples)
+        elif self.time_axis is TimeAxis.Shared:
+            self.time = np.frombuffer(self._mmap, dtype="<f4", count=self.num_samples, offset=header_end)
+        self.dtype = record_dtype(self.num_samples, time=self.time is None)
+        self._data_offset = data_offset
+        num_records = (len(self._mmap) - data_offset) // self.dtype.itemsize
+        self.records = np.frombuffer(self._mmap, dtype=self.dtype, count=num_records, offset=data_offset)
+        self.index = self._load_index()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        "Timestamp of every pulse as UTC datetime64[us]."
+        return self.index["timestamp"].astype("datetime64[us]")
+
+    def pulses(self, start: int = 0, stop: int | None = None) -> PulseBatch:
+        """Pulses `start` up to `stop`, counted like a slice."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        records = self.records[start:stop]
+        return PulseBatch.model_construct(
+            timestamps=records["timestamp"],
+            header=self.header,
+            time=records["time"] if self.time is None else self.time,
+            magnitude=records["magnitude"],
+        )
+
+    def between(self, start: datetime | np.datetime64, end: datetime | np.datetime64) -> PulseBatch:
+        """Pulses with timestamps from `start` up to, but not including, `end`. Naive datetimes are taken as local."""
+        first, last = self.span(start, end)
+        return self.pulses(first, last)
+
+    def span(self, start: datetime | np.datetime64, end: datetime | np.datetime64) -> tuple[int, int]:
+        """The range of pulses `between` returns."""
+        timestamps = self.index["timestamp"]
+        bounds = np.array([to_datetime64(start), to_datetime64(end)]).astype(np.int64)
+        first, last = np.searchsorted(timestamps, bounds).tolist()
+        return first, max(first, last)
+
+    def close(self) -> None:
+        self.records = self.time = None
+        self._mmap.close()
+
+    def _load_index(self) -> np.ndarray:
+        path = index_path(self.path)
+        index = np.fromfile(path, dtype=INDEX_DTYPE) if path.exists() else np.empty(0, dtype=INDEX_DTYPE)
+        index = index[: len(self.records)]
+        if len(index) == len(self.records):
+            return index
+        recovered = np.empty(len(self.records) - len(index), dtype=INDEX_DTYPE)
+        recovered["timestamp"] = self.records["timestamp"][len(index) :].astype(np.int64)
+        recovered["offset"] = self._data_offset + np.arange(len(index), len(self.records)) * self.dtype.itemsize
+        return np.concatenate([index, recovered])
+
+
+class PulseArchive:
+    """Queries every pulse store in `folder` and its subfolders, such as the day folders of an experiment, as one.
+
+    Stores are opened when the archive is, and only those overlapping a time range are searched for it. A store that
+    cannot be opened, such as one cut short by a crash, is skipped with a warning.
+    """
+
+    def __init__(self, folder: Path) -> None:
+        self.folder = folder
+        self.stores: list[PulseStore] = []
+        for path in sorted(folder.rglob(f"*{EXTENSION}")):
+            try:
+                store = PulseStore(path)
+            except ValueError as e:
+                # E.g. a store left empty by a crash while it was created.
+                logger.warning("Skipping %s: %s", path, e)
+                continue
+            if len(store):
+                self.stores.append(store)
+            else:
+                # E.g. a store whose writer was stopped before its first pulse reached the disk.
+                store.close()
+        self.stores.sort(key=lambda store: store.index["timestamp"][0])
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(len(store) for store in self.stores)
+
+    def query(self, start: datetime | np.datetime64, end: datetime | np.datetime64) -> Iterator[PulseBatch]:
+        """Yields the pulses from `start` up to `end` in every store that has any, as views of the store."""
+        start_us, end_us = (int(to_datetime64(bound).astype(np.int64)) for bound in (start, end))
+        for store in self.stores:
+            timestamps = store.index["timestamp"]
+            if timestamps[0] >= end_us or timestamps[-1] < start_us:
+                continue
+            first, last = store.span(start, end)
+            if last > first:
+                yield store.pulses(first, last)
+
+    def between(self, start: datetime | np.datetime64, end: datetime | np.datetime64) -> PulseBatch:
+        """The pulses from `start` up to `end` as one batch, copied from the stores they are in.
+
+        The batch has a single time axis if every store it draws on shares the same one, and an axis per pulse
+        otherwise. Raises `ValueError` if the pulses differ in number of samples.
+        """
+        batches = list(self.query(start, end))
+        if not batches:
+            return PulseBatch.model_construct(
+                timestamps=np.empty(0, dtype="datetime64[us]"),
+                header=[],
+                time=np.empty((0, 0), dtype=np.float32),
+                magnitude=np.empty((0, 0), dtype=np.float32),
+            )
+        num_samples = {batch.num_samples for batch in batches}
+        if len(num_samples) > 1:
+            msg = f"Pulses from {start} to {end} have different numbers of samples: {sorted(num_samples)}."
+            raise ValueError(msg)
+        if all(batch.shared_time and np.array_equal(batch.time, batches[0].time) for batch in batches):
+            time = np.array(batches[0].time)
+        else:
+            time = np.concatenate([np.broadcast_to(batch.time, batch.magnitude.shape) for batch in batches])
+        return PulseBatch.model_construct(
+            timestamps=np.concatenate([batch.timestamps for batch in batches]),
+            header=batches[0].header,
+            time=time,
+            magnitude=np.concatenate([batch.magnitude for batch in batches]),
+        )
+
+    def close(self) -> None:
+        for store in self.stores:
+            store.close()
@@ -0,0 +1,477 @@
+from __future__ import annotations
+
+import json
+import os
+import pickle
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, BinaryIO, ClassVar, Self, TextIO
+
+import numpy as np
+
+from teraflashpy.codec import CHUNKS_MAGIC, Codec, TimeAxis, encode_batch
+from teraflashpy.store import EXTENSION, INDEX_DTYPE, index_path, pack_header, record_dtype
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from types import TracebackType
+
+    from teraflashpy.output import PulseBatch
+
+FILENAME_FORMAT = "%H-%M-%S-%f"
+CSV_HEADER_PREFIX = "# header: "
+
+
+class PulseWriter(ABC):
+    """Streams pulse batches into files in `folder`, appending to one open file until it is rolled over.
+
+    Every format stores the same columns per pulse: `timestamp` (UTC, microseconds), `time` and `magnitude` (float32).
+    Formats with room for metadata also store the column `header` of the pulse data, with every pulse or batch, or
+    once per file. The latter keep one header per file, as does `.npy`, which has no room for it.
+
+    A new file is started once the current one has reached `max_bytes` or is older than `max_age`, or when the header
+    changes in a format that keeps one per file. With `fsync`, every batch is flushed to disk before `write` returns.
+    """
+
+    extension: ClassVar[str]
+    header_per_file: ClassVar[bool] = True
+
+    def __init__(
+        self,
+        folder: Path,
+        *,
+        max_bytes: int | None = None,
+        max_age: timedelta | None = None,
+        fsync: bool = True,
+    ) -> None:
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fsync = fsync
+        self.path: Path | None = None
+        self.paths: list[Path] = []
+        self._opened_at = datetime.min.replace(tzinfo=timezone.utc)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def write(self, batch: PulseBatch) -> None:
+        if len(batch) == 0:
+            return
+        if self.path is not None and self._should_roll_over(batch):
+            self.close()
+        if self.path is None:
+            opened_at = datetime.now(tz=timezone.utc)
+            path = (self.folder / opened_at.strftime(FILENAME_FORMAT)).with_suffix(self.extension)
+            # Only once the file is open, so that `close` has nothing to close if opening it fails.
+            self._open(path, batch)
+            self._opened_at = opened_at
+            self.path = path
+            self.paths.append(path)
+            self.header = batch.header
+        self._append(batch)
+        self._flush()
+
+    def close(self) -> None:
+        if self.path is not None:
+            self._close()
+            self.path = None
+
+    def _should_roll_over(self, batch: PulseBatch) -> bool:
+        if self.header_per_file and batch.header != self.header:
+            return True
+        if self.max_bytes is not None and self.path.stat().st_size >= self.max_bytes:
+            return True
+        return self.max_age is not None and datetime.now(tz=timezone.utc) - self._opened_at >= self.max_age
+
+    @abstractmethod
+    def _open(self, path: Path, batch: PulseBatch) -> None: ...
+
+    @abstractmethod
+    def _append(self, batch: PulseBatch) -> None: ...
+
+    @abstractmethod
+    def _flush(self) -> None: ...
+
+    @abstractmethod
+    def _close(self) -> None: ...
+
+
+class _FileWriter(PulseWriter):
+    mode: ClassVar[str] = "wb"
+
+    def _open(self, path: Path, batch: PulseBatch) -> None:  # noqa: ARG002
+        self.handle: BinaryIO | TextIO = path.open(self.mode)
+
+    def _flush(self) -> None:
+        self.handle.flush()
+        if self.fsync:
+            os.fsync(self.handle.fileno())
+
+    def _close(self) -> None:
+        self.handle.close()
+
+
+class PickleWriter(_FileWriter):
+    """Appends one pickled dict of arrays per batch. Read the file back by unpickling until `EOFError`."""
+
+    extension = ".pkl"
+    header_per_file = False
+
+    def _append(self, batch: PulseBatch) -> None:
+        record = {
+            "timestamp": batch.timestamps,
+            "header": batch.header,
+            "time": batch.time,
+            "magnitude": batch.magnitude,
+        }
+        pickle.dump(record, self.handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class CsvWriter(_FileWriter):
+    """Writes one row per pulse, with the samples of `time` and `magnitude` separated by spaces, after a comment line
+    holding the header as JSON.
+    """
+
+    extension = ".csv"
+    mode = "w"
+
+    def _open(self, path: Path, batch: PulseBatch) -> None:
+        super()._open(path, batch)
+        self.handle.write(f"{CSV_HEADER_PREFIX}{json.dumps(batch.header)}\n")
+        self.handle.write("timestamp,time,magnitude\n")
+
+    def _append(self, batch: PulseBatch) -> None:
+        timestamps = np.datetime_as_string(batch.timestamps, timezone="UTC")
+        time = _rows(batch.time, len(batch))
+        self.handle.writelines(
+            f"{timestamp},{_join(time[index])},{_join(batch.magnitude[index])}\n"
+            for index, timestamp in enumerate(timestamps)
+        )
+
+
+class JsonWriter(_FileWriter):
+    """Writes JSON Lines, one object per pulse."""
+
+    extension = ".json"
+    mode = "w"
+    header_per_file = False
+
+    def _append(self, batch: PulseBatch) -> None:
+        timestamps = np.datetime_as_string(batch.timestamps, timezone="UTC")
+        time = _rows(batch.time, len(batch))
+        self.handle.writelines(
+            json.dumps(
+                {
+                    "timestamp": str(timestamp),
+                    "header": batch.header,
+                    "time": time[index].tolist(),
+                    "magnitude": batch.magnitude[index].tolist(),
+                },
+            )
+            + "\n"
+            for index, timestamp in enumerate(timestamps)
+        )
+
+
+class NpyWriter(_FileWriter):
+    """Appends to a single `.npy` file holding a structured array with one record per pulse.
+
+    The header is reserved up front and its shape is rewritten after every batch, so the file is always a valid
+    `.npy` file that `np.load(path, mmap_mode="r")` can open. A batch with a different number of samples starts a new
+    file, as the record size is fixed. The format has no room for the header, so it is not stored.
+    """
+
+    extension = ".npy"
+    header_size = 256
+
+    def _open(self, path: Path, batch: PulseBatch) -> None:
+        super()._open(path, batch)
+        self.dtype = record_dtype(batch.num_samples)
+        self.num_records = 0
+        self._write_header()
+
+    def _should_roll_over(self, batch: PulseBatch) -> bool:
+        return batch.num_samples != self.dtype["magnitude"].shape[0] or super()._should_roll_over(batch)
+
+    def _append(self, batch: PulseBatch) -> None:
+        records = np.empty(len(batch), dtype=self.dtype)
+        records["timestamp"] = batch.timestamps
+        records["time"] = batch.time
+        records["magnitude"] = batch.magnitude
+        self.handle.seek(0, os.SEEK_END)
+        self.handle.write(records.tobytes())
+        self.num_records += len(batch)
+        self._write_header()
+
+    def _write_header(self) -> None:
+        header = repr(
+            {"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False, "shape": (self.num_records,)},
+        )
+        # Magic string (6 bytes), version (2 bytes) and header length (2 bytes) precede the header itself.
+        prefix_size = 10
+        header = header.ljust(self.header_size - prefix_size - 1) + "\n"
+        self.handle.seek(0)
+        self.handle.write(b"\x93NUMPY\x01\x00")
+        self.handle.write(np.uint16(len(header)).tobytes())
+        self.handle.write(header.encode("latin1"))
+
+
+class TfpWriter(_FileWriter):
+    """Appends to a teraflashpy pulse store, which `teraflashpy.store.PulseStore` memory-maps for queries.
+
+    Records have the same layout as in `NpyWriter`, after a header holding the pulse data header. If the pulses of the
+    first batch share their time axis, the header keeps it, as `begin` and `step` if it is evenly spaced, and records
+    leave it out, which halves their size. The timestamp and offset of every record also go to a sidecar index, written
+    after the records so every indexed pulse is on disk. A batch with a different number of samples, header or time
+    axis starts a new file.
+    """
+
+    extension = EXTENSION
+
+    def _open(self, path: Path, batch: PulseBatch) -> None:
+        super()._open(path, batch)
+        self.index_handle = index_path(path).open("wb")
+        header, time_axis = pack_header(batch)
+        self.handle.write(header)
+        self.offset = self.handle.tell()
+        # The axis every pulse in the file shares, if any.
+        self.time = (
+            None if time_axis is TimeAxis.PerPulse else np.array(batch.time if batch.shared_time else batch.time[0])
+        )
+        self.dtype = record_dtype(batch.num_samples, time=self.time is None)
+
+    def _should_roll_over(self, batch: PulseBatch) -> bool:
+        return (
+            batch.num_samples != self.dtype["magnitude"].shape[0]
+            or (self.time is not None and not _has_time_axis(batch, self.time))
+            or super()._should_roll_over(batch)
+        )
+
+    def _append(self, batch: PulseBatch) -> None:
+        records = np.empty(len(batch), dtype=self.dtype)
+        records["timestamp"] = batch.timestamps
+        if self.time is None:
+            records["time"] = batch.time
+        records["magnitude"] = batch.magnitude
+        self.handle.write(records.tobytes())
+        index = np.empty(len(batch), dtype=INDEX_DTYPE)
+        index["timestamp"] = batch.timestamps.astype("datetime64[us]").astype(np.int64)
+        index["offset"] = self.offset + np.arange(len(batch)) * self.dtype.itemsize
+        self.index_handle.write(index.tobytes())
+        self.offset += records.nbytes
+
+    def _flush(self) -> None:
+        super()._flush()
+        self.index_handle.flush()
+        if self.fsync:
+            os.fsync(self.index_handle.fileno())
+
+    def _close(self) -> None:
+        super()._close()
+        self.index_handle.close()
+
+
+class TfzWriter(_FileWriter):
+    """Appends every batch as a chunk encoded by `teraflashpy.codec.encode_batch`, which `teraflashpy.codec.read_chunks`
+    reads back.
+
+    A chunk keeps the time axis of its batch once, or just its begin and step, and encodes the magnitudes with `codec`.
+    With `Codec.Float16`, a batch whose magnitudes would be off by more than `max_error`, or without it by more than
+    `teraflashpy.codec.FLOAT16_RELATIVE_ERROR` of the largest of them, is compressed losslessly.
+    """
+
+    extension = ".tfz"
+
+    def __init__(  # noqa: PLR0913
+        self,
+        folder: Path,
+        *,
+        codec: Codec = Codec.Lz4,
+        max_error: float | None = None,
+        max_bytes: int | None = None,
+        max_age: timedelta | None = None,
+        fsync: bool = True,
+    ) -> None:
+        super().__init__(folder, max_bytes=max_bytes, max_age=max_age, fsync=fsync)
+        self.codec = codec
+        self.max_error = max_error
+
+    def _open(self, path: Path, batch: PulseBatch) -> None:
+        super()._open(path, batch)
+        self.handle.write(CHUNKS_MAGIC)
+
+    def _append(self, batch: PulseBatch) -> None:
+        chunk = encode_batch(batch, self.codec, self.max_error)
+        self.handle.write(len(chunk).to_bytes(8, "little") + chunk)
+
+
+class ParquetWriter(PulseWriter):
+    """Writes one Parquet row group per batch, with `header` stored in the schema metadata."""
+
+    extension = ".parquet"
+
+    def _open(self, path: Path, batch: PulseBatch) -> None:
+        pa, pq = _import_pyarrow()
+        self.schema = pa.schema(
+            [
+                ("timestamp", pa.timestamp("us", tz="UTC")),
+                ("time", pa.list_(pa.float32())),
+                ("magnitude", pa.list_(pa.float32())),
+            ],
+            metadata={"header": json.dumps(batch.header)},
+        )
+        self.handle = path.open("wb")
+        self.writer = pq.ParquetWriter(self.handle, self.schema)
+
+    def _append(self, batch: PulseBatch) -> None:
+        pa, _ = _import_pyarrow()
+        offsets = pa.array(np.arange(len(batch) + 1, dtype=np.int32) * batch.num_samples)
+        time = np.ascontiguousarray(np.broadcast_to(batch.time, batch.magnitude.shape))
+        table = pa.Table.from_arrays(
+            [
+                pa.array(batch.timestamps, type=pa.timestamp("us")).cast(self.schema.field("timestamp").type),
+                pa.ListArray.from_arrays(offsets, pa.array(time.ravel())),
+                pa.ListArray.from_arrays(offsets, pa.array(batch.magnitude.ravel())),
+            ],
+            schema=self.schema,
+        )
+        self.writer.write_table(table, row_group_size=len(batch))
+
+    def _flush(self) -> None:
+        self.handle.flush()
+        if self.fsync:
+            os.fsync(self.handle.fileno())
+
+    def _close(self) -> None:
+        self.writer.close()
+        self.handle.close()
+
+
+class Hdf5Writer(PulseWriter):
+    """Appends to chunked, resizable `timestamp`, `time` and `magnitude` datasets, with `header` as a file attribute.
+
+    Each chunk holds one batch. A batch with a different number of samples starts a new file.
+    """
+
+    extension = ".h5"
+
+    def _open(self, path: Path, batch: PulseBatch) -> None:
+        h5py = _import_h5py()
+        self.file = h5py.File(path, "w")
+        self.file.attrs["header"] = json.dumps(batch.header)
+        chunks = (len(batch), batch.num_samples)
+        self.timestamps = self.file.create_dataset(
+            "timestamp",
+            shape=(0,),
+            maxshape=(None,),
+            dtype=np.int64,
+            chunks=(len(batch),),
+        )
+        self.timestamps.attrs["unit"] = "us since 1970-01-01T00:00:00Z"
+        self.time = self.file.create_dataset(
+            "time",
+            shape=(0, chunks[1]),
+            maxshape=(None, chunks[1]),
+            dtype=np.float32,
+            chunks=chunks,
+        )
+        self.magnitude = self.file.create_dataset(
+            "magnitude",
+            shape=(0, chunks[1]),
+            maxshape=(None, chunks[1]),
+            dtype=np.float32,
+            chunks=chunks,
+        )
+
+    def _should_roll_over(self, batch: PulseBatch) -> bool:
+        return batch.num_samples != self.magnitude.shape[1] or super()._should_roll_over(batch)
+
+    def _append(self, batch: PulseBatch) -> None:
+        start = self.magnitude.shape[0]
+        stop = start + len(batch)
+        for dataset in (self.timestamps, self.time, self.magnitude):
+            dataset.resize(stop, axis=0)
+        self.timestamps[start:stop] = batch.timestamps.astype(np.int64)
+        self.time[start:stop] = np.broadcast_to(batch.time, batch.magnitude.shape)
+        self.magnitude[start:stop] = batch.magnitude
+
+    def _flush(self) -> None:
+        self.file.flush()
+        if self.fsync:
+            _fsync_path(self.path)
+
+    def _close(self) -> None:
+        self.file.close()
+
+
+WRITERS: dict[str, type[PulseWriter]] = {
+    writer.extension: writer
+    for writer in (PickleWriter, ParquetWriter, CsvWriter, JsonWriter, NpyWriter, Hdf5Writer, TfpWriter, TfzWriter)
+}
+
+
+def open_writer(extension: str, folder: Path, **kwargs: object) -> PulseWriter:
+    try:
+        writer = WRITERS[extension]
+    except KeyError:
+        msg = f"No writer for extension {extension!r}. Choose one of {list(WRITERS)}."
+        raise ValueError(msg) from None
+    return writer(folder, **kwargs)
+
+
+def _rows(time: np.ndarray, num_pulses: int) -> np.ndarray:
+    return np.broadcast_to(time, (num_pulses, time.shape[-1]))
+
+
+def _join(values: np.ndarray) -> str:
+    return " ".join(map(str, values.tolist()))
+
+
+def _has_time_axis(batch: PulseBatch, time: np.ndarray) -> bool:
+    if batch.shared_time:
+        return np.array_equal(batch.time, time)
+    return bool((batch.time == time).all())
+
+
+def _fsync_path(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _import_pyarrow():  # noqa: ANN202
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        msg = "Could not import module `pyarrow`. To save data to parquet, install it with `pip install pyarrow`."
+        raise ImportError(
+            msg,
+            name=e.name,
+            path=e.path,
+        ) from e
+    return pa, pq
+
+
+def _import_h5py():  # noqa: ANN202
+    try:
+        import h5py
+    except ImportError as e:
+        msg = "Could not import module `h5py`. To save data to HDF5, install it with `pip install h5py`."
+        raise ImportError(
+            msg,
+            name=e.name,
+            path=e.path,
+        ) from e
+    return h5py
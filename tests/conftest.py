@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import numpy as np
+from teraflashpy.output import PulseBatch
+
+START = np.datetime64("2024-05-01T12:00", "us")
+HEADER = ["Time/ps", " Signal/nA"]
+
+
+def make_batch(
+    magnitude: np.ndarray,
+    time: np.ndarray,
+    *,
+    first: int = 0,
+    interval: np.timedelta64 = np.timedelta64(1, "ms"),  # noqa: B008
+    header: list[str] = HEADER,
+) -> PulseBatch:
+    """A batch of the pulses in `magnitude`, built without validation, taken every `interval` from `first` intervals
+    after `START`.
+    """
+    magnitude = np.atleast_2d(magnitude).astype(np.float32)
+    return PulseBatch.model_construct(
+        timestamps=START + np.arange(first, first + len(magnitude)) * interval,
+        header=header,
+        time=time,
+        magnitude=magnitude,
+    )
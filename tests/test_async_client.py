@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import pytest
+from teraflashpy.async_client import AsyncTeraflashProClient
+from teraflashpy.core import LOCALHOST
+from teraflashpy.output import PulseFormatChangedError
+from teraflashpy.simulator import SimulatorConfig, render_frames
+from teraflashpy.statistics import RunningStatistics
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+FRAMES = [
+    *render_frames(SimulatorConfig(num_samples=50, num_variants=3, seed=0)),
+    *render_frames(SimulatorConfig(num_samples=60, num_variants=2, seed=1, header="Time/ps, Signal/mV")),
+]
+
+
+def _run(test: Callable[[AsyncTeraflashProClient], Awaitable[None]]) -> None:
+    """Runs `test` with a client connected to a server that sends `FRAMES` in one go, then waits for it to hang up."""
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(b"".join(FRAMES))
+        await writer.drain()
+        await reader.read()
+        writer.close()
+
+    async def main() -> None:
+        async with await asyncio.start_server(serve, LOCALHOST, 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            async with AsyncTeraflashProClient(port=port) as client:
+                await test(client)
+
+    asyncio.run(main())
+
+
+def test_read_ends_a_batch_when_the_header_changes() -> None:
+    async def test(client: AsyncTeraflashProClient) -> None:
+        # Without waiting for the 10 pulses the server does not send.
+        first = await client.read(10, timeout=1)
+        second = await client.read(2, timeout=1)
+
+        assert len(first) == 3
+        assert first.num_samples == 50
+        assert len(second) == 2
+        assert second.header == ["Time/ps", " Signal/mV"]
+        assert client.received == 5
+
+    _run(test)
+
+
+def test_stream_starts_with_the_pulses_carried_over() -> None:
+    async def test(client: AsyncTeraflashProClient) -> None:
+        await client.read(10, timeout=1)
+        pulses = []
+        async with asyncio.timeout(5):
+            async for pulse in client.stream():
+                pulses.append(pulse)
+                if len(pulses) == 2:
+                    break
+
+        assert [pulse.header for pulse in pulses] == [["Time/ps", " Signal/mV"]] * 2
+        assert pulses[0].magnitude.size == 60
+
+    _run(test)
+
+
+def test_accumulate_stops_at_another_number_of_samples() -> None:
+    async def test(client: AsyncTeraflashProClient) -> None:
+        with pytest.raises(PulseFormatChangedError) as error:
+            await client.accumulate(5, timeout=1)
+        statistics = await client.accumulate(2, RunningStatistics(), timeout=1)
+
+        assert error.value.result.count == 3
+        assert statistics.count == 2
+        assert statistics.num_samples == 60
+
+    _run(test)
+
+
+def test_read_times_out() -> None:
+    async def test(client: AsyncTeraflashProClient) -> None:
+        await client.read(3, timeout=1)
+        await client.read(2, timeout=1)
+        with pytest.raises(TimeoutError):
+            await client.read(1, timeout=0.1)
+
+    _run(test)
+
+
+def test_read_does_not_swallow_a_cancellation() -> None:
+    async def main() -> None:
+        client = AsyncTeraflashProClient()
+        client.reader = asyncio.StreamReader()
+        task = asyncio.create_task(client.read(1, timeout=5))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        # The frame arrives just as the read is cancelled, as when `AcquisitionManager` stops its sessions.
+        client.reader.feed_data(FRAMES[0])
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
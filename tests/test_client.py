@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import queue
+import time
+from datetime import datetime, timezone
+from multiprocessing.sharedctypes import RawArray
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+from teraflashpy.client import PulsesDroppedError, TeraflashProClient, _publish
+from teraflashpy.core import CapturePolicy, Transport, WorkerKind
+from teraflashpy.output import PulseFormatChangedError
+from teraflashpy.recording import FrameRecorder
+from teraflashpy.simulator import BackgroundSimulator, SimulatorConfig, render_frames
+from teraflashpy.statistics import RunningStatistics
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+BUFFER_SIZE = 4
+
+
+def _client(simulator: BackgroundSimulator, policy: CapturePolicy, transport: Transport) -> TeraflashProClient:
+    return TeraflashProClient(
+        transport=transport,
+        capture_policy=policy,
+        buffer_size=BUFFER_SIZE,
+        slot_size=1 << 12,
+        port=simulator.port,
+    )
+
+
+def _fall_behind(client: TeraflashProClient) -> None:
+    """Waits until the instrument has sent many more pulses than the buffer holds."""
+    # Rather than reading the first pulse, which with `Lossless` can fail already.
+    deadline = time.monotonic() + 10
+    while client.stats.received == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.5)
+
+
+@pytest.mark.parametrize("transport", list(Transport))
+def test_latest_only_drops_the_oldest(transport: Transport) -> None:
+    with (
+        BackgroundSimulator(SimulatorConfig(num_samples=50, rate=1000), port=0) as simulator,
+        _client(simulator, CapturePolicy.LatestOnly, transport) as client,
+    ):
+        _fall_behind(client)
+        before = time.time()
+        batch = client.read(BUFFER_SIZE, timeout=10)
+        stats = client.stats
+
+    assert len(batch) == BUFFER_SIZE
+    assert stats.dropped > 0
+    # The pulses read were buffered moments ago, rather than when the reader fell behind.
+    age = before - batch.timestamps[0].astype("datetime64[us]").astype(float) / 1e6
+    assert age < 0.2
+
+
+@pytest.mark.parametrize("transport", list(Transport))
+def test_lossless_reports_the_pulses_dropped(transport: Transport) -> None:
+    # Slow enough that the buffer does not overflow again between the two reads.
+    with (
+        BackgroundSimulator(SimulatorConfig(num_samples=50, rate=100), port=0) as simulator,
+        _client(simulator, CapturePolicy.Lossless, transport) as client,
+    ):
+        _fall_behind(client)
+        with pytest.raises(PulsesDroppedError) as error:
+            client.read(BUFFER_SIZE, timeout=10)
+        # Reported once.
+        client.read(1, timeout=10)
+
+    assert error.value.dropped > 0
+    assert len(error.value.result) == BUFFER_SIZE
+
+
+def test_blocking_pushes_back() -> None:
+    with (
+        BackgroundSimulator(SimulatorConfig(num_samples=50, rate=1000), port=0) as simulator,
+        _client(simulator, CapturePolicy.Blocking, Transport.Queue) as client,
+    ):
+        _fall_behind(client)
+        received = client.stats.received
+        batch = client.read(50, timeout=10)
+        stats = client.stats
+
+    # The backend stopped reading once the buffer was full, rather than dropping pulses.
+    assert received <= 1 + BUFFER_SIZE + 1
+    assert len(batch) == 50
+    assert stats.dropped == 0
+
+
+class _LaggingQueue(queue.Queue):
+    """A queue that looks empty to `get_nowait` while it is full, like a `multiprocessing.Queue` behind its pipe."""
+
+    def get_nowait(self) -> object:
+        raise queue.Empty
+
+
+@pytest.mark.parametrize("buffer", [queue.Queue(maxsize=2), _LaggingQueue(maxsize=2)])
+def test_latest_only_publishes_without_spinning(buffer: queue.Queue) -> None:
+    counters = RawArray("q", 3)
+    timestamp = datetime.now(timezone.utc)
+    for index in range(5):
+        _publish(buffer, CapturePolicy.LatestOnly, counters, bytes([index]), timestamp)
+
+    received, dropped, _ = counters
+    assert received == 5
+    assert dropped == 3
+    assert buffer.qsize() == 2
+
+
+def _record(path: Path, *configs: SimulatorConfig) -> Path:
+    """Records every frame rendered for each of `configs` in turn."""
+    with FrameRecorder(path) as recorder:
+        for config in configs:
+            for frame in render_frames(config):
+                recorder.write(frame[6:], datetime.now(timezone.utc))
+    return path
+
+
+@pytest.mark.parametrize("decode_workers", [0, 2])
+def test_read_ends_a_batch_when_the_header_changes(tmp_path: Path, decode_workers: int) -> None:
+    log = _record(
+        tmp_path / "frames.log",
+        SimulatorConfig(num_samples=50, num_variants=3, seed=0),
+        SimulatorConfig(num_samples=50, num_variants=1, seed=0, header="Time/ps, Signal/mV"),
+    )
+    with TeraflashProClient(
+        capture_policy=CapturePolicy.Blocking,
+        decode_workers=decode_workers,
+        replay_from=log,
+        replay_speed=None,
+    ) as client:
+        # Without waiting for the 10 pulses the recording does not have.
+        first = client.read(10, timeout=1)
+        second = client.read(1, timeout=1)
+
+    assert len(first) == 3
+    assert first.header == ["Time/ps", " Signal/nA"]
+    assert second.header == ["Time/ps", " Signal/mV"]
+    assert client.stats.read == 4
+
+
+def test_accumulate_stops_at_another_number_of_samples(tmp_path: Path) -> None:
+    log = _record(
+        tmp_path / "frames.log",
+        SimulatorConfig(num_samples=50, num_variants=3, seed=0),
+        SimulatorConfig(num_samples=60, num_variants=2, seed=0),
+    )
+    with TeraflashProClient(capture_policy=CapturePolicy.Blocking, replay_from=log, replay_speed=None) as client:
+        with pytest.raises(PulseFormatChangedError) as error:
+            client.accumulate(5, timeout=1)
+        statistics = client.accumulate(2, RunningStatistics(), timeout=1)
+
+    assert error.value.result.count == 3
+    assert error.value.result.num_samples == 50
+    assert statistics.count == 2
+    assert statistics.num_samples == 60
+
+
+@pytest.mark.parametrize("kind", list(WorkerKind))
+def test_decode_pool_keeps_the_order(tmp_path: Path, kind: WorkerKind) -> None:
+    log = _record(tmp_path / "frames.log", SimulatorConfig(num_samples=50, num_variants=40, seed=0))
+    batches = []
+    for decode_workers in (0, 3):
+        with TeraflashProClient(
+            capture_policy=CapturePolicy.Blocking,
+            decode_workers=decode_workers,
+            decode_worker_kind=kind,
+            replay_from=log,
+            replay_speed=None,
+        ) as client:
+            batches.append(client.read(40, timeout=5))
+        assert client.metrics.metrics["teraflash_decode_seconds"].count == 40
+
+    in_order, pooled = batches
+    np.testing.assert_array_equal(pooled.timestamps, in_order.timestamps)
+    np.testing.assert_array_equal(pooled.magnitude, in_order.magnitude)
+    np.testing.assert_array_equal(pooled.time, in_order.time)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+from conftest import make_batch
+from teraflashpy.codec import Codec, TimeAxis, decode_batch, encode_batch, encode_time_axis, read_chunks
+from teraflashpy.writers import TfzWriter
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from teraflashpy.output import PulseBatch
+
+NUM_PULSES, NUM_SAMPLES = 4, 100
+AFFINE = np.float32(1000.0) + np.float32(0.05) * np.arange(NUM_SAMPLES, dtype=np.float32)
+SHARED = np.sort(np.random.default_rng(1).uniform(0, 100, NUM_SAMPLES)).astype(np.float32)
+PER_PULSE = np.stack([SHARED + index for index in range(NUM_PULSES)])
+
+
+def _batch(time: np.ndarray, scale: float = 100.0) -> PulseBatch:
+    return make_batch(scale * np.random.default_rng(0).normal(size=(NUM_PULSES, NUM_SAMPLES)), time)
+
+
+@pytest.mark.parametrize(
+    ("time", "time_axis"),
+    [(AFFINE, TimeAxis.Affine), (SHARED, TimeAxis.Shared), (PER_PULSE, TimeAxis.PerPulse)],
+)
+def test_time_axis(time: np.ndarray, time_axis: TimeAxis) -> None:
+    assert encode_time_axis(time)[0] is time_axis
+
+
+@pytest.mark.parametrize("codec", [Codec.Raw, Codec.Lz4])
+@pytest.mark.parametrize("time", [AFFINE, SHARED, PER_PULSE], ids=["affine", "shared", "per-pulse"])
+def test_lossless_round_trip(codec: Codec, time: np.ndarray) -> None:
+    batch = _batch(time)
+
+    decoded = decode_batch(encode_batch(batch, codec))
+
+    assert decoded.header == batch.header
+    np.testing.assert_array_equal(decoded.timestamps, batch.timestamps)
+    np.testing.assert_array_equal(decoded.time, batch.time)
+    np.testing.assert_array_equal(decoded.magnitude, batch.magnitude)
+
+
+def test_float16_round_trip() -> None:
+    batch = _batch(PER_PULSE)
+
+    decoded = decode_batch(encode_batch(batch, Codec.Float16))
+
+    np.testing.assert_array_equal(decoded.time, batch.time)
+    np.testing.assert_allclose(decoded.magnitude, batch.magnitude, rtol=1e-3)
+
+
+@pytest.mark.parametrize("max_error", [1e-3, None])
+def test_float16_falls_back_to_lossless(max_error: float | None) -> None:
+    # Beyond the range of float16.
+    batch = _batch(SHARED, scale=1e6)
+
+    decoded = decode_batch(encode_batch(batch, Codec.Float16, max_error=max_error))
+
+    np.testing.assert_array_equal(decoded.magnitude, batch.magnitude)
+
+
+def test_float16_falls_back_to_lossless_without_a_bound() -> None:
+    # Too small for the normal range of float16, so only a few bits of each would be kept.
+    batch = _batch(SHARED, scale=1e-6)
+
+    decoded = decode_batch(encode_batch(batch, Codec.Float16))
+
+    np.testing.assert_array_equal(decoded.magnitude, batch.magnitude)
+
+
+def test_chunk_file_round_trip(tmp_path: Path) -> None:
+    batches = [_batch(AFFINE), _batch(PER_PULSE)]
+    with TfzWriter(tmp_path, fsync=False) as writer:
+        for batch in batches:
+            writer.write(batch)
+    [path] = writer.paths
+    # A chunk cut short by a crash is left out.
+    with path.open("r+b") as f:
+        f.truncate(path.stat().st_size - 10)
+
+    [decoded] = read_chunks(path)
+
+    np.testing.assert_array_equal(decoded.magnitude, batches[0].magnitude)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from teraflashpy.commands import (
+    AcquisitionAverageInput,
+    AcquisitionBeginInput,
+    AcquisitionRangeInput,
+    Command,
+    CommandError,
+    CommandInput,
+    CommandResult,
+    LaserSetInput,
+    NoInput,
+    SystemMonitorCode,
+    SystemMonitorInput,
+    check_input,
+    run,
+    run_many,
+)
+from teraflashpy.states.laser import AcquisitionState, AcquisitionStatus, LaserState, LaserStatus
+from teraflashpy.states.system import SystemState, SystemStatus
+from teraflashpy.states.trans_impedance_amplifier import TransImpedanceAmplifierStatus
+from teraflashpy.states.transfer import TransferStatus
+
+STATE = SystemState(
+    status=SystemStatus.On,
+    laser_state=LaserState(
+        status=LaserStatus.On,
+        pump_current=50,
+        transfer_status=TransferStatus.Block,
+        tia_status=TransImpedanceAmplifierStatus.Medium,
+    ),
+    acquisition_state=AcquisitionState(
+        state=AcquisitionStatus.Off,
+        start_position=850,
+        measuring_range=100,
+        num_averages=1,
+    ),
+)
+
+TRANSITIONS: list[tuple[Command, CommandInput | None, dict[str, Any], Any]] = [
+    (
+        Command.SystemStop,
+        None,
+        {"status": SystemStatus.Off, "laser_state": {"status": LaserStatus.Off}},
+        None,
+    ),
+    (Command.SystemTellStatus, None, {}, SystemStatus.On),
+    (Command.SystemMonitor, SystemMonitorInput(code=SystemMonitorCode.ReceiverSignal), {}, None),
+    (
+        Command.SystemMonitor,
+        SystemMonitorInput(code=SystemMonitorCode.SwitchTransferSliding),
+        {"laser_state": {"transfer_status": TransferStatus.Sliding}},
+        None,
+    ),
+    (Command.SystemMonitor, SystemMonitorInput(code=SystemMonitorCode.SwitchTransferBlock), {}, None),
+    (Command.SystemTiaFull, None, {"laser_state": {"tia_status": TransImpedanceAmplifierStatus.Full}}, None),
+    (Command.SystemTiaAtn1, None, {}, None),
+    (Command.SystemTiaAtn2, None, {"laser_state": {"tia_status": TransImpedanceAmplifierStatus.Small}}, None),
+    (Command.LaserOff, None, {"laser_state": {"status": LaserStatus.Off}}, None),
+    (Command.LaserOn, None, {}, None),
+    (Command.LaserSet, LaserSetInput(pump_current=42.5), {"laser_state": {"pump_current": 42.5}}, None),
+    (
+        Command.AcquisitionBegin,
+        AcquisitionBeginInput(start_position=900.1),
+        {"acquisition_state": {"start_position": 900.1}},
+        None,
+    ),
+    (
+        Command.AcquisitionRange,
+        AcquisitionRangeInput(measuring_range=120),
+        {"acquisition_state": {"measuring_range": 120}},
+        None,
+    ),
+    (Command.AcquisitionStop, None, {}, None),
+    (Command.AcquisitionStart, None, {"acquisition_state": {"state": AcquisitionStatus.On}}, None),
+    (
+        Command.AcquisitionAverage,
+        AcquisitionAverageInput(num_averages=1000),
+        {"acquisition_state": {"num_averages": 1000}},
+        None,
+    ),
+    (Command.AcquisitionResetAvg, None, {}, None),
+    (Command.TransmissionSliding, None, {"laser_state": {"transfer_status": TransferStatus.Sliding}}, None),
+    (Command.TransmissionBlock, None, {}, None),
+]
+"Every command from `STATE`, with the fields it changes and the value it reports."
+
+
+def _expected(update: dict[str, Any]) -> SystemState:
+    update = {
+        key: getattr(STATE, key).model_copy(update=value) if isinstance(value, dict) else value
+        for key, value in update.items()
+    }
+    return STATE.model_copy(update=update)
+
+
+def test_every_command_is_covered() -> None:
+    assert {command for command, *_ in TRANSITIONS} == set(Command)
+
+
+@pytest.mark.parametrize(("command", "inputs", "update", "value"), TRANSITIONS)
+def test_transitions(command: Command, inputs: CommandInput | None, update: dict[str, Any], value: Any) -> None:  # noqa: ANN401
+    result, state, reported = run(STATE, command, inputs)
+
+    assert result is CommandResult.Ok
+    assert state == _expected(update)
+    assert reported == value
+    # Only the sub-states that changed are copied, and a command that changes nothing returns the state itself.
+    assert (state is STATE) == (not update)
+    for key in ("laser_state", "acquisition_state"):
+        assert (getattr(state, key) is getattr(STATE, key)) == (key not in update)
+
+
+def test_stopping_a_stopped_system_returns_it_as_it_is() -> None:
+    _, stopped, _ = run(STATE, Command.SystemStop)
+
+    _, state, _ = run(stopped, Command.SystemStop)
+
+    assert state is stopped
+
+
+def test_range_is_refused_while_acquiring() -> None:
+    _, acquiring, _ = run(STATE, Command.AcquisitionStart)
+
+    with pytest.raises(CommandError, match="stopped"):
+        run(acquiring, Command.AcquisitionRange, AcquisitionRangeInput(measuring_range=120))
+
+
+@pytest.mark.parametrize(
+    ("command", "inputs"),
+    [
+        (Command.LaserSet, None),
+        (Command.LaserSet, AcquisitionAverageInput(num_averages=10)),
+        (Command.LaserOn, LaserSetInput(pump_current=10)),
+    ],
+)
+def test_check_input_refuses_inputs_of_other_commands(command: Command, inputs: CommandInput | None) -> None:
+    with pytest.raises(TypeError, match=f"{command.name} takes"):
+        check_input(command, inputs)
+
+
+def test_check_input() -> None:
+    inputs = LaserSetInput(pump_current=10)
+
+    assert check_input(Command.LaserSet, inputs) is inputs
+    assert check_input(Command.LaserOn, None) == NoInput()
+    assert check_input(Command.LaserOn, NoInput()) == NoInput()
+
+
+def test_run_many() -> None:
+    commands = [
+        (Command.AcquisitionStart, None),
+        (Command.SystemTellStatus, None),
+        (Command.SystemStop, None),
+        (Command.SystemTellStatus, None),
+    ]
+
+    state, values = run_many(STATE, commands)
+
+    assert values == [None, SystemStatus.On, None, SystemStatus.Off]
+    assert state.acquisition_state.state is AcquisitionStatus.Off
+    assert state.laser_state.status is LaserStatus.Off
+
+
+def test_run_many_checks_every_input_first() -> None:
+    commands = [(Command.AcquisitionStart, None), (Command.LaserSet, None)]
+
+    with pytest.raises(TypeError):
+        run_many(STATE, commands)
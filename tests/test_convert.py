@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import csv
+import json
+import pickle
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+from teraflashpy.convert import convert, read_pulses
+from teraflashpy.output import PulseData
+from teraflashpy.store import PulseStore
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+START = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+
+
+def _write_to_file(pulses: list[PulseData], save_path: Path) -> None:
+    """The way the `main.py` of earlier versions saved pulses."""
+    extension = save_path.suffix
+    if extension == ".pkl":
+        with save_path.open("wb") as handle:
+            pickle.dump([pulse.model_dump() for pulse in pulses], handle)
+    elif extension == ".parquet":
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+        table = pa.Table.from_pylist([pulse.model_dump() for pulse in pulses])
+        pq.write_table(table, save_path)
+    elif extension == ".csv":
+        with save_path.open("w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(pulses[0].model_fields.keys()))
+            writer.writeheader()
+            writer.writerows([pulse.model_dump() for pulse in pulses])
+    elif extension == ".json":
+        with save_path.open("w") as handle:
+            json.dump([pulse.model_dump(mode="json") for pulse in pulses], handle)
+
+
+def _pulses(num_pulses: int, num_samples: int) -> list[PulseData]:
+    rng = np.random.default_rng(0)
+    return [
+        PulseData(
+            timestamp=START + timedelta(milliseconds=index),
+            header=["Time/ps", " Signal/nA"],
+            time=np.arange(num_samples, dtype=np.float32) / 20,
+            magnitude=rng.normal(size=num_samples).astype(np.float32),
+        )
+        for index in range(num_pulses)
+    ]
+
+
+@pytest.mark.parametrize("extension", [".pkl", ".parquet", ".csv", ".json"])
+def test_reads_files_saved_by_earlier_versions(tmp_path: Path, extension: str) -> None:
+    pulses = _pulses(3, 50)
+    path = tmp_path / f"pulses{extension}"
+    _write_to_file(pulses, path)
+
+    [batch] = read_pulses(path)
+
+    assert batch.header == pulses[0].header
+    assert list(batch.timestamps) == [np.datetime64(pulse.timestamp.replace(tzinfo=None)) for pulse in pulses]
+    # `.csv` keeps the 8 significant digits numpy prints.
+    np.testing.assert_allclose(batch.magnitude, [pulse.magnitude for pulse in pulses], rtol=1e-6)
+    np.testing.assert_allclose(batch.time[0], pulses[0].time, rtol=1e-6)
+
+
+@pytest.mark.parametrize("extension", [".pkl", ".parquet", ".json"])
+def test_converts_files_saved_by_earlier_versions(tmp_path: Path, extension: str) -> None:
+    pulses = _pulses(3, 2000)
+    path = tmp_path / f"pulses{extension}"
+    _write_to_file(pulses, path)
+
+    [store] = convert(path)
+    batch = PulseStore(store).between(START, START + timedelta(seconds=1))
+
+    assert len(batch) == 3
+    np.testing.assert_array_equal(batch.magnitude[2], pulses[2].magnitude)
+
+
+def test_summarised_csv_is_refused(tmp_path: Path) -> None:
+    path = tmp_path / "pulses.csv"
+    _write_to_file(_pulses(1, 2000), path)
+
+    with pytest.raises(ValueError, match="more than 1000 samples"):
+        list(read_pulses(path))
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+from teraflashpy.client import TeraflashProClient
+from teraflashpy.core import CapturePolicy, Transport
+from teraflashpy.daemon import AcquisitionDaemon, Subscription, daemon_health, stop_daemon
+from teraflashpy.simulator import BackgroundSimulator, SimulatorConfig, render_frames
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+# As many different frames as the simulator sends in a second, so a frame tells where in the stream it is.
+CONFIG = SimulatorConfig(num_samples=50, num_variants=1000, rate=1000, seed=0)
+POSITIONS = {frame[6:]: position for position, frame in enumerate(render_frames(CONFIG))}
+
+
+@pytest.fixture()
+def address(tmp_path: Path) -> Iterator[Path]:
+    """The address of a daemon publishing a simulator that sends 1000 pulses a second."""
+    address = tmp_path / "daemon.sock"
+    with BackgroundSimulator(CONFIG, port=0) as simulator:
+        daemon = AcquisitionDaemon(port=simulator.port, address=address, ring_slots=256, slot_size=1 << 12)
+        thread = threading.Thread(target=daemon.run, daemon=True)
+        thread.start()
+        try:
+            while not address.exists() or not daemon_health(address).connected:
+                time.sleep(0.01)
+            yield address
+        finally:
+            try:
+                stop_daemon(address)
+            except Exception:
+                # The request to stop did not get through, so stop it from here.
+                daemon.stop()
+                raise
+            finally:
+                thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert not address.exists()
+
+
+def _positions(subscription: Subscription, num_frames: int) -> list[int]:
+    """Reads `num_frames` frames, and returns where each is in the stream the simulator sends."""
+    return [POSITIONS[subscription.read_frame(timeout=5)[0]] for _ in range(num_frames)]
+
+
+def _consecutive(positions: list[int]) -> bool:
+    return all((later - earlier) % len(POSITIONS) == 1 for earlier, later in zip(positions, positions[1:]))
+
+
+def test_every_subscriber_gets_every_frame(address: Path) -> None:
+    with (
+        Subscription(address, CapturePolicy.Lossless, transport=Transport.Queue, name="queue") as queue,
+        Subscription(address, CapturePolicy.Lossless, transport=Transport.SharedMemory, name="ring") as ring,
+    ):
+        health = daemon_health(address)
+        from_ring = _positions(ring, 50)
+        # The queue subscribed first, so it is sent every frame the ring is, and maybe some before.
+        from_queue = _positions(queue, 1)
+        while from_queue[-1] != from_ring[0] and len(from_queue) < len(POSITIONS):
+            from_queue += _positions(queue, 1)
+        from_queue += _positions(queue, len(from_ring) - 1)
+
+    assert sorted(subscriber.name for subscriber in health.subscribers) == ["queue", "ring"]
+    assert queue.dropped == ring.dropped == 0
+    assert _consecutive(from_queue)
+    assert _consecutive(from_ring)
+    assert from_queue[-len(from_ring) :] == from_ring
+
+
+def test_slow_subscriber_does_not_hold_back_the_others(address: Path) -> None:
+    with (
+        Subscription(address, CapturePolicy.LatestOnly, buffer_size=2, name="slow") as slow,
+        Subscription(address, CapturePolicy.Lossless, name="fast") as fast,
+    ):
+        _positions(slow, 1)
+        from_fast = _positions(fast, 300)
+        _positions(slow, 1)
+
+    assert slow.dropped > 0
+    assert fast.dropped == 0
+    assert _consecutive(from_fast)
+
+
+def test_client_attaches_to_the_daemon(address: Path) -> None:
+    with TeraflashProClient(attach_to=address) as client:
+        batch = client.read(10, timeout=10)
+
+    assert len(batch) == 10
+    assert batch.num_samples == 50
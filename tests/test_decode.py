@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from teraflashpy.decode import decode_pulse
+from teraflashpy.simulator import SimulatorConfig, render_frames
+
+
+def _parse_line_by_line(pulse: bytes) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """The way `TeraflashProClient` of earlier versions decoded pulses."""
+    pulsedata = pulse.decode("utf-8").split("\r\n")
+    header = pulsedata.pop(0).split(",")
+    time = np.zeros(len(pulsedata) - 1, dtype=float)
+    magnitude = np.zeros(len(pulsedata) - 1, dtype=float)
+    for x in range(len(pulsedata) - 1):
+        _time, _magnitude = pulsedata[x].split(",")
+        time[x] = float(_time)
+        magnitude[x] = float(_magnitude)
+
+    return header, time, magnitude
+
+
+@pytest.mark.parametrize("num_samples", [1, 50, 2000])
+def test_decodes_like_the_line_by_line_parser(num_samples: int) -> None:
+    [frame] = render_frames(SimulatorConfig(num_samples=num_samples, num_variants=1, seed=0))
+    pulse = frame[6:]
+
+    header, time, magnitude = decode_pulse(pulse)
+    expected_header, expected_time, expected_magnitude = _parse_line_by_line(pulse)
+
+    assert header == expected_header
+    assert time.dtype == magnitude.dtype == np.float32
+    assert time.flags.c_contiguous
+    assert magnitude.flags.c_contiguous
+    np.testing.assert_array_equal(time, expected_time.astype(np.float32))
+    np.testing.assert_array_equal(magnitude, expected_magnitude.astype(np.float32))
+
+
+def test_accepts_memoryviews() -> None:
+    header, time, magnitude = decode_pulse(memoryview(b"t,m\r\n1.5,-2\r\n3,4e-1\r\n"))
+
+    assert header == ["t", "m"]
+    assert time.tolist() == [1.5, 3]
+    np.testing.assert_array_equal(magnitude, np.array([-2, 0.4], dtype=np.float32))
+
+
+def test_ignores_an_incomplete_last_row() -> None:
+    _, time, magnitude = decode_pulse(b"t,m\r\n1,2\r\n3,")
+
+    assert time.tolist() == [1]
+    assert magnitude.tolist() == [2]
+
+
+def test_header_only() -> None:
+    header, time, magnitude = decode_pulse(b"t,m\r\n")
+
+    assert header == ["t", "m"]
+    assert time.size == magnitude.size == 0
+
+
+# numpy warns before it gives up on a value it cannot parse.
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+@pytest.mark.parametrize(
+    "pulse",
+    [
+        b"no header",
+        b"t,m\r\n1,2\r\n3\r\n",
+        b"t,m\r\n1,x\r\n",
+        # Two values a row on average, but not in every row.
+        b"t,m\r\n1,2,3\r\n4\r\n",
+        b"t,m\r\n1\r\n2,3,4\r\n",
+    ],
+)
+def test_malformed_pulses(pulse: bytes) -> None:
+    with pytest.raises(ValueError, match="header|rows"):
+        decode_pulse(pulse)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from teraflashpy.framing import FrameParser
+from teraflashpy.simulator import SimulatorConfig, render_frames
+
+FRAMES = render_frames(SimulatorConfig(num_samples=20, num_variants=3, seed=0))
+PAYLOADS = [frame[6:] for frame in FRAMES]
+
+
+def test_frames_split_across_reads() -> None:
+    parser = FrameParser(min_read_size=16)
+    stream = b"".join(FRAMES)
+    frames = []
+    for start in range(0, len(stream), 7):
+        frames.extend(parser.feed(stream[start : start + 7]))
+
+    assert frames == PAYLOADS
+    assert parser.buffered == 0
+    assert parser.bytes_received == len(stream)
+
+
+def test_frames_written_into_the_buffer() -> None:
+    # The way `asyncio.BufferedProtocol` hands the parser what it receives.
+    parser = FrameParser()
+    frames = []
+    for frame in FRAMES:
+        buffer = parser.get_buffer()
+        buffer[: len(frame)] = frame
+        frames.extend(parser.buffer_updated(len(frame)))
+
+    assert frames == PAYLOADS
+
+
+def test_resynchronizes_after_garbage() -> None:
+    garbage = b"\x00garbage 123456 0000051"
+    parser = FrameParser()
+
+    frames = parser.feed(FRAMES[0] + garbage + FRAMES[1] + FRAMES[2])
+
+    assert frames == PAYLOADS
+    assert parser.resyncs == 1
+    assert parser.bytes_skipped == len(garbage)
+
+
+def test_resynchronizes_after_an_impossible_length() -> None:
+    parser = FrameParser(max_frame_length=len(PAYLOADS[0]) + 10)
+
+    frames = parser.feed(b"999999" + FRAMES[1])
+
+    assert frames == [PAYLOADS[1]]
+    assert parser.bytes_skipped == 6
+
+
+def test_waits_for_the_rest_of_a_frame() -> None:
+    parser = FrameParser()
+
+    assert parser.feed(FRAMES[0][:-1]) == []
+    assert parser.feed(FRAMES[0][-1:]) == [PAYLOADS[0]]
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import TYPE_CHECKING
+
+import pytest
+from teraflashpy.manager import AcquisitionManager, Instrument
+from teraflashpy.simulator import BackgroundSimulator, SimulatorConfig
+
+if TYPE_CHECKING:
+    from teraflashpy.output import PulseBatch
+
+
+class _RecordingWriter:
+    def __init__(self, *, fail: bool = False) -> None:
+        self.fail = fail
+        self.batches: list[PulseBatch] = []
+
+    def write(self, batch: PulseBatch) -> None:
+        if self.fail:
+            msg = "Disk full."
+            raise OSError(msg)
+        self.batches.append(batch)
+
+    def close(self) -> None:
+        pass
+
+
+def _collect(writers: dict[str, _RecordingWriter], num_batches: int) -> None:
+    with contextlib.ExitStack() as stack:
+        simulators = [
+            stack.enter_context(BackgroundSimulator(SimulatorConfig(num_samples=50, rate=None, seed=index), port=0))
+            for index in range(len(writers))
+        ]
+        instruments = [Instrument(name=name, port=simulator.port) for name, simulator in zip(writers, simulators)]
+        manager = AcquisitionManager(instruments, batch_size=10, writers=writers, max_pending_writes=1, timeout=5)
+        asyncio.run(asyncio.wait_for(manager.run(num_batches), 10))
+
+
+def test_every_batch_is_written() -> None:
+    writers = {"a": _RecordingWriter(), "b": _RecordingWriter()}
+    _collect(writers, num_batches=5)
+
+    assert [len(writer.batches) for writer in writers.values()] == [5, 5]
+
+
+def test_failing_writer_stops_the_sessions() -> None:
+    # Rather than the sessions waiting forever for room in the queue of batches to write.
+    with pytest.raises(OSError, match="Disk full"):
+        _collect({"a": _RecordingWriter(fail=True), "b": _RecordingWriter()}, num_batches=1000)
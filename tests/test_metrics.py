@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import logging
+import re
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+from teraflashpy.metrics import (
+    LATENCY_BUCKETS,
+    CallbackSink,
+    Histogram,
+    Metrics,
+    MetricsReporter,
+    MetricsSink,
+    PrometheusSink,
+    render_prometheus,
+)
+
+DECILES = [10 * decile for decile in range(1, 11)]
+
+
+def test_registry() -> None:
+    depth = 3
+    metrics = Metrics({"instrument": "tf0"})
+    pulses = metrics.counter("pulses", "Pulses read.")
+    metrics.gauge("queue_depth", "Pulses waiting.", lambda: depth)
+    latency = metrics.histogram("latency_seconds", "Latency.", buckets=[1, 2])
+
+    pulses.inc()
+    pulses.inc(2)
+    latency.observe(0.5)
+    latency.observe(1.5)
+
+    assert list(metrics.metrics) == ["teraflash_pulses", "teraflash_queue_depth", "teraflash_latency_seconds"]
+    assert metrics.snapshot() == {
+        "teraflash_pulses": 3,
+        "teraflash_queue_depth": 3,
+        "teraflash_latency_seconds_count": 2,
+        "teraflash_latency_seconds_mean": 1.0,
+        "teraflash_latency_seconds_p50": 1.0,
+        "teraflash_latency_seconds_p99": 1.5,
+        "teraflash_latency_seconds_max": 1.5,
+    }
+    # Registering a name again starts that metric over.
+    metrics.counter("pulses", "Pulses read.")
+    assert metrics.snapshot()["teraflash_pulses"] == 0
+
+
+def test_percentiles_interpolate_within_their_bucket() -> None:
+    histogram = Histogram("h", "", buckets=DECILES)
+    for value in np.arange(100) + 0.5:
+        histogram.observe(value)
+
+    assert histogram.percentile(25) == 25
+    assert histogram.percentile(50) == 50
+    assert histogram.percentile(99) == 99
+    # Never above the largest observation.
+    assert histogram.percentile(100) == 99.5
+    assert histogram.mean == 50
+
+
+def test_percentiles_are_close_to_numpy() -> None:
+    values = np.random.default_rng(0).lognormal(-7, 1, size=10_000)
+    histogram = Histogram("h", "")
+    for value in values:
+        histogram.observe(value)
+
+    for q in (50, 90, 99):
+        exact = np.percentile(values, q)
+        # Within the bucket of the exact percentile, whose bounds are a factor of 2 apart.
+        assert exact / 2 <= histogram.percentile(q) <= exact * 2
+
+
+def test_percentiles_beyond_the_last_bucket_and_of_nothing() -> None:
+    histogram = Histogram("h", "", buckets=[1])
+    assert histogram.percentile(50) == 0
+
+    histogram.observe(0.5)
+    histogram.observe(3)
+
+    assert histogram.percentile(100) == 3
+    assert histogram.percentile(75) == 2
+    assert histogram.counts == [1, 1]
+
+
+def test_render_prometheus() -> None:
+    first = Metrics({"instrument": "tf0"})
+    second = Metrics({"instrument": 'a "quoted"\\name\n'})
+    for registry, pulses in ((first, 2), (second, 5)):
+        registry.counter("pulses", "Pulses read.").inc(pulses)
+    first.gauge("queue_depth", "Pulses waiting.").set(0.25)
+    histogram = first.histogram("latency_seconds", "Latency.", buckets=[0.001, 0.01])
+    for value in (0.0005, 0.005, 0.006, 1):
+        histogram.observe(value)
+
+    assert render_prometheus([first, second]) == (
+        "# HELP teraflash_pulses Pulses read.\n"
+        "# TYPE teraflash_pulses counter\n"
+        'teraflash_pulses_total{instrument="tf0"} 2\n'
+        'teraflash_pulses_total{instrument="a \\"quoted\\"\\\\name\\n"} 5\n'
+        "# HELP teraflash_queue_depth Pulses waiting.\n"
+        "# TYPE teraflash_queue_depth gauge\n"
+        'teraflash_queue_depth{instrument="tf0"} 0.25\n'
+        "# HELP teraflash_latency_seconds Latency.\n"
+        "# TYPE teraflash_latency_seconds histogram\n"
+        'teraflash_latency_seconds_bucket{instrument="tf0",le="0.001"} 1\n'
+        'teraflash_latency_seconds_bucket{instrument="tf0",le="0.01"} 3\n'
+        'teraflash_latency_seconds_bucket{instrument="tf0",le="+Inf"} 4\n'
+        'teraflash_latency_seconds_sum{instrument="tf0"} 1.0115\n'
+        'teraflash_latency_seconds_count{instrument="tf0"} 4\n'
+    )
+    assert render_prometheus([Metrics()]) == "\n"
+
+
+def test_render_prometheus_keeps_every_digit() -> None:
+    metrics = Metrics()
+    counter = metrics.counter("bytes_received", "Bytes received.")
+    counter.inc(123456789)
+    seconds = metrics.counter("seconds", "Seconds spent.")
+    seconds.inc(1234567.125)
+
+    first = render_prometheus([metrics])
+    counter.inc()
+
+    assert "teraflash_bytes_received_total 123456789\n" in first
+    assert "teraflash_seconds_total 1234567.125\n" in first
+    assert "teraflash_bytes_received_total 123456790\n" in render_prometheus([metrics])
+
+
+def test_bucket_labels_are_the_bounds_observed_against() -> None:
+    metrics = Metrics()
+    metrics.histogram("latency_seconds", "Latency.")
+
+    labels = re.findall(r'le="([^"]+)"', render_prometheus([metrics]))
+
+    assert "1.048576" in labels
+    assert [float(label) for label in labels[:-1]] == list(LATENCY_BUCKETS)
+
+
+def test_prometheus_sink_serves_the_metrics() -> None:
+    metrics = Metrics()
+    metrics.counter("pulses", "Pulses read.").inc()
+    sink = PrometheusSink(port=0)
+    try:
+        sink.emit([metrics])
+        with urllib.request.urlopen(f"http://127.0.0.1:{sink.port}/metrics", timeout=5) as response:  # noqa: S310
+            body = response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{sink.port}/other", timeout=5)  # noqa: S310
+    finally:
+        sink.close()
+
+    assert body == render_prometheus([metrics])
+
+
+class _FailingSink(MetricsSink):
+    def emit(self, registries: list[Metrics]) -> None:  # noqa: ARG002
+        msg = "unreachable"
+        raise OSError(msg)
+
+
+def test_reporter_reports_on_entry_and_close(caplog: pytest.LogCaptureFixture) -> None:
+    metrics = Metrics({"instrument": "tf0"})
+    pulses = metrics.counter("pulses", "Pulses read.")
+    reports = []
+    sink = CallbackSink(lambda snapshot, labels: reports.append((snapshot, labels)))
+
+    with caplog.at_level(logging.ERROR), MetricsReporter([metrics], [_FailingSink(), sink], interval=60):
+        pulses.inc()
+
+    assert reports == [
+        ({"teraflash_pulses": 0}, {"instrument": "tf0"}),
+        ({"teraflash_pulses": 1}, {"instrument": "tf0"}),
+    ]
+    # A failing sink does not keep the others from reporting.
+    assert caplog.text.count("Reporting metrics to _FailingSink failed.") == 2
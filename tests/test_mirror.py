@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+
+import pytest
+from teraflashpy.mirror import StateMirror
+from teraflashpy.oem_commands import RangeInput, RcCommand, RdCommand
+from teraflashpy.remote import RemoteControl, RemoteControlError
+from teraflashpy.simulator import RemoteControlSimulator
+from teraflashpy.states.laser import AcquisitionStatus, LaserStatus
+from teraflashpy.states.system import SystemStatus
+from teraflashpy.states.trans_impedance_amplifier import TransImpedanceAmplifierStatus
+from teraflashpy.states.transfer import TransferStatus
+
+
+class _SimulatedRemote(RemoteControl):
+    """Answers every command at once from a `RemoteControlSimulator`, and keeps what was sent in `texts`."""
+
+    commands = (RcCommand, RdCommand)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.simulator = RemoteControlSimulator()
+        self.texts: list[str] = []
+        self._replies: deque[str] = deque()
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def _send(self, payload: bytes) -> None:
+        text = payload.decode("ascii")
+        self.texts.append(text)
+        self._replies.append(self.simulator.reply(text))
+
+    def _read(self, timeout: float) -> str:  # noqa: ARG002
+        if not self._replies:
+            raise TimeoutError
+        return self._replies.popleft()
+
+    def _resynchronize(self, timeout: float) -> None:  # noqa: ARG002
+        self._replies.clear()
+
+
+def test_reads_are_answered_from_the_copy() -> None:
+    remote = _SimulatedRemote()
+    mirror = StateMirror(remote, max_age=60)
+
+    assert mirror.read(RdCommand.MeasuringRange) == "100"
+    assert mirror.read(RdCommand.MeasuringRange) == "100"
+    assert mirror.read(RdCommand.MeasuringRange, max_age=0) == "100"
+
+    assert remote.texts == ["RD-RANGE", "RD-RANGE"]
+    assert (mirror.hits, mirror.misses) == (1, 2)
+
+
+def test_commands_update_the_copy() -> None:
+    remote = _SimulatedRemote()
+    mirror = StateMirror(remote, max_age=60)
+    mirror.read_many([RdCommand.MeasuringRange, RdCommand.Amplitude])
+
+    mirror.send(RcCommand.Range, RangeInput(measuring_range=120))
+
+    assert mirror.read(RdCommand.MeasuringRange) == "120"
+    # Measurements are out of date after any command.
+    assert mirror.read(RdCommand.Amplitude) == "0.0"
+    assert remote.texts == ["RD-RANGE", "RD-AMPLITUDE", "RC-RANGE 120", "RD-AMPLITUDE"]
+
+
+def test_refused_commands_make_their_settings_out_of_date() -> None:
+    remote = _SimulatedRemote()
+    mirror = StateMirror(remote, max_age=60)
+    mirror.read(RdCommand.EmitterSupplyState)
+
+    # The laser is off.
+    with pytest.raises(RemoteControlError):
+        mirror.send(RcCommand.VoltageOn)
+
+    assert mirror.read(RdCommand.EmitterSupplyState) == "OFF"
+    assert remote.texts == ["RD-VOLTAGE", "RC-VOLTAGE : ON", "RD-VOLTAGE"]
+
+
+def test_invalidate() -> None:
+    remote = _SimulatedRemote()
+    mirror = StateMirror(remote, max_age=60)
+    mirror.read_many([RdCommand.LaserState, RdCommand.TiaMode])
+
+    mirror.invalidate([RdCommand.LaserState])
+    mirror.read_many([RdCommand.LaserState, RdCommand.TiaMode])
+    mirror.invalidate()
+    mirror.read(RdCommand.TiaMode)
+
+    assert remote.texts[2:] == ["RD-LASER", "RD-TIA-MODE"]
+
+
+def test_system_state_is_read_in_one_batch() -> None:
+    remote = _SimulatedRemote()
+    mirror = StateMirror(remote, max_age=60)
+    mirror.send(RcCommand.LaserOn)
+    mirror.send(RcCommand.RunOn)
+    sent = len(remote.texts)
+
+    state = mirror.system_state()
+
+    assert remote.texts[sent:] == ["RD-TRANSFER", "RD-TIA-SENSITIVITY", "RD-BEGIN", "RD-RANGE", "RD-AVERAGE"]
+    assert state.status is SystemStatus.On
+    assert state.laser_state.status is LaserStatus.On
+    assert state.laser_state.transfer_status is TransferStatus.Sliding
+    assert state.laser_state.tia_status is TransImpedanceAmplifierStatus.Small
+    # The OEM remote control cannot read the pump current back.
+    assert state.laser_state.pump_current is None
+    assert state.acquisition_state.state is AcquisitionStatus.On
+    assert state.acquisition_state.start_position == 850.0
+    assert state.acquisition_state.measuring_range == 100
+
+
+def test_polls_in_the_background() -> None:
+    remote = _SimulatedRemote()
+    with StateMirror(remote, max_age=60, poll=[RdCommand.Amplitude], interval=0.01) as mirror:
+        time.sleep(0.1)
+        mirror.read(RdCommand.Amplitude)
+
+    assert remote.texts.count("RD-AMPLITUDE") > 1
+    assert mirror.misses == 0
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from teraflashpy.output import PulseBatchBuilder
+
+START = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+HEADER = ["Time/ps", " Signal/nA"]
+AXIS = np.linspace(0, 1, 4, dtype=np.float32)
+
+
+def _set(builder: PulseBatchBuilder, index: int, header: list[str] = HEADER, time: np.ndarray = AXIS) -> bool:
+    return builder.set(index, START + timedelta(seconds=index), header, time, np.full(time.size, index, np.float32))
+
+
+def test_builder_keeps_a_shared_axis() -> None:
+    builder = PulseBatchBuilder(3)
+    assert all(_set(builder, index) for index in range(3))
+
+    batch = builder.build()
+
+    assert batch.shared_time
+    np.testing.assert_array_equal(batch.time, AXIS)
+    assert batch.magnitude[:, 0].tolist() == [0, 1, 2]
+    assert batch.timestamps[2] == np.datetime64("2024-05-01T12:00:02", "us")
+    assert batch[1].timestamp == START + timedelta(seconds=1)
+
+
+def test_builder_refuses_another_header_or_number_of_samples() -> None:
+    builder = PulseBatchBuilder(4)
+    assert _set(builder, 0)
+    assert _set(builder, 1)
+
+    assert not _set(builder, 2, header=["Time/ps", " Signal/mV"])
+    assert not _set(builder, 2, time=np.linspace(0, 1, 5, dtype=np.float32))
+    batch = builder.build(2)
+
+    assert len(batch) == 2
+    assert batch.magnitude[:, 0].tolist() == [0, 1]
+
+
+def test_builder_gives_each_pulse_its_axis_once_it_changes() -> None:
+    builder = PulseBatchBuilder(3)
+    _set(builder, 0)
+    _set(builder, 1, time=AXIS + 1)
+    _set(builder, 2, time=AXIS + 2)
+
+    batch = builder.build(2)
+
+    assert not batch.shared_time
+    np.testing.assert_array_equal(batch.time, [AXIS, AXIS + 1])
+
+
+def test_iterates_pulse_by_pulse() -> None:
+    builder = PulseBatchBuilder(2)
+    _set(builder, 0)
+    _set(builder, 1)
+
+    pulses = list(builder.build())
+
+    assert [pulse.timestamp for pulse in pulses] == [START, START + timedelta(seconds=1)]
+    assert all(pulse.header == HEADER for pulse in pulses)
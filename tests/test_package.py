@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+import pytest
+import teraflashpy
+from teraflashpy import core
+
+
+def _modules_loaded_by(statement: str) -> set[str]:
+    """Returns the modules loaded by running `statement` in a new interpreter."""
+    code = f"import json, sys; {statement}; print(json.dumps(list(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True).stdout  # noqa: S603
+    return set(json.loads(output))
+
+
+def test_import_loads_no_dependencies() -> None:
+    modules = _modules_loaded_by("import teraflashpy")
+
+    assert not modules & {"numpy", "pydantic", "pydantic_numpy"}
+
+
+def test_client_loads_only_what_reading_needs() -> None:
+    modules = _modules_loaded_by("import teraflashpy.client")
+
+    assert "teraflashpy.decode" in modules
+    for name in ("daemon", "metrics", "pipeline", "recording", "ring_buffer", "statistics"):
+        assert f"teraflashpy.{name}" not in modules
+
+
+def test_names_are_imported_on_first_use() -> None:
+    assert teraflashpy.CapturePolicy is core.CapturePolicy
+    assert teraflashpy.WorkerKind is core.WorkerKind
+    # Later lookups find the name in the module itself.
+    assert vars(teraflashpy)["CapturePolicy"] is core.CapturePolicy
+    assert set(teraflashpy.__all__) <= set(dir(teraflashpy))
+    with pytest.raises(AttributeError, match="has no attribute 'Missing'"):
+        _ = teraflashpy.Missing
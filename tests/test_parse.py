@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import pydantic
+import pytest
+from teraflashpy.commands import (
+    AcquisitionAverageInput,
+    AcquisitionBeginInput,
+    AcquisitionRangeInput,
+    Command,
+    CommandInput,
+    LaserSetInput,
+    NoInput,
+    SystemMonitorCode,
+    SystemMonitorInput,
+)
+from teraflashpy.parse import _SUBCOMMANDS, _parse_cached, parse_script, parse_string
+
+PARSED: dict[str, tuple[Command, CommandInput]] = {
+    "SYSTEM : STOP": (Command.SystemStop, NoInput()),
+    "SYSTEM : TELL STATUS": (Command.SystemTellStatus, NoInput()),
+    "SYSTEM : MONITOR 5": (Command.SystemMonitor, SystemMonitorInput(code=SystemMonitorCode.RtProcessorCpuLoad)),
+    "SYSTEM : TIA FULL": (Command.SystemTiaFull, NoInput()),
+    "SYSTEM : TIA ATN1": (Command.SystemTiaAtn1, NoInput()),
+    "SYSTEM : TIA ATN2": (Command.SystemTiaAtn2, NoInput()),
+    "LASER : OFF": (Command.LaserOff, NoInput()),
+    "LASER : ON": (Command.LaserOn, NoInput()),
+    "LASER : SET 42.5": (Command.LaserSet, LaserSetInput(pump_current=42.5)),
+    "ACQUISITION : BEGIN 850.3": (Command.AcquisitionBegin, AcquisitionBeginInput(start_position=850.3)),
+    "ACQUISITION : RANGE 100": (Command.AcquisitionRange, AcquisitionRangeInput(measuring_range=100)),
+    "ACQUISITION : STOP": (Command.AcquisitionStop, NoInput()),
+    "ACQUISITION : START": (Command.AcquisitionStart, NoInput()),
+    "ACQUISITION : AVERAGE 1000": (Command.AcquisitionAverage, AcquisitionAverageInput(num_averages=1000)),
+    "ACQUISITION : RESET AVG": (Command.AcquisitionResetAvg, NoInput()),
+    "TRANSMISSION : SLIDING": (Command.TransmissionSliding, NoInput()),
+    "TRANSMISSION : BLOCK": (Command.TransmissionBlock, NoInput()),
+}
+
+
+def test_every_subcommand_is_covered() -> None:
+    commands = {subcommand.command for subcommands in _SUBCOMMANDS.values() for subcommand in subcommands}
+
+    assert commands == {command for command, _ in PARSED.values()}
+
+
+@pytest.mark.parametrize(("string", "expected"), PARSED.items())
+def test_parses_every_subcommand(string: str, expected: tuple[Command, CommandInput]) -> None:
+    assert parse_string(string) == expected
+
+
+def test_parses_the_first_command_anywhere_in_the_string() -> None:
+    assert parse_string("as LASER : SET .4123 and LASER : OFF") == (
+        Command.LaserSet,
+        LaserSetInput(pump_current=0.4123),
+    )
+    # A group without a subcommand it knows is skipped.
+    assert parse_string("LASER : DANCE, then SYSTEM : STOP") == (Command.SystemStop, NoInput())
+
+
+@pytest.mark.parametrize("string", ["", "LASER: ON", "laser : on", "LASER : SET", "ACQUISITION : RANGE x"])
+def test_refuses_strings_without_a_command(string: str) -> None:
+    with pytest.raises(ValueError, match="cannot be parsed"):
+        parse_string(string)
+
+
+@pytest.mark.parametrize("string", ["LASER : SET 101", "ACQUISITION : BEGIN 850.33", "SYSTEM : MONITOR 4"])
+def test_validates_arguments(string: str) -> None:
+    with pytest.raises(pydantic.ValidationError):
+        parse_string(string)
+
+
+def test_results_are_cached() -> None:
+    _parse_cached.cache_clear()
+
+    first = parse_string("ACQUISITION : AVERAGE 20")
+    second = parse_string("ACQUISITION : AVERAGE 20")
+
+    assert second[1] is first[1]
+    assert _parse_cached.cache_info().hits == 1
+
+
+def test_parse_script() -> None:
+    script = """
+    # Start measuring.
+    LASER : ON
+
+    ACQUISITION : START
+    """
+
+    assert parse_script(script) == [(Command.LaserOn, NoInput()), (Command.AcquisitionStart, NoInput())]
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import queue
+import threading
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+import pytest
+from conftest import make_batch
+from teraflashpy.core import WorkerKind
+from teraflashpy.metrics import Metrics
+from teraflashpy.pipeline import BackgroundWriter, Backpressure
+from teraflashpy.store import PulseArchive
+from teraflashpy.writers import TfpWriter
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from teraflashpy.output import PulseBatch
+
+MAX_PENDING = 2
+
+
+def _batch(number: int) -> PulseBatch:
+    """A pulse taken `number` seconds in, every sample of which holds `number`."""
+    return make_batch(np.full(4, number), np.arange(4, dtype=np.float32), first=number, interval=np.timedelta64(1, "s"))
+
+
+class _GatedWriter:
+    """Holds every write until `gate` is set, and records the batches written."""
+
+    def __init__(self, *, fail: bool = False) -> None:
+        self.fail = fail
+        self.gate = threading.Event()
+        self.writing = threading.Event()
+        self.written: list[int] = []
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        pass
+
+    def write(self, batch: PulseBatch) -> None:
+        self.writing.set()
+        self.gate.wait()
+        if self.fail:
+            msg = "Disk full"
+            raise OSError(msg)
+        self.written.append(int(batch.magnitude[0, 0]))
+
+
+def _fill(background: BackgroundWriter, writer: _GatedWriter) -> None:
+    """Submits batch 0, which the worker holds on to, then batches 1 and 2, which fill the queue."""
+    background.submit(_batch(0))
+    writer.writing.wait()
+    assert background.submit(_batch(1))
+    assert background.submit(_batch(2))
+
+
+def test_block_waits_for_the_writer() -> None:
+    writer = _GatedWriter()
+    with BackgroundWriter(writer, MAX_PENDING, Backpressure.Block) as background:
+        _fill(background, writer)
+        submitter = threading.Thread(target=background.submit, args=(_batch(3),))
+        submitter.start()
+        submitter.join(0.2)
+        assert submitter.is_alive()
+        writer.gate.set()
+        submitter.join()
+
+    assert writer.written == [0, 1, 2, 3]
+    assert background.dropped == 0
+    assert background.metrics.metrics["teraflash_submit_seconds"].max >= 0.2
+
+
+def test_drop_oldest_discards_the_batch_waiting_longest() -> None:
+    writer = _GatedWriter()
+    with BackgroundWriter(writer, MAX_PENDING, Backpressure.DropOldest) as background:
+        _fill(background, writer)
+        assert background.submit(_batch(3))
+        writer.gate.set()
+
+    assert writer.written == [0, 2, 3]
+    assert background.dropped == 1
+
+
+def test_drop_oldest_gives_up_when_the_queue_looks_empty(monkeypatch: pytest.MonkeyPatch) -> None:
+    writer = _GatedWriter()
+    with BackgroundWriter(writer, MAX_PENDING, Backpressure.DropOldest) as background:
+        _fill(background, writer)
+
+        # As a full process queue can, until its feeder thread has flushed it.
+        def get_nowait() -> None:
+            raise queue.Empty
+
+        monkeypatch.setattr(background.queue, "get_nowait", get_nowait)
+        assert not background.submit(_batch(3))
+        writer.gate.set()
+
+    assert writer.written == [0, 1, 2]
+    assert background.dropped == 1
+
+
+def test_drop_newest_discards_the_batch_submitted() -> None:
+    writer = _GatedWriter()
+    with BackgroundWriter(writer, MAX_PENDING, Backpressure.DropNewest) as background:
+        _fill(background, writer)
+        assert not background.submit(_batch(3))
+        writer.gate.set()
+
+    assert writer.written == [0, 1, 2]
+    assert background.dropped == 1
+    assert background.max_pending_seen == MAX_PENDING
+
+
+def test_writer_errors_are_raised_by_close() -> None:
+    writer = _GatedWriter(fail=True)
+    writer.gate.set()
+    background = BackgroundWriter(writer)
+
+    with pytest.raises(OSError, match="Disk full"), background:
+        background.submit(_batch(0))
+
+
+def test_process_reports_write_times(tmp_path: Path) -> None:
+    metrics = Metrics()
+    with BackgroundWriter(TfpWriter(tmp_path, fsync=False), worker=WorkerKind.Process, metrics=metrics) as background:
+        for number in range(3):
+            background.submit(_batch(number))
+
+    with PulseArchive(tmp_path) as archive:
+        assert len(archive) == 3
+    assert metrics.metrics["teraflash_write_seconds"].count == 3
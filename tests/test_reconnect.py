@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from teraflashpy.core import LOCALHOST
+from teraflashpy.reconnect import Backoff, FrameReceiver
+from teraflashpy.simulator import SimulatorConfig, render_frames
+
+FRAMES = render_frames(SimulatorConfig(num_samples=20, num_variants=2, seed=0))
+
+
+def test_backoff_grows_up_to_the_maximum() -> None:
+    backoff = Backoff(initial=0.1, factor=2, maximum=1, jitter=0)
+
+    assert [backoff.delay(attempt) for attempt in range(6)] == pytest.approx([0.1, 0.2, 0.4, 0.8, 1, 1])
+
+
+def test_backoff_jitter() -> None:
+    backoff = Backoff(initial=1, jitter=0.2)
+
+    delays = [backoff.delay(0) for _ in range(100)]
+
+    assert all(0.8 <= delay <= 1.2 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+async def _receive(num_connections: int, backoff: Backoff) -> tuple[FrameReceiver, list[bytes]]:
+    """Receives from a server that sends every frame and hangs up, `num_connections` times, then stops listening."""
+    connections = 0
+
+    async def serve(_: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        nonlocal connections
+        connections += 1
+        if connections == num_connections:
+            server.close()
+        writer.write(b"".join(FRAMES))
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(serve, LOCALHOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    frames = []
+    receiver = FrameReceiver(LOCALHOST, port, lambda frame, _: frames.append(frame), backoff)
+    # The server stopped listening.
+    with pytest.raises(ConnectionRefusedError):
+        await asyncio.wait_for(receiver.run(), 10)
+    return receiver, frames
+
+
+def test_receiver_reconnects_until_it_gives_up() -> None:
+    receiver, frames = asyncio.run(_receive(3, Backoff(initial=0.01, attempts=2)))
+
+    assert receiver.connects == receiver.disconnects == 3
+    assert receiver.retries == 2
+    # Each connection starts afresh, so every frame arrives whole.
+    assert frames == [frame[6:] for frame in FRAMES] * 3
+    assert not receiver.connected
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+from teraflashpy.client import TeraflashProClient
+from teraflashpy.core import CapturePolicy
+from teraflashpy.recording import FrameLog, FrameRecorder, index_path, replay
+from teraflashpy.simulator import BackgroundSimulator, SimulatorConfig, render_frames
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+START = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+FRAMES = [frame[6:] for frame in render_frames(SimulatorConfig(num_samples=20, num_variants=5, seed=0))]
+
+
+def _record(path: Path, spacing: timedelta = timedelta(milliseconds=1)) -> Path:
+    with FrameRecorder(path) as recorder:
+        for index, frame in enumerate(FRAMES):
+            recorder.write(frame, START + index * spacing)
+    return path
+
+
+def _read(log: FrameLog) -> list[tuple[bytes, datetime]]:
+    return [(bytes(frame), timestamp) for frame, timestamp in log]
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    path = _record(tmp_path / "frames.log")
+
+    with FrameLog(path) as log:
+        frames = _read(log)
+        timestamps = log.timestamps
+
+    assert frames == [(frame, START + timedelta(milliseconds=index)) for index, frame in enumerate(FRAMES)]
+    assert timestamps[1] - timestamps[0] == np.timedelta64(1, "ms")
+
+
+def test_recordings_are_not_overwritten(tmp_path: Path) -> None:
+    path = _record(tmp_path / "frames.log")
+
+    with pytest.raises(FileExistsError):
+        FrameRecorder(path)
+
+
+def test_recovers_frames_missing_from_the_index(tmp_path: Path) -> None:
+    path = _record(tmp_path / "frames.log")
+    index = index_path(path)
+    # As if the recorder had been killed after writing the records of the last two frames, then halfway through another.
+    index.write_bytes(index.read_bytes()[: 3 * 24])
+    with path.open("ab") as log:
+        log.write(b"\x00" * 10)
+
+    with FrameLog(path) as log:
+        assert [frame for frame, _ in _read(log)] == FRAMES
+    index.unlink()
+    with FrameLog(path) as log:
+        assert len(log) == len(FRAMES)
+
+
+def test_a_record_cut_short_recovers_nothing(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    path = _record(tmp_path / "frames.log")
+    with path.open("ab") as log:
+        log.write(b"\x00" * 10)
+
+    with FrameLog(path) as log:
+        assert len(log) == len(FRAMES)
+
+    assert "Recovered" not in caplog.text
+
+
+def test_refuses_other_files(tmp_path: Path) -> None:
+    path = tmp_path / "frames.log"
+    path.write_bytes(b"not a frame log")
+
+    with pytest.raises(ValueError, match="not a frame log"):
+        FrameLog(path)
+
+
+@pytest.mark.parametrize("size", [0, 5])
+def test_refuses_logs_cut_short(tmp_path: Path, size: int) -> None:
+    path = _record(tmp_path / "frames.log")
+    # As if the recorder had crashed right after creating the log.
+    with path.open("r+b") as f:
+        f.truncate(size)
+
+    with pytest.raises(ValueError, match="cut short"):
+        FrameLog(path)
+
+
+def test_replay_keeps_the_pace(tmp_path: Path) -> None:
+    path = _record(tmp_path / "frames.log", spacing=timedelta(milliseconds=50))
+
+    with FrameLog(path) as log:
+        start = time.perf_counter()
+        frames = [(bytes(frame), timestamp) for frame, timestamp in replay(log, speed=2)]
+        elapsed = time.perf_counter() - start
+        assert frames == _read(log)
+
+    # Four gaps of 50 ms, replayed at twice the speed.
+    assert 0.1 <= elapsed < 0.5
+
+
+def test_client_replays_what_it_recorded(tmp_path: Path) -> None:
+    path = tmp_path / "frames.log"
+    with (
+        BackgroundSimulator(SimulatorConfig(num_samples=50, rate=1000), port=0) as simulator,
+        TeraflashProClient(capture_policy=CapturePolicy.Blocking, port=simulator.port, record_to=path) as client,
+    ):
+        recorded = client.read(20, timeout=10)
+    with TeraflashProClient(capture_policy=CapturePolicy.Blocking, replay_from=path, replay_speed=None) as client:
+        replayed = client.read(20, timeout=10)
+
+    np.testing.assert_array_equal(replayed.timestamps, recorded.timestamps)
+    np.testing.assert_array_equal(replayed.magnitude, recorded.magnitude)
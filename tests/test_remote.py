@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import socket
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+from teraflashpy.async_remote import AsyncTcpRemoteControl
+from teraflashpy.commands import AcquisitionBeginInput, Command, NoInput
+from teraflashpy.core import LOCALHOST
+from teraflashpy.oem_commands import BeginInput, RangeInput, RcCommand, RdCommand, TiaSensitivityInput
+from teraflashpy.remote import (
+    MESSAGE_ANSWER,
+    MESSAGE_HEADER,
+    MESSAGE_MAGIC,
+    RemoteControlError,
+    TcpRemoteControl,
+    UdpRemoteControl,
+    format_command,
+)
+
+
+class _FakeDevice(threading.Thread):
+    """Answers every command with `OK <command>`, or `ERROR` for those in `errors`, so that mismatches show.
+
+    `delays` holds, per command, how long to wait before answering each time it is received; once they run out, it
+    answers at once.
+    """
+
+    def __init__(self, delays: dict[str, list[float]] | None = None, errors: frozenset[str] = frozenset()) -> None:
+        super().__init__(daemon=True)
+        self.delays = defaultdict(list, delays or {})
+        self.errors = errors
+        self.received: list[str] = []
+
+    def answer(self, text: str) -> bytes:
+        self.received.append(text)
+        if self.delays[text]:
+            time.sleep(self.delays[text].pop(0))
+        return b"ERROR" if text in self.errors else f"OK {text}".encode("ascii")
+
+
+class _FakeUdpDevice(_FakeDevice):
+    def __init__(self, delays: dict[str, list[float]] | None = None, errors: frozenset[str] = frozenset()) -> None:
+        super().__init__(delays, errors)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((LOCALHOST, 0))
+        self.port = self.socket.getsockname()[1]
+        self.reply_port = 0
+
+    def run(self) -> None:
+        while True:
+            data, _ = self.socket.recvfrom(1 << 16)
+            self.socket.sendto(self.answer(data.decode("ascii")), (LOCALHOST, self.reply_port))
+
+
+class _FakeTcpDevice(_FakeDevice):
+    def __init__(self, port: int, delays: dict[str, list[float]] | None = None) -> None:
+        super().__init__(delays)
+        self.port = port
+        self.connections = 0
+
+    def run(self) -> None:
+        while True:
+            try:
+                connection = socket.create_connection((LOCALHOST, self.port))
+            except OSError:
+                return
+            self.connections += 1
+            with connection, connection.makefile("rb") as stream, contextlib.suppress(OSError):
+                while header := stream.read(MESSAGE_HEADER.size):
+                    *_, length = MESSAGE_HEADER.unpack(header)
+                    reply = self.answer(stream.read(length).decode("ascii"))
+                    connection.sendall(MESSAGE_HEADER.pack(*MESSAGE_MAGIC, MESSAGE_ANSWER, 0, len(reply)) + reply)
+
+
+def _udp(device: _FakeUdpDevice, **kwargs: float) -> UdpRemoteControl:
+    remote = UdpRemoteControl(LOCALHOST, device_port=device.port, read_port=0, write_port=0, **kwargs)
+    remote.open()
+    device.reply_port = remote.reader.getsockname()[1]
+    device.start()
+    return remote
+
+
+def test_format_command() -> None:
+    assert format_command(RcCommand.Begin, BeginInput(start_point=900.06)) == "RC-BEGIN 900.1"
+    sensitivity = TiaSensitivityInput(measuring_range=300)
+    assert format_command(RcCommand.TiaSensitivity, sensitivity) == "RC-TIA : SENSITIVITY 300"
+    begin = AcquisitionBeginInput(start_position=900)
+    assert format_command(Command.AcquisitionBegin, begin) == "ACQUISITION : BEGIN 900.000000"
+    assert format_command(Command.LaserOn, NoInput()) == format_command(Command.LaserOn) == "LASER : ON"
+
+
+@pytest.mark.parametrize(
+    ("command", "command_input"),
+    [
+        (RcCommand.TiaSensitivity, BeginInput(start_point=100.5)),
+        (RcCommand.Range, None),
+        (RcCommand.LaserOn, RangeInput(measuring_range=100)),
+        (Command.AcquisitionBegin, BeginInput(start_point=900)),
+        (RdCommand.MeasuringRange, RangeInput(measuring_range=100)),
+    ],
+)
+def test_format_command_refuses_inputs_of_other_commands(
+    command: Command | RcCommand | RdCommand,
+    command_input: BeginInput | RangeInput | None,
+) -> None:
+    with pytest.raises(TypeError, match=command.name):
+        format_command(command, command_input)
+
+
+def test_late_udp_reply_is_not_taken_for_the_next() -> None:
+    device = _FakeUdpDevice({"RD-BEGIN": [0.15]})
+    remote = _udp(device, timeout=0.1, window=1)
+    try:
+        replies = remote.send_many([RdCommand.MeasuringStartPoint, RdCommand.MeasuringRange])
+    finally:
+        remote.close()
+
+    assert [reply.raw for reply in replies] == ["OK RD-BEGIN", "OK RD-RANGE"]
+    assert remote.retried == 1
+
+
+def test_replies_behind_an_error_are_discarded() -> None:
+    device = _FakeUdpDevice(errors=frozenset({"RD-BEGIN"}))
+    remote = _udp(device, window=4)
+    try:
+        with pytest.raises(RemoteControlError):
+            remote.send_many([RdCommand.MeasuringStartPoint, RdCommand.MeasuringRange, RdCommand.DesiredAverage])
+        reply = remote.send(RdCommand.Amplitude)
+    finally:
+        remote.close()
+
+    assert reply.raw == "OK RD-AMPLITUDE"
+
+
+def _tcp(delays: dict[str, list[float]]) -> tuple[TcpRemoteControl, _FakeTcpDevice]:
+    remote = TcpRemoteControl(LOCALHOST, port=0, timeout=0.1, retries=1, connect_timeout=5)
+    remote.listen()
+    device = _FakeTcpDevice(remote.server.getsockname()[1], delays)
+    device.start()
+    remote.open()
+    return remote, device
+
+
+def test_non_idempotent_command_is_not_sent_again() -> None:
+    remote, device = _tcp({"ACQUISITION : RESET AVG": [0.3]})
+    try:
+        with pytest.raises(TimeoutError, match="not resending"):
+            remote.send(Command.AcquisitionResetAvg)
+    finally:
+        remote.close()
+
+    assert device.received == ["ACQUISITION : RESET AVG"]
+
+
+def test_tcp_reconnects_after_a_timeout() -> None:
+    remote, device = _tcp({"ACQUISITION : START": [0.3]})
+    try:
+        started = remote.send(Command.AcquisitionStart)
+        status = remote.send(Command.SystemTellStatus)
+        connections = device.connections
+    finally:
+        remote.close()
+
+    # The late reply to the first attempt went down the connection that was closed, not to the next request.
+    assert started.raw == "OK ACQUISITION : START"
+    assert status.raw == "OK SYSTEM : TELL STATUS"
+    assert connections == 2
+
+
+def test_async_tcp_reconnects_after_the_device_disconnects() -> None:
+    async def answer_once(port: int) -> None:
+        """Connects like the device, answers one command, and hangs up."""
+        reader, writer = await asyncio.open_connection(LOCALHOST, port)
+        *_, length = MESSAGE_HEADER.unpack(await reader.readexactly(MESSAGE_HEADER.size))
+        reply = b"OK " + await reader.readexactly(length)
+        writer.write(MESSAGE_HEADER.pack(*MESSAGE_MAGIC, MESSAGE_ANSWER, 0, len(reply)) + reply)
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    async def main() -> None:
+        remote = AsyncTcpRemoteControl(LOCALHOST, port=0, connect_timeout=5, timeout=1)
+        await remote.listen()
+        device = asyncio.create_task(answer_once(remote.port))
+        async with remote:
+            assert (await remote.send(Command.SystemTellStatus)).raw == "OK SYSTEM : TELL STATUS"
+            await device
+            async with asyncio.timeout(5):
+                while remote.writer is not None:
+                    await asyncio.sleep(0.01)
+
+            with pytest.raises(ConnectionError):
+                await remote.send(Command.LaserOn)
+
+            # `open` waits for the device to connect again.
+            device = asyncio.create_task(answer_once(remote.port))
+            await remote.open()
+            assert (await remote.send(Command.LaserOn)).raw == "OK LASER : ON"
+            await device
+
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from teraflashpy.schedule import Burst, Cron, FixedRate, Overrun, Scheduler
+
+PERIOD = timedelta(milliseconds=20)
+
+
+def test_skip_runs_the_latest_deadline_missed() -> None:
+    scheduler = Scheduler(FixedRate(PERIOD), Overrun.Skip, max_ticks=3)
+    ticks = []
+    for tick in scheduler:
+        ticks.append(tick)
+        if tick.index == 0:
+            # Past three deadlines.
+            time.sleep(3.5 * PERIOD.total_seconds())
+
+    assert [tick.skipped for tick in ticks] == [0, 2, 0]
+    assert ticks[1].due - ticks[0].due == pytest.approx(0.06)
+    assert scheduler.stats.skipped == 2
+    assert scheduler.stats.overruns == 1
+
+
+def test_catch_up_runs_every_deadline() -> None:
+    scheduler = Scheduler(FixedRate(PERIOD), Overrun.CatchUp, max_ticks=5)
+    dues = []
+    for tick in scheduler:
+        dues.append(tick.due)
+        if tick.index == 0:
+            time.sleep(3.5 * PERIOD.total_seconds())
+
+    assert scheduler.skipped == 0
+    assert scheduler.overruns >= 1
+    assert [later - earlier for earlier, later in zip(dues, dues[1:])] == pytest.approx([0.02] * 4)
+
+
+def test_duration_ends_the_run() -> None:
+    scheduler = Scheduler(FixedRate(PERIOD), duration=timedelta(milliseconds=90))
+
+    assert len(list(scheduler)) == 5
+
+
+def test_burst_deadlines() -> None:
+    deadlines = Burst(3, timedelta(seconds=1), timedelta(seconds=10)).deadlines(100.0)
+
+    assert [next(deadlines) for _ in range(5)] == [100.0, 101.0, 102.0, 110.0, 111.0]
+
+
+def test_cron_next_match() -> None:
+    cron = Cron("*/15 9-17 * * 1-5", timezone.utc)
+    # A Friday evening.
+    after = datetime(2024, 5, 3, 17, 50, tzinfo=timezone.utc)
+
+    monday = datetime(2024, 5, 6, 9, 0, tzinfo=timezone.utc)
+    assert cron.next_match(after) == monday
+    assert cron.next_match(monday) == monday + timedelta(minutes=15)
+
+
+def test_invalid_schedules() -> None:
+    with pytest.raises(ValueError, match="5 fields"):
+        Cron("* * *")
+    with pytest.raises(ValueError, match="does not fit"):
+        Burst(5, timedelta(seconds=3), timedelta(seconds=10))
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from teraflashpy.client import TeraflashProClient
+from teraflashpy.core import CapturePolicy
+from teraflashpy.decode import decode_pulse
+from teraflashpy.framing import FrameParser
+from teraflashpy.reconnect import Backoff
+from teraflashpy.simulator import BackgroundSimulator, SimulatorConfig, render_frames
+
+
+def test_rendered_frames_decode() -> None:
+    config = SimulatorConfig(num_samples=50, num_variants=2, seed=0)
+    frames = FrameParser().feed(b"".join(render_frames(config)))
+
+    assert len(frames) == 2
+    header, time, magnitude = decode_pulse(frames[0])
+    assert header == ["Time/ps", " Signal/nA"]
+    assert time.shape == magnitude.shape == (50,)
+    assert time[0] == config.start_position
+
+
+def test_client_recovers_from_short_reads() -> None:
+    config = SimulatorConfig(num_samples=50, rate=None, truncate_probability=0.05, seed=0)
+    with (
+        BackgroundSimulator(config, port=0) as simulator,
+        TeraflashProClient(
+            capture_policy=CapturePolicy.Blocking,
+            port=simulator.port,
+            backoff=Backoff(initial=0.01),
+        ) as client,
+    ):
+        batch = client.read(200, timeout=10)
+
+    assert simulator.simulator.faults["truncate"] > 0
+    assert simulator.simulator.connections > 1
+    # Every frame cut short was discarded with its connection, rather than decoded into a garbled pulse.
+    assert len(batch) == 200
+    assert batch.num_samples == 50
+    assert batch.shared_time
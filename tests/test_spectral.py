@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+from conftest import make_batch
+from teraflashpy.spectral import SpectralProcessor, Window, sample_spacing, spectral_setup
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+NUM_SAMPLES = 32
+DT = 0.05
+TIME = (DT * np.arange(NUM_SAMPLES)).astype(np.float32)
+
+
+def _pulses(num_pulses: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(num_pulses, NUM_SAMPLES)).astype(np.float32)
+
+
+@pytest.mark.parametrize(("window", "function"), [(Window.Hann, np.hanning), (Window.Blackman, np.blackman)])
+def test_matches_a_windowed_rfft(window: Window, function: Callable[[int], np.ndarray]) -> None:
+    pulses = _pulses(5)
+
+    spectra = SpectralProcessor(window, num_fft=64).transform(make_batch(pulses, TIME))
+
+    expected = np.fft.rfft(pulses * function(NUM_SAMPLES), n=64, axis=-1)
+    np.testing.assert_allclose(spectra.spectrum, expected, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(spectra.frequency, np.fft.rfftfreq(64, DT))
+    # A single pulse gets a single spectrum, and without padding it has every other bin of the padded one.
+    np.testing.assert_allclose(
+        SpectralProcessor(window).transform(make_batch(pulses, TIME)[2]).amplitude,
+        np.abs(expected[2])[::2],
+        rtol=1e-5,
+    )
+
+
+def test_subtracts_the_background() -> None:
+    pulses, background = _pulses(4), _pulses(10, seed=1)
+    processor = SpectralProcessor(Window.Boxcar)
+
+    processor.set_background(make_batch(background, TIME))
+    spectra = processor.transform(make_batch(pulses, TIME))
+
+    expected = np.fft.rfft(pulses - background.mean(axis=0), axis=-1)
+    np.testing.assert_allclose(spectra.spectrum, expected, rtol=1e-5, atol=1e-5)
+    processor.clear_background()
+    unchanged = processor.transform(make_batch(pulses, TIME))
+    np.testing.assert_allclose(unchanged.spectrum, np.fft.rfft(pulses), rtol=1e-5, atol=1e-5)
+
+
+def test_divides_by_the_reference_above_its_floor() -> None:
+    # All of the reference is in bins 0 and 3, and its other bins are rounding errors.
+    reference = 1 + np.cos(2 * np.pi * 3 * np.arange(NUM_SAMPLES) / NUM_SAMPLES)
+    pulses = _pulses(3)
+    processor = SpectralProcessor(Window.Boxcar)
+
+    processor.set_reference(make_batch(reference, TIME))
+    spectra = processor.transform(make_batch(pulses, TIME))
+
+    expected = np.zeros_like(spectra.spectrum)
+    expected[:, [0, 3]] = np.fft.rfft(pulses)[:, [0, 3]] / np.fft.rfft(reference)[[0, 3]]
+    np.testing.assert_allclose(spectra.spectrum, expected, rtol=1e-5, atol=1e-6)
+
+    with pytest.raises(ValueError, match="different number of samples"):
+        processor.transform(make_batch(pulses[:, :16], TIME[:16]))
+
+
+def test_setup_is_cached_and_read_only() -> None:
+    setup = spectral_setup(NUM_SAMPLES, DT, Window.Hann, 64)
+
+    assert spectral_setup(NUM_SAMPLES, DT, Window.Hann, 64) is setup
+    assert spectral_setup(NUM_SAMPLES, DT, Window.Hamming, 64) is not setup
+    assert SpectralProcessor(Window.Hann, num_fft=64).setup(TIME, NUM_SAMPLES) is setup
+    assert not setup.window.flags.writeable
+    assert not setup.frequency.flags.writeable
+    with pytest.raises(ValueError, match="zero-pad"):
+        spectral_setup(NUM_SAMPLES, DT, num_fft=16)
+
+
+def test_sample_spacing() -> None:
+    assert sample_spacing(TIME) == DT
+    assert sample_spacing(np.stack([TIME, TIME])) == DT
+    with pytest.raises(ValueError, match="at least 2"):
+        sample_spacing(TIME[:1])
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from teraflashpy.statistics import Accumulator, ExponentialMovingAverage, RunningStatistics, WindowedAverage
+
+PULSES = np.random.default_rng(0).normal(5, 2, size=(50, 8)).astype(np.float32)
+
+
+def _feed(accumulator: Accumulator, sizes: list[int]) -> None:
+    """Updates `accumulator` with `PULSES` in batches of `sizes`, a size of 1 passing a single pulse."""
+    start = 0
+    for size in sizes:
+        accumulator.update(PULSES[start] if size == 1 else PULSES[start : start + size])
+        start += size
+    assert start == len(PULSES)
+
+
+@pytest.mark.parametrize("sizes", [[1] * 50, [50], [10, 1, 1, 30, 8], [2, 48]])
+def test_running_statistics_match_numpy(sizes: list[int]) -> None:
+    statistics = RunningStatistics()
+    _feed(statistics, sizes)
+
+    assert statistics.count == 50
+    np.testing.assert_allclose(statistics.mean, PULSES.mean(axis=0, dtype=np.float64), rtol=1e-12)
+    np.testing.assert_allclose(statistics.variance, PULSES.var(axis=0, ddof=1, dtype=np.float64), rtol=1e-12)
+    np.testing.assert_allclose(statistics.standard_error, PULSES.std(axis=0, ddof=1) / np.sqrt(50), rtol=1e-6)
+
+
+def test_running_statistics_need_two_pulses_for_a_variance() -> None:
+    statistics = RunningStatistics()
+    with pytest.raises(ValueError, match="No pulses"):
+        _ = statistics.mean
+    statistics.update(PULSES[0])
+
+    np.testing.assert_array_equal(statistics.mean, PULSES[0])
+    with pytest.raises(ValueError, match="two pulses"):
+        _ = statistics.variance
+
+
+def test_exponential_moving_average_matches_its_recursion() -> None:
+    alpha = 0.1
+    mean, variance = PULSES[0].astype(np.float64), np.zeros(8)
+    for pulse in PULSES[1:]:
+        delta = pulse - mean
+        mean = mean + alpha * delta
+        variance = (1 - alpha) * (variance + alpha * delta**2)
+
+    average = ExponentialMovingAverage(span=19)
+    _feed(average, [1, 9, 40])
+
+    assert average.alpha == pytest.approx(alpha)
+    np.testing.assert_allclose(average.mean, mean, rtol=1e-12)
+    np.testing.assert_allclose(average.variance, variance, rtol=1e-12)
+
+
+@pytest.mark.parametrize("sizes", [[1] * 50, [50], [3, 7, 1, 39]])
+def test_windowed_average_covers_the_last_pulses(sizes: list[int]) -> None:
+    average = WindowedAverage(window=7)
+    _feed(average, sizes)
+
+    assert average.size == 7
+    np.testing.assert_allclose(average.mean, PULSES[-7:].mean(axis=0, dtype=np.float64), rtol=1e-9)
+    np.testing.assert_allclose(average.variance, PULSES[-7:].var(axis=0, ddof=1, dtype=np.float64), rtol=1e-9)
+
+
+def test_refuses_pulses_of_another_length() -> None:
+    statistics = RunningStatistics()
+    statistics.update(PULSES[:2], time=np.arange(8))
+
+    with pytest.raises(ValueError, match="of 9 samples"):
+        statistics.update(np.zeros(9))
+    assert statistics.num_samples == 8
+    statistics.reset()
+    statistics.update(np.zeros(9))
+
+    assert statistics.count == 1
+    assert statistics.num_samples == 9
+    np.testing.assert_array_equal(statistics.time, np.arange(8))
+
+
+def test_invalid_parameters() -> None:
+    with pytest.raises(ValueError, match="exactly one"):
+        ExponentialMovingAverage()
+    with pytest.raises(ValueError, match="alpha must be"):
+        ExponentialMovingAverage(alpha=1.5)
+    with pytest.raises(ValueError, match="window"):
+        WindowedAverage(window=0)
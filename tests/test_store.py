@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+from conftest import START, make_batch
+from teraflashpy.store import PulseArchive, PulseStore, record_dtype
+from teraflashpy.writers import TfpWriter
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from teraflashpy.output import PulseBatch
+
+NUM_SAMPLES = 8
+AXIS = np.linspace(0, 1, NUM_SAMPLES, dtype=np.float32)
+
+
+def _at(second: int) -> np.datetime64:
+    return START + np.timedelta64(second, "s")
+
+
+def _batch(first: int, num_pulses: int, time: np.ndarray = AXIS) -> PulseBatch:
+    """Pulses `first` onwards, one a second, with every sample of a pulse holding its number."""
+    numbers = np.arange(first, first + num_pulses)
+    magnitude = np.repeat(numbers, NUM_SAMPLES).reshape(num_pulses, NUM_SAMPLES)
+    return make_batch(magnitude, time, first=first, interval=np.timedelta64(1, "s"))
+
+
+def _write(folder: Path, *batches: PulseBatch) -> list[Path]:
+    folder.mkdir()
+    with TfpWriter(folder, fsync=False) as writer:
+        for batch in batches:
+            writer.write(batch)
+    return writer.paths
+
+
+def test_store_queries(tmp_path: Path) -> None:
+    [path] = _write(tmp_path / "day", _batch(0, 10))
+
+    with PulseStore(path) as store:
+        assert len(store) == 10
+        np.testing.assert_array_equal(store.time, AXIS)
+        assert store.between(_at(3), _at(6)).magnitude[:, 0].tolist() == [3, 4, 5]
+        assert store.pulses(-2).magnitude[:, 0].tolist() == [8, 9]
+        assert len(store.between(_at(20), _at(30))) == 0
+
+
+def test_archive_keeps_a_shared_axis(tmp_path: Path) -> None:
+    _write(tmp_path / "1", _batch(0, 5))
+    _write(tmp_path / "2", _batch(5, 5))
+
+    with PulseArchive(tmp_path) as archive:
+        assert len(archive) == 10
+        assert len(list(archive.query(_at(1), _at(3)))) == 1
+        batch = archive.between(_at(3), _at(8))
+
+    assert batch.magnitude[:, 0].tolist() == [3, 4, 5, 6, 7]
+    np.testing.assert_array_equal(batch.time, AXIS)
+
+
+def test_archive_gives_each_pulse_its_axis(tmp_path: Path) -> None:
+    other = AXIS + 10
+    per_pulse = np.stack([AXIS + 20, AXIS + 30])
+    # A different time axis starts a new store.
+    assert len(_write(tmp_path / "1", _batch(0, 2), _batch(2, 2, other), _batch(4, 2, per_pulse))) == 3
+
+    with PulseArchive(tmp_path) as archive:
+        batch = archive.between(_at(1), _at(6))
+
+    assert batch.time.shape == batch.magnitude.shape == (5, NUM_SAMPLES)
+    np.testing.assert_array_equal(batch.time, [AXIS, other, other, AXIS + 20, AXIS + 30])
+
+
+def test_archive_closes_empty_stores(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    _write(tmp_path / "1", _batch(0, 5))
+    [empty] = _write(tmp_path / "2", _batch(5, 5))
+    # As if the writer had been stopped before its pulses reached the disk.
+    with empty.open("r+b") as f:
+        f.truncate(empty.stat().st_size - 5 * record_dtype(NUM_SAMPLES, time=False).itemsize)
+    closed = []
+    close = PulseStore.close
+    monkeypatch.setattr(PulseStore, "close", lambda store: closed.append(store.path) or close(store))
+
+    with PulseArchive(tmp_path) as archive:
+        assert closed == [empty]
+        assert len(archive) == 5
+
+    assert len(closed) == 2
+
+
+@pytest.mark.parametrize("size", [0, 20, 100])
+def test_archive_skips_stores_cut_short(tmp_path: Path, size: int, caplog: pytest.LogCaptureFixture) -> None:
+    _write(tmp_path / "1", _batch(0, 5))
+    [cut_short] = _write(tmp_path / "2", _batch(5, 5))
+    # As if the writer had crashed while it created the store.
+    with cut_short.open("r+b") as f:
+        f.truncate(size)
+
+    with pytest.raises(ValueError, match="cut short"):
+        PulseStore(cut_short)
+    with PulseArchive(tmp_path) as archive:
+        assert len(archive) == 5
+
+    assert str(cut_short) in caplog.text
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import importlib.util
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+from conftest import HEADER, START, make_batch
+from teraflashpy import writers
+from teraflashpy.convert import read_pulses
+from teraflashpy.store import EXTENSION, PulseStore
+from teraflashpy.writers import WRITERS, open_writer
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from teraflashpy.output import PulseBatch
+
+NUM_SAMPLES = 16
+AXIS = np.linspace(850, 851, NUM_SAMPLES, dtype=np.float32)
+# The writers whose optional dependency is missing are skipped.
+OPTIONAL_DEPENDENCIES = {".parquet": "pyarrow", ".h5": "h5py"}
+EXTENSIONS = [
+    pytest.param(
+        extension,
+        marks=pytest.mark.skipif(
+            extension in OPTIONAL_DEPENDENCIES and importlib.util.find_spec(OPTIONAL_DEPENDENCIES[extension]) is None,
+            reason=f"{OPTIONAL_DEPENDENCIES.get(extension)} is not installed",
+        ),
+    )
+    for extension in WRITERS
+]
+
+
+def _batch(first: int, num_pulses: int, header: list[str] = HEADER) -> PulseBatch:
+    magnitude = np.random.default_rng(first).normal(size=(num_pulses, NUM_SAMPLES))
+    return make_batch(magnitude, AXIS, first=first, header=header)
+
+
+def _read(path: Path) -> list[PulseBatch]:
+    if path.suffix == EXTENSION:
+        with PulseStore(path) as store:
+            # Copied out of the memory map, so that the store can be closed.
+            return [store.pulses().model_copy(deep=True)]
+    return list(read_pulses(path))
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_round_trip(tmp_path: Path, extension: str) -> None:
+    batches = [_batch(0, 3), _batch(3, 5)]
+    with open_writer(extension, tmp_path, fsync=False) as writer:
+        for batch in batches:
+            writer.write(batch)
+
+    [path] = writer.paths
+    read = _read(path)
+
+    assert path.suffix == extension
+    np.testing.assert_array_equal(
+        np.concatenate([batch.timestamps for batch in read]),
+        START + np.arange(8) * np.timedelta64(1, "ms"),
+    )
+    np.testing.assert_array_equal(
+        np.concatenate([batch.magnitude for batch in read]),
+        np.concatenate([batch.magnitude for batch in batches]),
+    )
+    for batch in read:
+        np.testing.assert_array_equal(np.broadcast_to(batch.time, batch.magnitude.shape)[-1], AXIS)
+        # `.npy` has no room for the header.
+        assert batch.header == ([] if extension == ".npy" else HEADER)
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_rolls_over_when_the_header_changes(tmp_path: Path, extension: str) -> None:
+    with open_writer(extension, tmp_path, fsync=False) as writer:
+        writer.write(_batch(0, 2))
+        writer.write(_batch(2, 2, ["Time/ps", " Signal/mV"]))
+
+    assert len(writer.paths) == (1 if extension in {".pkl", ".json"} else 2)
+    if extension != ".npy":
+        headers = [batch.header for path in writer.paths for batch in _read(path)]
+        assert headers == [HEADER, ["Time/ps", " Signal/mV"]]
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_rolls_over_by_size_and_age(tmp_path: Path, extension: str) -> None:
+    (tmp_path / "size").mkdir()
+    (tmp_path / "age").mkdir()
+    with (
+        open_writer(extension, tmp_path / "size", max_bytes=1, fsync=False) as by_size,
+        open_writer(extension, tmp_path / "age", max_age=timedelta(0), fsync=False) as by_age,
+    ):
+        for first in range(0, 6, 2):
+            by_size.write(_batch(first, 2))
+            by_age.write(_batch(first, 2))
+
+    for writer in (by_size, by_age):
+        assert len(writer.paths) == 3
+        assert len(set(writer.paths)) == 3
+        assert sum(len(batch) for path in writer.paths for batch in _read(path)) == 6
+
+
+def test_unknown_extension(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="No writer for extension '.txt'"):
+        open_writer(".txt", tmp_path)
+
+
+def test_failed_open_leaves_nothing_to_close(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def _import_pyarrow() -> None:
+        msg = "Could not import module `pyarrow`."
+        raise ImportError(msg)
+
+    monkeypatch.setattr(writers, "_import_pyarrow", _import_pyarrow)
+    with pytest.raises(ImportError, match="pyarrow"), open_writer(".parquet", tmp_path, fsync=False) as writer:
+        writer.write(_batch(0, 2))
+
+    assert writer.path is None
+    assert writer.paths == []